@@ -1,3 +1,4 @@
+import re
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
@@ -9,6 +10,9 @@ from app.config import settings
 # Import all models here
 from app.users.models import *
 from app.babies.models import *
+from app.idempotency import IdempotencyKey
+from app.jobs.models import Job
+from app.purge import PurgeProgress
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -34,6 +38,20 @@ target_metadata = SQLModel.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Monthly partitions of the partitioned tables (see app/partitions.py), which
+# are created at runtime and not part of the models
+PARTITION_NAME = re.compile(r".+_(p\d{4}_\d{2}|default)$")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keeps autogenerate from dropping the partitions it reflects."""
+    return not (
+        type_ == "table"
+        and reflected
+        and compare_to is None
+        and PARTITION_NAME.match(name)
+    )
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -52,6 +70,7 @@ def run_migrations_offline() -> None:
         url=url,
         target_metadata=target_metadata,
         literal_binds=True,
+        include_object=include_object,
         dialect_opts={"paramstyle": "named"},
     )
 
@@ -66,6 +85,18 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # A connection passed in by the caller (e.g. the query plan tests)
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -73,7 +104,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
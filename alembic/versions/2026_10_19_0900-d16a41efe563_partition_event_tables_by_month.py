@@ -0,0 +1,181 @@
+"""Partition event tables by month
+
+Revision ID: d16a41efe563
+Revises: 362c62ee602b
+Create Date: 2026-10-19 09:00:12.418203
+
+"""
+
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d16a41efe563"
+down_revision: Union[str, None] = "362c62ee602b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Table -> parent id column, indexed together with the partition key
+PARENT_COLUMNS = {
+    "diaperchange": "baby_id",
+    "feeding": "baby_id",
+    "sleep": "baby_id",
+    "medicationlogs": "medication_id",
+}
+
+# The DDL below is a copy of app/partitions.py as of this revision, so later
+# changes to the app cannot change what this migration does
+
+# Partitioned table -> partition key (the event's time column)
+PARTITIONED_TABLES = {
+    "diaperchange": "time",
+    "feeding": "start_time",
+    "sleep": "start_time",
+    "medicationlogs": "time",
+}
+
+# Partitions created ahead of the current month; the app creates the later ones
+MONTHS_AHEAD = 3
+
+
+def add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def bound(month: date) -> str:
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def create_partitions(
+    connection: sa.Connection, table: str, first_month: date, last_month: date
+) -> None:
+    column = PARTITIONED_TABLES[table]
+    month = month_start(first_month)
+    while month <= last_month:
+        start, end = bound(month), bound(add_months(month, 1))
+        connection.execute(
+            sa.text(
+                f'CREATE TABLE "{table}_p{month:%Y_%m}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ({start}) TO ({end})"
+            )
+        )
+        month = add_months(month, 1)
+
+
+def foreign_keys(connection: sa.Connection, table: str) -> list[tuple[str, str]]:
+    return connection.execute(
+        sa.text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:table) AND contype = 'f'"
+        ),
+        {"table": table},
+    ).all()
+
+
+def convert_to_partitioned(connection: sa.Connection, table: str) -> None:
+    """Rebuilds a plain event table as a table range-partitioned by month.
+
+    Partitioned tables need the partition key in the primary key, so the
+    primary key becomes (id, <time column>) and the time column NOT NULL.
+    """
+    column = PARTITIONED_TABLES[table]
+    old = f"{table}_unpartitioned"
+
+    connection.execute(
+        sa.text(
+            f'UPDATE "{table}" SET "{column}" = created_at WHERE "{column}" IS NULL'
+        )
+    )
+    connection.execute(sa.text(f'ALTER TABLE "{table}" RENAME TO "{old}"'))
+    connection.execute(
+        sa.text(f'ALTER TABLE "{old}" RENAME CONSTRAINT "{table}_pkey" TO "{old}_pkey"')
+    )
+    old_foreign_keys = foreign_keys(connection, old)
+
+    connection.execute(
+        sa.text(
+            f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ("{column}")'
+        )
+    )
+    connection.execute(
+        sa.text(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" SET NOT NULL')
+    )
+    connection.execute(
+        sa.text(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" '
+            f'PRIMARY KEY (id, "{column}")'
+        )
+    )
+    for name, definition in old_foreign_keys:
+        connection.execute(
+            sa.text(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+        )
+    connection.execute(
+        sa.text(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+    )
+
+    oldest = connection.execute(
+        sa.text(f'SELECT min("{column}") FROM "{old}"')
+    ).scalar()
+    this_month = month_start(datetime.now(timezone.utc))
+    create_partitions(
+        connection,
+        table,
+        month_start(oldest) if oldest else this_month,
+        add_months(this_month, MONTHS_AHEAD),
+    )
+
+    connection.execute(sa.text(f'INSERT INTO "{table}" SELECT * FROM "{old}"'))
+    connection.execute(sa.text(f'DROP TABLE "{old}"'))
+
+
+def convert_to_unpartitioned(connection: sa.Connection, table: str) -> None:
+    """Rebuilds a partitioned event table as a single plain table."""
+    old = f"{table}_partitioned"
+
+    connection.execute(sa.text(f'ALTER TABLE "{table}" RENAME TO "{old}"'))
+    connection.execute(
+        sa.text(f'ALTER TABLE "{old}" RENAME CONSTRAINT "{table}_pkey" TO "{old}_pkey"')
+    )
+    old_foreign_keys = foreign_keys(connection, old)
+
+    connection.execute(
+        sa.text(f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS)')
+    )
+    connection.execute(sa.text(f'INSERT INTO "{table}" SELECT * FROM "{old}"'))
+    connection.execute(
+        sa.text(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY (id)')
+    )
+    for name, definition in old_foreign_keys:
+        connection.execute(
+            sa.text(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+        )
+    connection.execute(sa.text(f'DROP TABLE "{old}" CASCADE'))
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    for table, column in PARTITIONED_TABLES.items():
+        convert_to_partitioned(connection, table)
+        parent_column = PARENT_COLUMNS[table]
+        op.create_index(
+            f"ix_{table}_{parent_column}_{column}", table, [parent_column, column]
+        )
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    for table, column in PARTITIONED_TABLES.items():
+        convert_to_unpartitioned(connection, table)
+        op.alter_column(table, column, existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,119 @@
+"""Added event archive tables
+
+Revision ID: f7ba894f037b
+Revises: d16a41efe563
+Create Date: 2026-10-19 11:30:48.201577
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f7ba894f037b"
+down_revision: Union[str, None] = "d16a41efe563"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "diaperchangearchive",
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("time", sa.DateTime(), nullable=False),
+        sa.Column("pipi", sa.Boolean(), nullable=False),
+        sa.Column("poop", sa.Boolean(), nullable=False),
+        sa.Column("used_cream", sa.Boolean(), nullable=False),
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("baby_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["baby_id"],
+            ["baby.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_diaperchangearchive_baby_id_time",
+        "diaperchangearchive",
+        ["baby_id", "time"],
+    )
+    op.create_table(
+        "feedingarchive",
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=True),
+        sa.Column(
+            "type",
+            postgresql.ENUM("BREAST", "BOTTLE", name="feedingtype", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("left_breast", sa.Integer(), nullable=True),
+        sa.Column("right_breast", sa.Integer(), nullable=True),
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("baby_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["baby_id"],
+            ["baby.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_feedingarchive_baby_id_start_time",
+        "feedingarchive",
+        ["baby_id", "start_time"],
+    )
+    op.create_table(
+        "sleeparchive",
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=True),
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("baby_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["baby_id"],
+            ["baby.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_sleeparchive_baby_id_start_time",
+        "sleeparchive",
+        ["baby_id", "start_time"],
+    )
+    op.create_table(
+        "medicationlogsarchive",
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("time", sa.DateTime(), nullable=False),
+        sa.Column("dosage", sa.Float(), nullable=True),
+        sa.Column(
+            "description", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True
+        ),
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("medication_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["medication_id"],
+            ["medication.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_medicationlogsarchive_medication_id_time",
+        "medicationlogsarchive",
+        ["medication_id", "time"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("medicationlogsarchive")
+    op.drop_table("sleeparchive")
+    op.drop_table("feedingarchive")
+    op.drop_table("diaperchangearchive")
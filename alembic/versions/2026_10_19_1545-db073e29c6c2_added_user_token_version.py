@@ -0,0 +1,31 @@
+"""Added user token version
+
+Revision ID: db073e29c6c2
+Revises: 5d935fece975
+Create Date: 2026-10-19 15:45:03.115870
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "db073e29c6c2"
+down_revision: Union[str, None] = "5d935fece975"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user",
+        sa.Column("token_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("user", "token_version")
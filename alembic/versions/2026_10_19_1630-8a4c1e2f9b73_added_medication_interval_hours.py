@@ -0,0 +1,30 @@
+"""Added medication interval hours
+
+Revision ID: 8a4c1e2f9b73
+Revises: db073e29c6c2
+Create Date: 2026-10-19 16:30:11.402518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8a4c1e2f9b73"
+down_revision: Union[str, None] = "db073e29c6c2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "medication", sa.Column("interval_hours", sa.Integer(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("medication", "interval_hours")
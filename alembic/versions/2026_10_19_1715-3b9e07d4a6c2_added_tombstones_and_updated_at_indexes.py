@@ -0,0 +1,59 @@
+"""Added tombstones and updated_at indexes
+
+Revision ID: 3b9e07d4a6c2
+Revises: 8a4c1e2f9b73
+Create Date: 2026-10-19 17:15:27.906114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3b9e07d4a6c2"
+down_revision: Union[str, None] = "8a4c1e2f9b73"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UPDATED_AT_INDEXES = {
+    "measurement": "baby_id",
+    "diaperchange": "baby_id",
+    "feeding": "baby_id",
+    "sleep": "baby_id",
+    "bath": "baby_id",
+    "medication": "baby_id",
+    "medicationlogs": "medication_id",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tombstone",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("baby_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "entity_type", sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False
+        ),
+        sa.Column("entity_id", sa.Uuid(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["baby_id"], ["baby.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_tombstone_baby_id_deleted_at", "tombstone", ["baby_id", "deleted_at"]
+    )
+    for table, parent in UPDATED_AT_INDEXES.items():
+        op.create_index(
+            f"ix_{table}_{parent}_updated_at", table, [parent, "updated_at"]
+        )
+
+
+def downgrade() -> None:
+    for table, parent in UPDATED_AT_INDEXES.items():
+        op.drop_index(f"ix_{table}_{parent}_updated_at", table_name=table)
+    op.drop_index("ix_tombstone_baby_id_deleted_at", table_name="tombstone")
+    op.drop_table("tombstone")
@@ -0,0 +1,49 @@
+"""Added soft delete and purge progress
+
+Revision ID: e2d84b7c1f90
+Revises: c5f1a8d30e47
+Create Date: 2026-10-19 19:05:16.774203
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2d84b7c1f90"
+down_revision: Union[str, None] = "c5f1a8d30e47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ("baby", "user"):
+        op.add_column(table, sa.Column("deleted_at", sa.DateTime(), nullable=True))
+        op.create_index(
+            f"ix_{table}_deleted_at",
+            table,
+            ["deleted_at"],
+            postgresql_where=sa.text("deleted_at IS NOT NULL"),
+        )
+    op.create_table(
+        "purgeprogress",
+        sa.Column("baby_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "table_name", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False
+        ),
+        sa.Column("deleted_rows", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("baby_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("purgeprogress")
+    for table in ("baby", "user"):
+        op.drop_index(f"ix_{table}_deleted_at", table_name=table)
+        op.drop_column(table, "deleted_at")
@@ -0,0 +1,313 @@
+"""Store timestamps as timestamptz and add time zones
+
+Revision ID: 4e7a2c95b1d8
+Revises: 9f3b6d21c8a5
+Create Date: 2026-10-19 21:00:09.641527
+
+Until this revision, `created_at` and the default event times were the
+server's naive local time (datetime.now()), while the other columns held
+UTC. Pass the zone the server ran in, unless it was UTC:
+
+    alembic -x source_timezone=Europe/Lisbon upgrade head
+
+Every timestamp column is rewritten, each table under an ACCESS EXCLUSIVE
+lock: plan for downtime proportional to the data. The partitioned event
+tables are copied once into new partitioned tables, as Postgres can't
+change the type of a partition key in place.
+
+"""
+
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+from zoneinfo import ZoneInfo
+
+from alembic import context, op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4e7a2c95b1d8"
+down_revision: Union[str, None] = "9f3b6d21c8a5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMESTAMP_COLUMNS = {
+    "user": ["created_at", "updated_at", "deleted_at"],
+    "baby": ["created_at", "updated_at", "birthdate", "deleted_at"],
+    "measurement": ["created_at", "updated_at", "time"],
+    "diaperchange": ["created_at", "updated_at", "time"],
+    "diaperchangearchive": ["created_at", "updated_at", "time"],
+    "feeding": ["created_at", "updated_at", "start_time", "end_time"],
+    "feedingarchive": ["created_at", "updated_at", "start_time", "end_time"],
+    "sleep": ["created_at", "updated_at", "start_time", "end_time"],
+    "sleeparchive": ["created_at", "updated_at", "start_time", "end_time"],
+    "bath": ["created_at", "updated_at", "time"],
+    "medication": ["created_at", "updated_at"],
+    "medicationlogs": ["created_at", "updated_at", "time"],
+    "medicationlogsarchive": ["created_at", "updated_at", "time"],
+    "refreshtoken": ["created_at", "updated_at", "expires_at", "used_at", "revoked_at"],
+    "tombstone": ["deleted_at"],
+    "idempotencykey": ["created_at", "expires_at"],
+    "purgeprogress": ["started_at", "updated_at"],
+    "job": ["created_at", "updated_at", "run_at", "locked_at", "finished_at"],
+}
+
+# Columns that were written in the server's local time (`source_timezone`);
+# the others are UTC wall-clock times
+EVENT_TIME_COLUMNS = {
+    "measurement": ["time"],
+    "diaperchange": ["time"],
+    "diaperchangearchive": ["time"],
+    "feeding": ["start_time", "end_time"],
+    "feedingarchive": ["start_time", "end_time"],
+    "sleep": ["start_time", "end_time"],
+    "sleeparchive": ["start_time", "end_time"],
+    "bath": ["time"],
+    "medicationlogs": ["time"],
+    "medicationlogsarchive": ["time"],
+}
+# Tables whose created_at came from the TimestampMixin default
+CREATED_AT_TABLES = {
+    *EVENT_TIME_COLUMNS,
+    "user",
+    "baby",
+    "medication",
+    "refreshtoken",
+    "job",
+}
+
+# Partitioned table -> parent id column of its indexes
+PARENT_COLUMNS = {
+    "diaperchange": "baby_id",
+    "feeding": "baby_id",
+    "sleep": "baby_id",
+    "medicationlogs": "medication_id",
+}
+
+# The DDL below is a copy of app/partitions.py as of this revision, so later
+# changes to the app cannot change what this migration does
+
+# Partitioned table -> partition key (the event's time column)
+PARTITIONED_TABLES = {
+    "diaperchange": "time",
+    "feeding": "start_time",
+    "sleep": "start_time",
+    "medicationlogs": "time",
+}
+
+# Partitions created ahead of the current month; the app creates the later ones
+MONTHS_AHEAD = 3
+
+
+def source_timezone() -> str:
+    name = context.get_x_argument(as_dictionary=True).get("source_timezone", "UTC")
+    # Also keeps the name, which goes into the DDL, to a valid zone name
+    ZoneInfo(name)
+    return name
+
+
+def column_timezone(table: str, column: str, source_zone: str) -> str:
+    if column in EVENT_TIME_COLUMNS.get(table, ()) or (
+        column == "created_at" and table in CREATED_AT_TABLES
+    ):
+        return source_zone
+    return "UTC"
+
+
+def add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def bound(month: date) -> str:
+    # The offset is ignored by `timestamp` columns and honored by `timestamptz`
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def create_partitions(
+    connection: sa.Connection, table: str, first_month: date, last_month: date
+) -> None:
+    month = month_start(first_month)
+    while month <= last_month:
+        start, end = bound(month), bound(add_months(month, 1))
+        connection.execute(
+            sa.text(
+                f'CREATE TABLE "{table}_p{month:%Y_%m}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ({start}) TO ({end})"
+            )
+        )
+        month = add_months(month, 1)
+
+
+def foreign_keys(connection: sa.Connection, table: str) -> list[tuple[str, str]]:
+    return connection.execute(
+        sa.text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:table) AND contype = 'f'"
+        ),
+        {"table": table},
+    ).all()
+
+
+def table_columns(connection: sa.Connection, table: str) -> list[str]:
+    return (
+        connection.execute(
+            sa.text(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = :table "
+                "ORDER BY ordinal_position"
+            ),
+            {"table": table},
+        )
+        .scalars()
+        .all()
+    )
+
+
+def partitions(connection: sa.Connection, table: str) -> list[str]:
+    return (
+        connection.execute(
+            sa.text(
+                "SELECT inhrelid::regclass::text FROM pg_inherits "
+                "WHERE inhparent = to_regclass(:table)"
+            ),
+            {"table": table},
+        )
+        .scalars()
+        .all()
+    )
+
+
+def rebuild_partitioned(
+    connection: sa.Connection, table: str, type_: str, source_zone: str
+) -> None:
+    """Copies a partitioned event table into one with `type_` timestamps.
+
+    One pass over the rows: they are converted as they are copied.
+    """
+    column = PARTITIONED_TABLES[table]
+    converted = TIMESTAMP_COLUMNS[table]
+    new = f"{table}_new"
+    template = f"{table}_template"
+    old_foreign_keys = foreign_keys(connection, table)
+
+    def value(name: str) -> str:
+        if name not in converted:
+            return f'"{name}"'
+        zone = column_timezone(table, name, source_zone)
+        return f"\"{name}\" AT TIME ZONE '{zone}'"
+
+    # Not even an empty partitioned table lets its key's type change: the
+    # types are changed on an empty plain copy, which the new table copies
+    connection.execute(
+        sa.text(f'CREATE TABLE "{template}" (LIKE "{table}" INCLUDING DEFAULTS)')
+    )
+    connection.execute(
+        sa.text(
+            f'ALTER TABLE "{template}" '
+            + ", ".join(f'ALTER COLUMN "{name}" TYPE {type_}' for name in converted)
+        )
+    )
+    connection.execute(
+        sa.text(
+            f'CREATE TABLE "{new}" (LIKE "{template}" INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ("{column}")'
+        )
+    )
+    connection.execute(sa.text(f'DROP TABLE "{template}"'))
+    connection.execute(
+        sa.text(f'CREATE TABLE "{new}_default" PARTITION OF "{new}" DEFAULT')
+    )
+    oldest = connection.execute(
+        sa.text(f'SELECT min({value(column)}) FROM "{table}"')
+    ).scalar()
+    this_month = month_start(datetime.now(timezone.utc))
+    create_partitions(
+        connection,
+        new,
+        month_start(oldest) if oldest else this_month,
+        add_months(this_month, MONTHS_AHEAD),
+    )
+
+    columns = table_columns(connection, table)
+    names = ", ".join(f'"{name}"' for name in columns)
+    values = ", ".join(value(name) for name in columns)
+    connection.execute(
+        sa.text(f'INSERT INTO "{new}" ({names}) SELECT {values} FROM "{table}"')
+    )
+    connection.execute(sa.text(f'DROP TABLE "{table}"'))
+    connection.execute(sa.text(f'ALTER TABLE "{new}" RENAME TO "{table}"'))
+    for partition in partitions(connection, table):
+        connection.execute(
+            sa.text(
+                f'ALTER TABLE "{partition}" '
+                f'RENAME TO "{table}{partition.removeprefix(new)}"'
+            )
+        )
+
+    connection.execute(
+        sa.text(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" '
+            f'PRIMARY KEY (id, "{column}")'
+        )
+    )
+    for name, definition in old_foreign_keys:
+        connection.execute(
+            sa.text(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+        )
+    parent_column = PARENT_COLUMNS[table]
+    op.create_index(
+        f"ix_{table}_{parent_column}_{column}", table, [parent_column, column]
+    )
+    op.create_index(
+        f"ix_{table}_{parent_column}_updated_at", table, [parent_column, "updated_at"]
+    )
+
+
+def alter_timestamps(type_: str) -> None:
+    connection = op.get_bind()
+    source_zone = source_timezone()
+    for table in PARTITIONED_TABLES:
+        rebuild_partitioned(connection, table, type_, source_zone)
+
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        if table in PARTITIONED_TABLES:
+            continue
+        op.execute(
+            f'ALTER TABLE "{table}" '
+            + ", ".join(
+                f'ALTER COLUMN "{column}" TYPE {type_} USING "{column}" '
+                f"AT TIME ZONE '{column_timezone(table, column, source_zone)}'"
+                for column in columns
+            )
+        )
+
+
+def upgrade() -> None:
+    alter_timestamps("timestamptz")
+    op.add_column(
+        "user",
+        sa.Column(
+            "timezone",
+            sqlmodel.sql.sqltypes.AutoString(length=64),
+            server_default="UTC",
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        "baby",
+        sa.Column(
+            "timezone", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("baby", "timezone")
+    op.drop_column("user", "timezone")
+    alter_timestamps("timestamp")
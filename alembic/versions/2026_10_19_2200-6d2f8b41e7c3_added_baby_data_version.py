@@ -0,0 +1,31 @@
+"""Added baby data version
+
+Revision ID: 6d2f8b41e7c3
+Revises: 4e7a2c95b1d8
+Create Date: 2026-10-19 22:00:41.502318
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6d2f8b41e7c3"
+down_revision: Union[str, None] = "4e7a2c95b1d8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "baby",
+        sa.Column("data_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("baby", "data_version")
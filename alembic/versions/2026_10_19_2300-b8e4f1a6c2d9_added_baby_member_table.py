@@ -0,0 +1,54 @@
+"""Added baby member table
+
+Revision ID: b8e4f1a6c2d9
+Revises: 6d2f8b41e7c3
+Create Date: 2026-10-19 23:00:17.284603
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e4f1a6c2d9"
+down_revision: Union[str, None] = "6d2f8b41e7c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "babymember",
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("baby_id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "role",
+            sa.Enum("OWNER", "CAREGIVER", "VIEWER", name="memberrole"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["baby_id"], ["baby.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("baby_id", "user_id"),
+    )
+    op.create_index("ix_babymember_user_id", "babymember", ["user_id"], unique=False)
+
+    # Every existing baby's user becomes its owner
+    op.execute(
+        "INSERT INTO babymember (id, created_at, updated_at, baby_id, user_id, role) "
+        "SELECT gen_random_uuid(), created_at, updated_at, id, user_id, 'OWNER' "
+        "FROM baby"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_babymember_user_id", table_name="babymember")
+    op.drop_table("babymember")
+    sa.Enum(name="memberrole").drop(op.get_bind())
@@ -0,0 +1,38 @@
+"""Added idempotency key heartbeat
+
+Revision ID: e3a9c7b5d1f4
+Revises: b8e4f1a6c2d9
+Create Date: 2026-10-20 00:00:36.118402
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a9c7b5d1f4"
+down_revision: Union[str, None] = "b8e4f1a6c2d9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keys in progress count as just refreshed; the default is only for them
+    op.add_column(
+        "idempotencykey",
+        sa.Column(
+            "heartbeat_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+    op.alter_column("idempotencykey", "heartbeat_at", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("idempotencykey", "heartbeat_at")
@@ -0,0 +1,28 @@
+"""Added idempotency key headers
+
+Revision ID: f7b2d4e8a6c1
+Revises: e3a9c7b5d1f4
+Create Date: 2026-10-20 01:00:12.640593
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f7b2d4e8a6c1"
+down_revision: Union[str, None] = "e3a9c7b5d1f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("idempotencykey", sa.Column("headers", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("idempotencykey", "headers")
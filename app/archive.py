@@ -0,0 +1,184 @@
+# Cold storage for old events
+#
+# Events older than `archive_after_days` are moved from the hot (partitioned)
+# tables into their <Event>Archive table, written in parent/time order so each
+# baby's history sits together. List reads union the archive in only when the
+# requested range reaches back that far.
+#
+# Maintenance command:
+#   python -m app.archive
+import functools
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, delete, insert, select, union_all
+from sqlmodel import Session, SQLModel
+
+from app.babies.models import (
+    DiaperChange,
+    DiaperChangeArchive,
+    Feeding,
+    FeedingArchive,
+    MedicationLogs,
+    MedicationLogsArchive,
+    Sleep,
+    SleepArchive,
+)
+from app.config import settings
+from app.database import as_utc, engine, utcnow
+from app.responses import read_columns
+
+ARCHIVES: dict[type[SQLModel], type[SQLModel]] = {
+    DiaperChange: DiaperChangeArchive,
+    Feeding: FeedingArchive,
+    Sleep: SleepArchive,
+    MedicationLogs: MedicationLogsArchive,
+}
+
+# Reads include the archive for ranges starting up to a day after the cutoff,
+# so clock or time zone skew never hides archived rows
+ARCHIVE_READ_MARGIN = timedelta(days=1)
+
+
+def time_column(model: type[SQLModel]):
+    if "start_time" in model.model_fields:
+        return model.start_time
+    return model.time
+
+
+def parent_column(model: type[SQLModel]):
+    if "medication_id" in model.model_fields:
+        return model.medication_id
+    return model.baby_id
+
+
+def archive_cutoff() -> datetime:
+    return utcnow() - timedelta(days=settings.archive_after_days)
+
+
+def reaches_archive(start: datetime | None) -> bool:
+    if start is None:
+        return True
+    return as_utc(start) < archive_cutoff() + ARCHIVE_READ_MARGIN
+
+
+def select_events(
+    model: type[SQLModel],
+    schema: type[SQLModel],
+    parent_id,
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    """Selects the `schema` columns of a parent's events in [start, end).
+
+    Falls through to the archive table when `start` is older than the
+    archive cutoff (or missing). Results are ordered by the event time.
+    """
+    archived = model in ARCHIVES and reaches_archive(start)
+    return build_select_events(model, schema, archived, parent_id, start, end)
+
+
+def build_select_events(model, schema, archived: bool, parent_id, start, end):
+    models = [model]
+    if archived:
+        models.append(ARCHIVES[model])
+
+    statements = []
+    for source in models:
+        statement = select(*read_columns(source, schema)).where(
+            parent_column(source) == parent_id
+        )
+        if start is not None:
+            statement = statement.where(time_column(source) >= start)
+        if end is not None:
+            statement = statement.where(time_column(source) < end)
+        statements.append(statement)
+
+    time_name = time_column(model).key
+    if len(statements) == 1:
+        return statements[0].order_by(time_column(model))
+    return union_all(*statements).order_by(time_name)
+
+
+# One pre-built statement per shape of select_events (see app/statements.py)
+@functools.cache
+def prebuilt_select_events(model, schema, archived: bool, start: bool, end: bool):
+    return build_select_events(
+        model,
+        schema,
+        archived,
+        bindparam("parent_id"),
+        bindparam("start") if start else None,
+        bindparam("end") if end else None,
+    )
+
+
+def read_events(
+    session: Session,
+    model: type[SQLModel],
+    schema: type[SQLModel],
+    parent_id,
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    """The rows of select_events, through a pre-built statement."""
+    statement = prebuilt_select_events(
+        model,
+        schema,
+        model in ARCHIVES and reaches_archive(start),
+        start is not None,
+        end is not None,
+    )
+    params = {"parent_id": parent_id}
+    if start is not None:
+        params["start"] = start
+    if end is not None:
+        params["end"] = end
+    return session.exec(statement, params=params).all()
+
+
+def archive_table(session: Session, model: type[SQLModel], cutoff: datetime) -> int:
+    """Moves one batch of events older than `cutoff` into the archive table."""
+    archive = ARCHIVES[model]
+    columns = list(archive.model_fields)
+
+    batch = (
+        select(model.id)
+        .where(time_column(model) < cutoff)
+        .limit(settings.archive_batch_size)
+        .scalar_subquery()
+    )
+    moved = (
+        delete(model)
+        .where(model.id.in_(batch))
+        .returning(*(getattr(model, column) for column in columns))
+        .cte("moved")
+    )
+    result = session.exec(
+        insert(archive).from_select(
+            columns,
+            select(*(moved.c[column] for column in columns)).order_by(
+                moved.c[parent_column(model).key], moved.c[time_column(model).key]
+            ),
+        )
+    )
+    session.commit()
+    return result.rowcount
+
+
+def archive_events(cutoff: datetime | None = None) -> dict[str, int]:
+    """Archives every event older than `cutoff`, one committed batch at a time."""
+    if cutoff is None:
+        cutoff = archive_cutoff()
+
+    archived = {}
+    with Session(engine) as session:
+        for model in ARCHIVES:
+            archived[model.__tablename__] = 0
+            while count := archive_table(session, model, cutoff):
+                archived[model.__tablename__] += count
+    return archived
+
+
+if __name__ == "__main__":
+    for table, count in archive_events().items():
+        print(f"{table}: archived {count} rows")
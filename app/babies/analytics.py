@@ -0,0 +1,493 @@
+# Aggregates over a baby's events, computed in SQL
+#
+# Ranges are local days in the baby's time zone (its own, else its user's),
+# turned into UTC bounds so the event tables are read through their
+# (baby_id, time) index. Ranges reaching back `archive_after_days` read the
+# archive tables too: series go through select_events, sleep stats and
+# adherence add them themselves.
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Boolean, Date, Row, column, func, true, union_all, values
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.sql import Subquery
+from sqlmodel import Session, SQLModel, select
+
+from app.archive import reaches_archive, select_events, time_column
+from app.babies.models import (
+    Baby,
+    DiaperChange,
+    DiaperChangeRead,
+    Feeding,
+    FeedingRead,
+    Measurement,
+    MeasurementRead,
+    Medication,
+    MedicationAdherence,
+    MedicationLogs,
+    MedicationLogsArchive,
+    MedicationRead,
+    SeriesBucket,
+    SeriesMetric,
+    Sleep,
+    SleepArchive,
+    SleepDayTotals,
+    SleepStats,
+)
+from app.database import UTCDateTime, utcnow
+from app.responses import read_columns
+from app.timezones import local_day_bounds
+from app.users.models import User
+
+MAX_SLEEP_STATS_DAYS = 90
+
+# Local hours counted as night sleep, [19:00, 07:00)
+NIGHT_STARTS = time(19)
+NIGHT_ENDS = time(7)
+
+# Sleeps starting this long before the range are read too, for the part of
+# them inside the range
+MAX_SLEEP_LENGTH = timedelta(hours=24)
+
+
+def baby_state(session: Session, baby_id: uuid.UUID) -> tuple[str, int]:
+    """The baby's time zone and data version (for the cache key)."""
+    timezone_name, data_version = session.exec(
+        select(func.coalesce(Baby.timezone, User.timezone), Baby.data_version)
+        .join(User, User.id == Baby.user_id)
+        .where(Baby.id == baby_id)
+    ).one()
+    return timezone_name, data_version
+
+
+def last_local_days(days: int, timezone_name: str) -> tuple[date, date]:
+    """The last `days` local days, today included."""
+    today = utcnow().astimezone(ZoneInfo(timezone_name)).date()
+    return today - timedelta(days=days - 1), today
+
+
+def day_periods(first: date, last: date, timezone_name: str):
+    """VALUES (day, starts, ends, is_night) splitting each local day in three.
+
+    Built from the local wall clock, so DST days get their real length.
+    """
+    zone = ZoneInfo(timezone_name)
+    rows = []
+    day = first
+    while day <= last:
+        bounds = [
+            datetime.combine(day, time(), zone),
+            datetime.combine(day, NIGHT_ENDS, zone),
+            datetime.combine(day, NIGHT_STARTS, zone),
+            datetime.combine(day + timedelta(days=1), time(), zone),
+        ]
+        for index, is_night in enumerate((True, False, True)):
+            rows.append((day, bounds[index], bounds[index + 1], is_night))
+        day += timedelta(days=1)
+
+    return values(
+        column("day", Date),
+        column("starts", UTCDateTime),
+        column("ends", UTCDateTime),
+        column("is_night", Boolean),
+        name="periods",
+    ).data(rows)
+
+
+def seconds(interval):
+    return func.extract("epoch", interval)
+
+
+def select_sleep_stats(baby_id: uuid.UUID, days: int, timezone_name: str):
+    first, last = last_local_days(days, timezone_name)
+    start, end = local_day_bounds(first, last, timezone_name)
+    until = min(end, utcnow())
+
+    read_from = start - MAX_SLEEP_LENGTH
+    rows = union_all(
+        *(
+            select(model.start_time, model.end_time).where(
+                model.baby_id == baby_id,
+                model.start_time >= read_from,
+                model.start_time < until,
+                # Drops sleeps entered with an end before their start
+                func.coalesce(model.end_time, until) > model.start_time,
+            )
+            for model in sleep_models(read_from)
+        )
+    ).subquery("rows")
+
+    # An open sleep lasts until the next one starts, or until now when it is
+    # the latest (the baby is sleeping)
+    ordered = select(
+        rows.c.start_time,
+        rows.c.end_time,
+        func.lead(rows.c.start_time)
+        .over(order_by=rows.c.start_time)
+        .label("next_start"),
+    ).cte("ordered")
+    ends = func.coalesce(
+        ordered.c.end_time, func.least(ordered.c.next_start, until)
+    ).label("end_time")
+    sleeps = select(
+        ordered.c.start_time,
+        ends,
+        (ordered.c.end_time.is_(None) & ordered.c.next_start.is_(None)).label(
+            "is_open"
+        ),
+        func.lag(ends).over(order_by=ordered.c.start_time).label("previous_end"),
+    ).cte("sleeps")
+
+    # Sleep per local day and period: sleeps crossing midnight or the night
+    # bounds are split between the periods they overlap
+    periods = day_periods(first, last, timezone_name)
+    overlap = seconds(
+        func.least(sleeps.c.end_time, periods.c.ends)
+        - func.greatest(sleeps.c.start_time, periods.c.starts)
+    )
+    # least() and greatest() ignore NULLs: a period without sleeps (outer
+    # joined) would overlap itself whole
+    slept = sleeps.c.start_time.is_not(None)
+    by_day = (
+        select(
+            periods.c.day,
+            func.coalesce(
+                func.sum(overlap).filter(slept, ~periods.c.is_night), 0
+            ).label("day_seconds"),
+            func.coalesce(func.sum(overlap).filter(slept, periods.c.is_night), 0).label(
+                "night_seconds"
+            ),
+        )
+        .select_from(periods)
+        .outerjoin(
+            sleeps,
+            (sleeps.c.start_time < periods.c.ends)
+            & (sleeps.c.end_time > periods.c.starts),
+        )
+        .group_by(periods.c.day)
+        .cte("by_day")
+    )
+
+    length = sleeps.c.end_time - sleeps.c.start_time
+    in_range = sleeps.c.end_time > start
+    wake_window = sleeps.c.start_time - sleeps.c.previous_end
+    summary = select(
+        func.count().filter(in_range).label("sessions"),
+        func.coalesce(func.bool_or(sleeps.c.is_open & in_range), False).label(
+            "is_sleeping"
+        ),
+        func.max(seconds(length)).filter(in_range).label("longest_seconds"),
+        func.array_agg(aggregate_order_by(sleeps.c.start_time, length.desc()))
+        .filter(in_range)[1]
+        .label("longest_start"),
+        func.avg(seconds(wake_window))
+        .filter(sleeps.c.start_time >= start, seconds(wake_window) > 0)
+        .label("wake_window_seconds"),
+    ).cte("summary")
+
+    statement = (
+        select(by_day, summary)
+        .select_from(by_day.join(summary, true()))
+        .order_by(by_day.c.day)
+    )
+    return statement, start, end
+
+
+def minutes(value) -> float:
+    return round(float(value) / 60, 1)
+
+
+def sleep_stats_from_rows(
+    rows: list[Row[Any]], timezone_name: str, start: datetime, end: datetime
+) -> SleepStats:
+    summary = rows[0]._mapping
+    by_day = [
+        SleepDayTotals(
+            day=row.day,
+            day_minutes=minutes(row.day_seconds),
+            night_minutes=minutes(row.night_seconds),
+        )
+        for row in rows
+    ]
+    day_minutes = round(sum(day.day_minutes for day in by_day), 1)
+    night_minutes = round(sum(day.night_minutes for day in by_day), 1)
+    longest = summary["longest_seconds"]
+    wake_window = summary["wake_window_seconds"]
+    return SleepStats(
+        timezone=timezone_name,
+        start=start,
+        end=end,
+        sessions=summary["sessions"],
+        is_sleeping=summary["is_sleeping"],
+        longest_stretch_minutes=minutes(longest) if longest is not None else None,
+        longest_stretch_start=summary["longest_start"],
+        average_wake_window_minutes=(
+            minutes(wake_window) if wake_window is not None else None
+        ),
+        day_minutes=day_minutes,
+        night_minutes=night_minutes,
+        average_daily_minutes=round((day_minutes + night_minutes) / len(by_day), 1),
+        by_day=by_day,
+    )
+
+
+# Time series: one point per local hour, day or week
+MAX_SERIES_POINTS = 1000
+
+BUCKET_STEPS = {
+    SeriesBucket.HOUR: timedelta(hours=1),
+    SeriesBucket.DAY: timedelta(days=1),
+    SeriesBucket.WEEK: timedelta(weeks=1),
+}
+
+# Range used when `from` is not given, back from `to`
+DEFAULT_SERIES_SPANS = {
+    SeriesBucket.HOUR: timedelta(days=2),
+    SeriesBucket.DAY: timedelta(days=30),
+    SeriesBucket.WEEK: timedelta(weeks=26),
+}
+
+
+@dataclass(frozen=True)
+class MetricSource:
+    model: type[SQLModel]
+    schema: type[SQLModel]
+    aggregate: Callable[[Subquery], Any]
+    empty: float | None  # value of buckets without events
+
+
+METRICS = {
+    SeriesMetric.FEEDINGS: MetricSource(
+        Feeding, FeedingRead, lambda events: func.count(events.c.id), 0
+    ),
+    SeriesMetric.DIAPERS: MetricSource(
+        DiaperChange, DiaperChangeRead, lambda events: func.count(events.c.id), 0
+    ),
+    SeriesMetric.WET_DIAPERS: MetricSource(
+        DiaperChange,
+        DiaperChangeRead,
+        lambda events: func.count(events.c.id).filter(events.c.pipi),
+        0,
+    ),
+    SeriesMetric.DIRTY_DIAPERS: MetricSource(
+        DiaperChange,
+        DiaperChangeRead,
+        lambda events: func.count(events.c.id).filter(events.c.poop),
+        0,
+    ),
+    SeriesMetric.WEIGHT: MetricSource(
+        Measurement, MeasurementRead, lambda events: func.avg(events.c.weight), None
+    ),
+    SeriesMetric.HEIGHT: MetricSource(
+        Measurement, MeasurementRead, lambda events: func.avg(events.c.height), None
+    ),
+}
+
+
+def bucket_start(value: datetime, bucket: SeriesBucket, zone: ZoneInfo) -> datetime:
+    """The local wall-clock start (naive) of the bucket holding `value`."""
+    local = value.astimezone(zone).replace(tzinfo=None)
+    if bucket is SeriesBucket.HOUR:
+        return local.replace(minute=0, second=0, microsecond=0)
+    day = datetime.combine(local.date(), time())
+    if bucket is SeriesBucket.WEEK:
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+def series_slots(
+    start: datetime, end: datetime, bucket: SeriesBucket, timezone_name: str
+) -> tuple[datetime, datetime, int]:
+    """First and last bucket (local, naive) covering [start, end), and their count."""
+    zone = ZoneInfo(timezone_name)
+    first = bucket_start(start, bucket, zone)
+    last = bucket_start(end - timedelta(microseconds=1), bucket, zone)
+    return first, last, (last - first) // BUCKET_STEPS[bucket] + 1
+
+
+def select_series(
+    baby_id: uuid.UUID,
+    metric: SeriesMetric,
+    bucket: SeriesBucket,
+    first: datetime,
+    last: datetime,
+    end: datetime,
+    timezone_name: str,
+):
+    """One row (start, value) per bucket from `first` to `last`, gaps filled.
+
+    Buckets are local wall-clock hours, days or weeks, so an hour bucket holds
+    two hours or none across DST changes.
+    """
+    source = METRICS[metric]
+    start = first.replace(tzinfo=ZoneInfo(timezone_name))
+    events = select_events(source.model, source.schema, baby_id, start, end).subquery(
+        "events"
+    )
+    time_name = time_column(source.model).key
+
+    local_slot = func.date_trunc(
+        bucket.value, func.timezone(timezone_name, events.c[time_name])
+    )
+    bucketed = select(events, local_slot.label("slot")).subquery("bucketed")
+    buckets = (
+        select(bucketed.c.slot, source.aggregate(bucketed).label("value"))
+        .group_by(bucketed.c.slot)
+        .subquery("buckets")
+    )
+    slots = (
+        func.generate_series(first, last, BUCKET_STEPS[bucket])
+        .table_valued("slot")
+        .render_derived(name="slots")
+    )
+    value = buckets.c.value
+    if source.empty is not None:
+        value = func.coalesce(value, source.empty)
+    return (
+        select(
+            func.timezone(timezone_name, slots.c.slot, type_=UTCDateTime).label(
+                "start"
+            ),
+            value.label("value"),
+        )
+        .select_from(slots.outerjoin(buckets, buckets.c.slot == slots.c.slot))
+        .order_by(slots.c.slot)
+    )
+
+
+# Medication adherence of the active medications
+#
+# After a dose, the next ones are due every `interval_hours`. A dose taken
+# `gap` after the previous one answers the latest due time before
+# gap + tolerance (the earlier due times were missed); it is on time within
+# the tolerance of that due time, else late, and early when no dose was due
+# yet. Doses due before the end of the range and not taken are missed.
+MAX_ADHERENCE_DAYS = 366
+DEFAULT_ADHERENCE_SPAN = timedelta(days=30)
+LATE_AFTER_FRACTION = 0.25  # of the interval: the on-time tolerance
+
+
+def select_adherence(baby_id: uuid.UUID, start: datetime, end: datetime):
+    until = min(end, utcnow())
+    interval = Medication.interval_hours * 3600
+    tolerance = interval * LATE_AFTER_FRACTION
+
+    # The dose before the range; without a recent one, the schedule starts
+    # with the range (or the medication), as if a dose was taken one interval
+    # earlier: doses that fell due before the range are not counted in it.
+    # (greatest() ignores NULLs, i.e. no dose before the range)
+    previous_doses = [
+        select(func.max(model.time))
+        .where(model.medication_id == Medication.id, model.time < start)
+        .scalar_subquery()
+        for model in log_models(start)
+    ]
+    schedule_start = func.greatest(start, Medication.created_at)
+    before = func.greatest(
+        *previous_doses,
+        schedule_start - func.make_interval(0, 0, 0, 0, Medication.interval_hours),
+    )
+    medications = (
+        select(
+            *read_columns(Medication, MedicationRead),
+            interval.label("interval_seconds"),
+            tolerance.label("tolerance_seconds"),
+            before.label("before"),
+        )
+        .where(Medication.baby_id == baby_id, Medication.is_active)
+        .cte("medications")
+    )
+
+    logs = union_all(
+        *(
+            select(model.medication_id, model.time, model.dosage)
+            .join(medications, medications.c.id == model.medication_id)
+            .where(model.time >= start, model.time < until)
+            for model in log_models(start)
+        )
+    ).subquery("logs")
+    doses = select(
+        logs,
+        func.lag(logs.c.time)
+        .over(partition_by=logs.c.medication_id, order_by=logs.c.time)
+        .label("previous"),
+    ).subquery("doses")
+
+    gap = seconds(doses.c.time - func.coalesce(doses.c.previous, medications.c.before))
+    due = func.floor(
+        (gap + medications.c.tolerance_seconds) / medications.c.interval_seconds
+    )
+    lateness = gap - due * medications.c.interval_seconds
+    stats = (
+        select(
+            doses.c.medication_id,
+            func.count().label("taken"),
+            func.sum(doses.c.dosage).label("total_dosage"),
+            func.max(doses.c.time).label("last_time"),
+            func.count()
+            .filter(due > 0, lateness <= medications.c.tolerance_seconds)
+            .label("on_time"),
+            func.count()
+            .filter(due > 0, lateness > medications.c.tolerance_seconds)
+            .label("late"),
+            func.count().filter(due == 0).label("early"),
+            func.sum(func.greatest(due - 1, 0)).label("missed_between"),
+        )
+        .join(medications, medications.c.id == doses.c.medication_id)
+        .group_by(doses.c.medication_id)
+        .subquery("stats")
+    )
+
+    # Doses due after the last one, past their tolerance by the end
+    last_dose = func.coalesce(stats.c.last_time, medications.c.before)
+    missed_after = func.greatest(
+        func.floor(
+            (seconds(until - last_dose) - medications.c.tolerance_seconds)
+            / medications.c.interval_seconds
+        ),
+        0,
+    )
+    return (
+        select(
+            *(medications.c[name] for name in MedicationRead.model_fields),
+            func.coalesce(stats.c.taken, 0).label("taken"),
+            func.coalesce(stats.c.total_dosage, 0).label("total_dosage"),
+            func.coalesce(stats.c.on_time, 0).label("on_time"),
+            func.coalesce(stats.c.late, 0).label("late"),
+            func.coalesce(stats.c.early, 0).label("early"),
+            (func.coalesce(stats.c.missed_between, 0) + missed_after).label("missed"),
+        )
+        .select_from(medications)
+        .outerjoin(stats, stats.c.medication_id == medications.c.id)
+        .order_by(medications.c.name)
+    )
+
+
+def sleep_models(start: datetime) -> list[type[SQLModel]]:
+    if reaches_archive(start):
+        return [Sleep, SleepArchive]
+    return [Sleep]
+
+
+def log_models(start: datetime) -> list[type[SQLModel]]:
+    if reaches_archive(start):
+        return [MedicationLogs, MedicationLogsArchive]
+    return [MedicationLogs]
+
+
+def adherence_from_row(row: Row[Any]) -> MedicationAdherence:
+    values = dict(row._mapping)
+    if values["interval_hours"] is None:
+        values.update(on_time=None, late=None, early=None, missed=None)
+        return MedicationAdherence(**values, adherence=None)
+
+    for name in ("on_time", "late", "early", "missed"):
+        values[name] = int(values[name])
+    expected = values["on_time"] + values["late"] + values["missed"]
+    return MedicationAdherence(
+        **values,
+        adherence=round(values["on_time"] / expected, 3) if expected else None,
+    )
@@ -0,0 +1,135 @@
+# Baby members: who may access a baby, and how
+#
+# Every baby has one OWNER member (its `user_id`), plus the caregivers and
+# viewers the owner adds. Routes authorize through the member's role, read
+# from a per-user cache so a request costs no membership query.
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy import bindparam
+from sqlmodel import Session, select
+
+from app.babies.models import Baby, BabyMember, MemberRole
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Roles allowed to write a baby's events
+WRITER_ROLES = frozenset({MemberRole.OWNER, MemberRole.CAREGIVER})
+
+# Redis hash of user id -> generation, bumped when the user's memberships change
+GENERATIONS_KEY = "membership_generations"
+
+
+def member_baby_ids(user_id, roles=None):
+    """SQL: ids of the babies the user is a member of (with one of `roles`)."""
+    statement = select(BabyMember.baby_id).where(
+        BabyMember.user_id == uuid.UUID(str(user_id))
+    )
+    if roles is not None:
+        statement = statement.where(BabyMember.role.in_(roles))
+    return statement
+
+
+# Pre-built (see app/statements.py), as every cache miss runs it
+MEMBER_ROLES = (
+    select(BabyMember.baby_id, BabyMember.role)
+    .join(Baby, Baby.id == BabyMember.baby_id)
+    .where(BabyMember.user_id == bindparam("user_id"), Baby.deleted_at.is_(None))
+)
+
+
+class Memberships:
+    """Per-user cache of the user's babies and roles.
+
+    Entries are dropped when this worker changes a membership (`invalidate`),
+    and reloaded after `membership_cache_seconds`, which bounds how long
+    other workers keep a stale membership. With `redis_url` set, changes
+    also bump the user's generation in Redis, and every worker reloads an
+    entry whose generation is behind: revocations apply right away.
+    """
+
+    def __init__(self, redis_url: str | None = None):
+        # User id -> (expires at, generation, roles)
+        self.entries: OrderedDict[
+            str, tuple[float, int | None, dict[uuid.UUID, MemberRole]]
+        ] = OrderedDict()
+        self.lock = threading.Lock()
+        self.shared = None
+        if redis_url:
+            import redis
+
+            self.shared = redis.Redis.from_url(redis_url)
+            self.errors = redis.RedisError
+
+    def generation(self, key: str) -> int | None:
+        if self.shared is None:
+            return None
+        try:
+            return int(self.shared.hget(GENERATIONS_KEY, key) or 0)
+        except self.errors:
+            # Entries still expire after membership_cache_seconds
+            logger.warning("Could not read membership generations", exc_info=True)
+            return None
+
+    def roles(self, user_id, session: Session) -> dict[uuid.UUID, MemberRole]:
+        key = str(user_id)
+        generation = self.generation(key)
+        with self.lock:
+            entry = self.entries.get(key)
+        if (
+            entry is not None
+            and time.monotonic() < entry[0]
+            and (generation is None or generation == entry[1])
+        ):
+            return entry[2]
+
+        roles = dict(
+            session.exec(MEMBER_ROLES, params={"user_id": uuid.UUID(key)}).all()
+        )
+        with self.lock:
+            self.entries[key] = (
+                time.monotonic() + settings.membership_cache_seconds,
+                generation,
+                roles,
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.membership_cache_max_users:
+                self.entries.popitem(last=False)
+        return roles
+
+    def role(self, user_id, baby_id: uuid.UUID, session: Session) -> MemberRole | None:
+        return self.roles(user_id, session).get(baby_id)
+
+    def invalidate(self, *user_ids):
+        """Drops the users' entries; call once the change is committed."""
+        keys = [str(user_id) for user_id in user_ids]
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        if self.shared is not None and keys:
+            try:
+                with self.shared.pipeline() as pipe:
+                    for key in keys:
+                        pipe.hincrby(GENERATIONS_KEY, key, 1)
+                    pipe.execute()
+            except self.errors:
+                logger.warning("Could not publish membership changes", exc_info=True)
+
+    def invalidate_baby(self, baby_id: uuid.UUID, session: Session):
+        """Drops the entries of all the baby's members."""
+        self.invalidate(
+            *session.exec(
+                select(BabyMember.user_id).where(BabyMember.baby_id == baby_id)
+            ).all()
+        )
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+memberships = Memberships(settings.redis_url)
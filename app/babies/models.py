@@ -1,36 +1,94 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 from typing import Optional
-from sqlalchemy import event
-from sqlmodel import Field, SQLModel
+from sqlalchemy import Index, UniqueConstraint, event, insert, or_, select, text, update
+from sqlalchemy.orm import object_session
+from pydantic import EmailStr, field_validator
+from sqlmodel import Field, Session, SQLModel
 
-from app.database import TimestampMixin, update_timestamp
+from app.database import TimestampMixin, UTCDateTime, update_timestamp, utcnow
+from app.timezones import validate_timezone
 
 
 # Baby models
 class BabyBase(SQLModel):
-    birthdate: datetime
+    birthdate: datetime = Field(sa_type=UTCDateTime)
     name: str | None = Field(max_length=255)
+    # IANA name; None follows the user's time zone
+    timezone: str | None = Field(default=None, max_length=64)
+
+    _validate_timezone = field_validator("timezone")(validate_timezone)
 
 
 class Baby(BabyBase, TimestampMixin, table=True):
+    __table_args__ = (
+        Index(
+            "ix_baby_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE")
+    # Set on delete; the rows are then purged in the background (app/purge.py)
+    deleted_at: datetime | None = Field(default=None, sa_type=UTCDateTime)
+    # Bumped by every write to the baby or its events; keys cached responses
+    data_version: int = Field(default=0)
 
 
 class BabyCreate(BabyBase):
     pass
 
 
+# Baby members: the users who may access a baby (see app/babies/members.py)
+class MemberRole(str, Enum):
+    OWNER = "owner"  # the baby's user (Baby.user_id); manages the members
+    CAREGIVER = "caregiver"  # reads and writes the baby's events
+    VIEWER = "viewer"  # reads only
+
+
+class BabyMember(SQLModel, TimestampMixin, table=True):
+    __table_args__ = (
+        UniqueConstraint("baby_id", "user_id"),
+        Index("ix_babymember_user_id", "user_id"),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    baby_id: uuid.UUID = Field(foreign_key="baby.id", ondelete="CASCADE")
+    user_id: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE")
+    role: MemberRole
+
+
+class BabyMemberCreate(SQLModel):
+    email: EmailStr
+    role: MemberRole = MemberRole.CAREGIVER
+
+
+class BabyMemberUpdate(SQLModel):
+    role: MemberRole
+
+
+class BabyMemberRead(SQLModel):
+    user_id: uuid.UUID
+    email: str
+    role: MemberRole
+    created_at: datetime
+
+
 # Measurement models
 class MeasurementBase(SQLModel):
-    time: datetime | None = Field(default_factory=datetime.now)
+    time: datetime | None = Field(default_factory=utcnow, sa_type=UTCDateTime)
     height: int | None  # in centimeters
     weight: int | None  # in grams
 
 
 class Measurement(MeasurementBase, TimestampMixin, table=True):
+    __table_args__ = (
+        Index("ix_measurement_baby_id_updated_at", "baby_id", "updated_at"),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     baby_id: uuid.UUID = Field(foreign_key="baby.id")
 
@@ -39,16 +97,32 @@ class MeasurementCreate(MeasurementBase):
     pass
 
 
+class MeasurementRead(MeasurementBase, TimestampMixin):
+    id: uuid.UUID
+    baby_id: uuid.UUID
+
+
 # Diaper models
 class DiaperChangeBase(SQLModel):
-    time: datetime | None = Field(default_factory=datetime.now)
+    time: datetime = Field(default_factory=utcnow, sa_type=UTCDateTime)
     pipi: bool
     poop: bool
     used_cream: bool = Field(default=False)
 
 
 class DiaperChange(DiaperChangeBase, TimestampMixin, table=True):
+    # Partitioned by month on `time` (see app/partitions.py), which must be
+    # part of the primary key: load rows by id with statements.get_by_id
+    __table_args__ = (
+        Index("ix_diaperchange_baby_id_time", "baby_id", "time"),
+        Index("ix_diaperchange_baby_id_updated_at", "baby_id", "updated_at"),
+        {"postgresql_partition_by": "RANGE (time)"},
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    time: datetime = Field(
+        default_factory=utcnow, sa_type=UTCDateTime, primary_key=True
+    )
     baby_id: uuid.UUID = Field(foreign_key="baby.id")
 
 
@@ -56,6 +130,19 @@ class DiaperChangeCreate(DiaperChangeBase):
     pass
 
 
+class DiaperChangeRead(DiaperChangeBase, TimestampMixin):
+    id: uuid.UUID
+    baby_id: uuid.UUID
+
+
+# Events moved out of the hot table by app/archive.py, clustered per parent
+class DiaperChangeArchive(DiaperChangeBase, TimestampMixin, table=True):
+    __table_args__ = (Index("ix_diaperchangearchive_baby_id_time", "baby_id", "time"),)
+
+    id: uuid.UUID = Field(primary_key=True)
+    baby_id: uuid.UUID = Field(foreign_key="baby.id")
+
+
 # Feeding models
 class FeedingType(str, Enum):
     BREAST = "breast"
@@ -63,15 +150,25 @@ class FeedingType(str, Enum):
 
 
 class FeedingBase(SQLModel):
-    start_time: datetime | None = Field(default_factory=datetime.now)
-    end_time: datetime | None = Field(default=None)
+    start_time: datetime = Field(default_factory=utcnow, sa_type=UTCDateTime)
+    end_time: datetime | None = Field(default=None, sa_type=UTCDateTime)
     type: FeedingType
     left_breast: Optional[int] = Field(default=None)  # 1, 2, or NULL
     right_breast: Optional[int] = Field(default=None)  # 1, 2, or NULL
 
 
 class Feeding(FeedingBase, TimestampMixin, table=True):
+    # Partitioned by month on `start_time`; primary key is (id, start_time)
+    __table_args__ = (
+        Index("ix_feeding_baby_id_start_time", "baby_id", "start_time"),
+        Index("ix_feeding_baby_id_updated_at", "baby_id", "updated_at"),
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    start_time: datetime = Field(
+        default_factory=utcnow, sa_type=UTCDateTime, primary_key=True
+    )
     baby_id: uuid.UUID = Field(foreign_key="baby.id")
 
 
@@ -79,14 +176,39 @@ class FeedingCreate(FeedingBase):
     pass
 
 
+class FeedingRead(FeedingBase, TimestampMixin):
+    id: uuid.UUID
+    baby_id: uuid.UUID
+
+
+# Events moved out of the hot table by app/archive.py, clustered per parent
+class FeedingArchive(FeedingBase, TimestampMixin, table=True):
+    __table_args__ = (
+        Index("ix_feedingarchive_baby_id_start_time", "baby_id", "start_time"),
+    )
+
+    id: uuid.UUID = Field(primary_key=True)
+    baby_id: uuid.UUID = Field(foreign_key="baby.id")
+
+
 # Sleep models
 class SleepBase(SQLModel):
-    start_time: datetime | None = Field(default_factory=datetime.now)
-    end_time: datetime | None = Field(default=None)
+    start_time: datetime = Field(default_factory=utcnow, sa_type=UTCDateTime)
+    end_time: datetime | None = Field(default=None, sa_type=UTCDateTime)
 
 
 class Sleep(SleepBase, TimestampMixin, table=True):
+    # Partitioned by month on `start_time`; primary key is (id, start_time)
+    __table_args__ = (
+        Index("ix_sleep_baby_id_start_time", "baby_id", "start_time"),
+        Index("ix_sleep_baby_id_updated_at", "baby_id", "updated_at"),
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    start_time: datetime = Field(
+        default_factory=utcnow, sa_type=UTCDateTime, primary_key=True
+    )
     baby_id: uuid.UUID = Field(foreign_key="baby.id")
 
 
@@ -94,12 +216,29 @@ class SleepCreate(SleepBase):
     pass
 
 
+class SleepRead(SleepBase, TimestampMixin):
+    id: uuid.UUID
+    baby_id: uuid.UUID
+
+
+# Events moved out of the hot table by app/archive.py, clustered per parent
+class SleepArchive(SleepBase, TimestampMixin, table=True):
+    __table_args__ = (
+        Index("ix_sleeparchive_baby_id_start_time", "baby_id", "start_time"),
+    )
+
+    id: uuid.UUID = Field(primary_key=True)
+    baby_id: uuid.UUID = Field(foreign_key="baby.id")
+
+
 # Bath models
 class BathBase(SQLModel):
-    time: datetime | None = Field(default_factory=datetime.now)
+    time: datetime | None = Field(default_factory=utcnow, sa_type=UTCDateTime)
 
 
 class Bath(BathBase, TimestampMixin, table=True):
+    __table_args__ = (Index("ix_bath_baby_id_updated_at", "baby_id", "updated_at"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     baby_id: uuid.UUID = Field(foreign_key="baby.id")
 
@@ -108,6 +247,11 @@ class BathCreate(BathBase):
     pass
 
 
+class BathRead(BathBase, TimestampMixin):
+    id: uuid.UUID
+    baby_id: uuid.UUID
+
+
 # Medication models
 class MedicationBase(SQLModel):
     name: str = Field(max_length=255)
@@ -115,9 +259,14 @@ class MedicationBase(SQLModel):
     description: str | None = Field(max_length=255, default=None)
     is_active: bool = Field(default=True)
     is_vaccine: bool = Field(default=False)
+    interval_hours: int | None = Field(default=None, gt=0)  # for scheduled doses
 
 
 class Medication(MedicationBase, TimestampMixin, table=True):
+    __table_args__ = (
+        Index("ix_medication_baby_id_updated_at", "baby_id", "updated_at"),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     baby_id: uuid.UUID = Field(foreign_key="baby.id")
 
@@ -126,14 +275,31 @@ class MedicationCreate(MedicationBase):
     pass
 
 
+class MedicationRead(MedicationBase, TimestampMixin):
+    id: uuid.UUID
+    baby_id: uuid.UUID
+
+
 class MedicationLogsBase(SQLModel):
-    time: datetime | None = Field(default_factory=datetime.now)
+    time: datetime = Field(default_factory=utcnow, sa_type=UTCDateTime)
     dosage: float | None = Field(default=1)
     description: str | None = Field(max_length=255, default=None)
 
 
 class MedicationLogs(MedicationLogsBase, TimestampMixin, table=True):
+    # Partitioned by month on `time`; primary key is (id, time)
+    __table_args__ = (
+        Index("ix_medicationlogs_medication_id_time", "medication_id", "time"),
+        Index(
+            "ix_medicationlogs_medication_id_updated_at", "medication_id", "updated_at"
+        ),
+        {"postgresql_partition_by": "RANGE (time)"},
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    time: datetime = Field(
+        default_factory=utcnow, sa_type=UTCDateTime, primary_key=True
+    )
     medication_id: uuid.UUID = Field(foreign_key="medication.id")
 
 
@@ -141,7 +307,226 @@ class MedicationLogsCreate(MedicationLogsBase):
     pass
 
 
+class MedicationLogsRead(MedicationLogsBase, TimestampMixin):
+    id: uuid.UUID
+    medication_id: uuid.UUID
+
+
+# Events moved out of the hot table by app/archive.py, clustered per parent
+class MedicationLogsArchive(MedicationLogsBase, TimestampMixin, table=True):
+    __table_args__ = (
+        Index("ix_medicationlogsarchive_medication_id_time", "medication_id", "time"),
+    )
+
+    id: uuid.UUID = Field(primary_key=True)
+    medication_id: uuid.UUID = Field(foreign_key="medication.id")
+
+
+# Delta sync
+class Tombstone(SQLModel, table=True):
+    """Marks a deleted event, so clients syncing changes can drop it too."""
+
+    __table_args__ = (
+        Index("ix_tombstone_baby_id_deleted_at", "baby_id", "deleted_at"),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    baby_id: uuid.UUID = Field(foreign_key="baby.id", ondelete="CASCADE")
+    entity_type: str = Field(max_length=32)
+    entity_id: uuid.UUID
+    deleted_at: datetime = Field(default_factory=utcnow, sa_type=UTCDateTime)
+
+
+class TombstoneRead(SQLModel):
+    entity_type: str
+    entity_id: uuid.UUID
+    deleted_at: datetime
+
+
+class Changes(SQLModel):
+    cursor: datetime  # pass back as `since` on the next sync
+    measurements: list[MeasurementRead]
+    diapers: list[DiaperChangeRead]
+    feedings: list[FeedingRead]
+    sleeps: list[SleepRead]
+    baths: list[BathRead]
+    medications: list[MedicationRead]
+    medication_logs: list[MedicationLogsRead]
+    deleted: list[TombstoneRead]
+
+
+# Synced event type (the key in Changes) of each model
+SYNCED_TYPES = {
+    Measurement: "measurements",
+    DiaperChange: "diapers",
+    Feeding: "feedings",
+    Sleep: "sleeps",
+    Bath: "baths",
+    Medication: "medications",
+    MedicationLogs: "medication_logs",
+}
+
+
+def owning_baby_id(target):
+    """The baby of an event, as a SQL subquery for medication logs."""
+    if isinstance(target, MedicationLogs):
+        return (
+            select(Medication.baby_id)
+            .where(Medication.id == target.medication_id)
+            .scalar_subquery()
+        )
+    return target.baby_id
+
+
+# Only ORM deletes (session.delete) record a tombstone: bulk and Core deletes
+# (delete(Model), e.g. archiving or purging) bypass this hook, so the delta
+# sync never learns about those rows unless they record their own
+def record_tombstone(mapper, connection, target):
+    connection.execute(
+        insert(Tombstone).values(
+            id=uuid.uuid4(),
+            baby_id=owning_baby_id(target),
+            entity_type=SYNCED_TYPES[type(target)],
+            entity_id=target.id,
+            deleted_at=utcnow(),
+        )
+    )
+
+
+# Data versions: invalidate the cached responses of a baby (app/cache.py)
+#
+# Writes only note their baby in the session; the babies are bumped by one
+# UPDATE right before the transaction commits, which keeps the baby's row
+# locked (serializing its writers) for as short as possible.
+CHANGED_BABIES = "changed_baby_ids"
+CHANGED_MEDICATIONS = "changed_medication_ids"
+
+
+def note_data_change(mapper, connection, target):
+    info = object_session(target).info
+    if isinstance(target, MedicationLogs):
+        info.setdefault(CHANGED_MEDICATIONS, set()).add(target.medication_id)
+    else:
+        info.setdefault(CHANGED_BABIES, set()).add(target.baby_id)
+
+
+def bump_data_versions(session: Session):
+    # Commit flushes after this hook, so flush first to note every change
+    session.flush()
+    baby_ids = session.info.pop(CHANGED_BABIES, set())
+    medication_ids = session.info.pop(CHANGED_MEDICATIONS, set())
+    if not baby_ids and not medication_ids:
+        return
+
+    changed = Baby.id.in_(baby_ids)
+    if medication_ids:
+        changed = or_(
+            changed,
+            Baby.id.in_(
+                select(Medication.baby_id).where(Medication.id.in_(medication_ids))
+            ),
+        )
+    session.connection().execute(
+        update(Baby).where(changed).values(data_version=Baby.data_version + 1)
+    )
+
+
+def discard_data_changes(session: Session):
+    session.info.pop(CHANGED_BABIES, None)
+    session.info.pop(CHANGED_MEDICATIONS, None)
+
+
+def bump_own_data_version(mapper, connection, target):
+    target.data_version += 1
+
+
+# Family overview
+class MedicationDue(MedicationRead):
+    last_taken_at: datetime | None
+    next_due_at: datetime | None  # None when never taken: due now
+
+
+class BabyOverview(SQLModel):
+    baby: Baby
+    last_diaper: DiaperChangeRead | None
+    last_feeding: FeedingRead | None
+    last_sleep: SleepRead | None
+    is_sleeping: bool
+    next_medication: MedicationDue | None
+
+
+# Sleep stats
+class SleepDayTotals(SQLModel):
+    day: date  # local calendar day
+    day_minutes: float
+    night_minutes: float
+
+
+class SleepStats(SQLModel):
+    timezone: str
+    start: datetime
+    end: datetime
+    sessions: int
+    is_sleeping: bool
+    longest_stretch_minutes: float | None
+    longest_stretch_start: datetime | None
+    average_wake_window_minutes: float | None
+    day_minutes: float
+    night_minutes: float
+    average_daily_minutes: float
+    by_day: list[SleepDayTotals]
+
+
+# Medication adherence
+class MedicationAdherence(MedicationRead):
+    taken: int  # doses logged in the range
+    total_dosage: float
+    # Scheduled medications only (None without `interval_hours`)
+    on_time: int | None
+    late: int | None
+    early: int | None  # taken before the previous dose was due
+    missed: int | None
+    adherence: float | None  # on_time / (on_time + late + missed)
+
+
+class Adherence(SQLModel):
+    start: datetime
+    end: datetime
+    medications: list[MedicationAdherence]
+
+
+# Time series for charts
+class SeriesMetric(str, Enum):
+    FEEDINGS = "feedings"
+    DIAPERS = "diapers"
+    WET_DIAPERS = "wet_diapers"
+    DIRTY_DIAPERS = "dirty_diapers"
+    WEIGHT = "weight"  # average in the bucket, in grams
+    HEIGHT = "height"  # average in the bucket, in centimeters
+
+
+class SeriesBucket(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"  # starting on Monday
+
+
+class SeriesPoint(SQLModel):
+    start: datetime
+    value: float | None  # None: no measurement in the bucket
+
+
+class Series(SQLModel):
+    metric: SeriesMetric
+    bucket: SeriesBucket
+    timezone: str
+    start: datetime
+    end: datetime
+    points: list[SeriesPoint]
+
+
 event.listen(Baby, "before_update", update_timestamp)
+event.listen(BabyMember, "before_update", update_timestamp)
 event.listen(Measurement, "before_update", update_timestamp)
 event.listen(DiaperChange, "before_update", update_timestamp)
 event.listen(Feeding, "before_update", update_timestamp)
@@ -149,3 +534,18 @@ event.listen(Sleep, "before_update", update_timestamp)
 event.listen(Bath, "before_update", update_timestamp)
 event.listen(Medication, "before_update", update_timestamp)
 event.listen(MedicationLogs, "before_update", update_timestamp)
+
+event.listen(Baby, "before_update", bump_own_data_version)
+for model in SYNCED_TYPES:
+    for write in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, write, note_data_change)
+event.listen(Session, "before_commit", bump_data_versions)
+event.listen(Session, "after_rollback", discard_data_changes)
+
+event.listen(Measurement, "after_delete", record_tombstone)
+event.listen(DiaperChange, "after_delete", record_tombstone)
+event.listen(Feeding, "after_delete", record_tombstone)
+event.listen(Sleep, "after_delete", record_tombstone)
+event.listen(Bath, "after_delete", record_tombstone)
+event.listen(Medication, "after_delete", record_tombstone)
+event.listen(MedicationLogs, "after_delete", record_tombstone)
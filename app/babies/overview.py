@@ -0,0 +1,112 @@
+# Family overview: every baby with its latest events, in a single query
+#
+# Each "latest" is a LATERAL subquery ordered by the event time with LIMIT 1,
+# so it is one backward scan of the (parent, time) index per baby.
+from typing import Any
+
+from sqlalchemy import Row, Select, func, nulls_first, select, true
+from sqlalchemy.sql import Subquery
+
+from app.babies.members import member_baby_ids
+from app.babies.models import (
+    Baby,
+    BabyOverview,
+    DiaperChange,
+    DiaperChangeRead,
+    Feeding,
+    FeedingRead,
+    Medication,
+    MedicationLogs,
+    MedicationRead,
+    Sleep,
+    SleepRead,
+)
+from app.responses import read_columns
+
+
+def latest(model, schema, time, name: str) -> Subquery:
+    return (
+        select(*read_columns(model, schema))
+        .where(model.baby_id == Baby.id)
+        .order_by(time.desc())
+        .limit(1)
+        .lateral(name)
+    )
+
+
+def next_medication() -> Subquery:
+    """The baby's active scheduled medication that is due soonest."""
+    last_taken = (
+        select(MedicationLogs.time)
+        .where(MedicationLogs.medication_id == Medication.id)
+        .order_by(MedicationLogs.time.desc())
+        .limit(1)
+        .lateral("last_taken")
+    )
+    next_due = (
+        last_taken.c.time + func.make_interval(0, 0, 0, 0, Medication.interval_hours)
+    ).label("next_due_at")
+    return (
+        select(
+            *read_columns(Medication, MedicationRead),
+            last_taken.c.time.label("last_taken_at"),
+            next_due,
+        )
+        .select_from(Medication)
+        .outerjoin(last_taken, true())
+        .where(
+            Medication.baby_id == Baby.id,
+            Medication.is_active,
+            Medication.interval_hours.is_not(None),
+        )
+        .order_by(nulls_first(next_due.asc()))
+        .limit(1)
+        .lateral("next_medication")
+    )
+
+
+OVERVIEW_PARTS = {
+    "last_diaper": lambda: latest(
+        DiaperChange, DiaperChangeRead, DiaperChange.time, "last_diaper"
+    ),
+    "last_feeding": lambda: latest(
+        Feeding, FeedingRead, Feeding.start_time, "last_feeding"
+    ),
+    "last_sleep": lambda: latest(Sleep, SleepRead, Sleep.start_time, "last_sleep"),
+    "next_medication": next_medication,
+}
+
+
+def select_overview(user_id) -> tuple[Select, dict[str, Subquery]]:
+    parts = {name: build() for name, build in OVERVIEW_PARTS.items()}
+
+    columns, joined = [], Baby.__table__
+    for name, part in parts.items():
+        columns += [column.label(f"{name}__{column.key}") for column in part.c]
+        joined = joined.outerjoin(part, true())
+
+    statement = (
+        select(Baby, *columns)
+        .select_from(joined)
+        .where(Baby.id.in_(member_baby_ids(user_id)), Baby.deleted_at.is_(None))
+        .order_by(Baby.created_at)
+    )
+    return statement, parts
+
+
+def overview_from_row(row: Row[Any], parts: dict[str, Subquery]) -> BabyOverview:
+    mapping = row._mapping
+    nested = {}
+    for name, part in parts.items():
+        values = {column.key: mapping[f"{name}__{column.key}"] for column in part.c}
+        nested[name] = values if values["id"] is not None else None
+
+    last_sleep = nested["last_sleep"]
+    return BabyOverview(
+        baby=row[0],
+        last_diaper=nested["last_diaper"],
+        last_feeding=nested["last_feeding"],
+        last_sleep=last_sleep,
+        is_sleeping=last_sleep is not None and last_sleep["end_time"] is None,
+        next_medication=nested["next_medication"],
+    )
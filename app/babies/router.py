@@ -1,35 +1,142 @@
+import hashlib
+import uuid
+from datetime import datetime, timedelta
 from typing import Annotated, List
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlmodel import select
-
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from sqlmodel import Session, SQLModel, select
+
+from app.archive import read_events
+from app.babies.analytics import (
+    DEFAULT_ADHERENCE_SPAN,
+    DEFAULT_SERIES_SPANS,
+    MAX_ADHERENCE_DAYS,
+    MAX_SERIES_POINTS,
+    MAX_SLEEP_STATS_DAYS,
+    adherence_from_row,
+    baby_state,
+    select_adherence,
+    select_series,
+    select_sleep_stats,
+    series_slots,
+    sleep_stats_from_rows,
+)
+from app.babies.members import WRITER_ROLES, member_baby_ids, memberships
 from app.babies.models import (
+    Adherence,
     Baby,
     BabyCreate,
+    BabyMember,
+    BabyMemberCreate,
+    BabyMemberRead,
+    BabyMemberUpdate,
+    BabyOverview,
     Bath,
     BathCreate,
+    BathRead,
+    Changes,
     DiaperChange,
     DiaperChangeCreate,
+    DiaperChangeRead,
     Feeding,
     FeedingCreate,
+    FeedingRead,
     Measurement,
     MeasurementCreate,
+    MeasurementRead,
     Medication,
     MedicationCreate,
+    MedicationRead,
     MedicationLogs,
     MedicationLogsCreate,
+    MedicationLogsRead,
+    MemberRole,
+    Series,
+    SeriesBucket,
+    SeriesMetric,
     Sleep,
     SleepCreate,
+    SleepRead,
+    SleepStats,
 )
-from app.database import SessionDep
-from app.oauth2 import CurrentUserDep
+from app.babies.overview import overview_from_row, select_overview
+from app.babies.sync import select_changes
+from app.cache import cache_key, response_cache
+from app.compression import CompressedRoute
+from app.config import settings
+from app.database import ReadSessionDep, SessionDep, as_utc, utcnow
+from app.group_commit import event_writer
+from app.idempotency import IdempotentRoute
+from app.oauth2 import CurrentClaimsDep, CurrentUserDep, compact_id, token_versions
+from app.purge import schedule_baby_purge
+from app.responses import FastJSONResponse, RowsResponse, read_columns, row_dicts
+from app.statements import get_by_id
+from app.users.models import User
+
+
+class BabiesRoute(CompressedRoute, IdempotentRoute):
+    pass
 
-router = APIRouter(prefix="/babies", tags=["Babies"])
 
+router = APIRouter(prefix="/babies", tags=["Babies"], route_class=BabiesRoute)
 
-def is_baby_owner(id: str, user: CurrentUserDep, session: SessionDep):
-    baby = session.get(Baby, id)
-    if not baby or baby.user_id != user.id:
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+def member_role(
+    id: str, claims: CurrentClaimsDep, session: SessionDep
+) -> tuple[uuid.UUID, MemberRole]:
+    """The baby's id and the user's role."""
+    try:
+        baby_id = uuid.UUID(id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Baby not found"
+        )
+
+    role = memberships.role(claims.id, baby_id, session)
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Baby not found"
+        )
+
+    return baby_id, role
+
+
+MemberRoleDep = Annotated[tuple[uuid.UUID, MemberRole], Depends(member_role)]
+
+
+def baby_member(member: MemberRoleDep, request: Request):
+    """Like member_role, but viewers may only read."""
+    if member[1] not in WRITER_ROLES and request.method not in READ_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Read-only access"
+        )
+
+    return member
+
+
+BabyMemberDep = Annotated[tuple[uuid.UUID, MemberRole], Depends(baby_member)]
+
+
+def is_baby_owner(member: BabyMemberDep, request: Request, session: SessionDep):
+    """Loads the baby; only its owner may change it, any member may read it."""
+    baby_id, role = member
+    if role != MemberRole.OWNER and request.method not in READ_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Only the owner may do this"
+        )
+
+    baby = get_by_id(session, Baby, baby_id)
+    if not baby or baby.deleted_at:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Baby not found"
         )
@@ -40,9 +147,38 @@ def is_baby_owner(id: str, user: CurrentUserDep, session: SessionDep):
 BabyOwnerDep = Annotated[Baby, Depends(is_baby_owner)]
 
 
-def medication_owner(medication_id: str, baby: BabyOwnerDep, session: SessionDep):
-    medication = session.get(Medication, medication_id)
-    if not medication or medication.baby_id != baby.id:
+def authorized_baby_id(
+    id: str, request: Request, claims: CurrentClaimsDep, session: SessionDep
+) -> uuid.UUID:
+    """Authorizes access to a baby's events, from the token's claims when possible.
+
+    Falls back to the user's memberships (baby_member) when the token carries
+    no baby claims, predates the baby or the user is a viewer. Claims may
+    outlive the baby until the revocation propagates, so writes check it is
+    not deleted.
+    """
+    try:
+        baby_id = uuid.UUID(id)
+    except ValueError:
+        baby_id = None
+    if baby_id is not None and compact_id(baby_id) in claims.babies:
+        if request.method in READ_METHODS:
+            return baby_id
+        baby = get_by_id(session, Baby, baby_id)
+        if baby is None or baby.deleted_at:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Baby not found"
+            )
+        return baby_id
+    return baby_member(member_role(id, claims, session), request)[0]
+
+
+BabyIdDep = Annotated[uuid.UUID, Depends(authorized_baby_id)]
+
+
+def medication_owner(medication_id: str, baby_id: BabyIdDep, session: SessionDep):
+    medication = get_by_id(session, Medication, medication_id)
+    if not medication or medication.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Medication not found"
         )
@@ -53,31 +189,74 @@ def medication_owner(medication_id: str, baby: BabyOwnerDep, session: SessionDep
 MedicationOwnerDep = Annotated[Medication, Depends(medication_owner)]
 
 
+def add_event(session: Session, event: SQLModel, baby_id: uuid.UUID):
+    """Inserts a new high-frequency event, grouped when group commit is on."""
+    if settings.group_commit_enabled:
+        # Hand the request's pooled connection back first: waiting on the
+        # writer while holding it could leave the writer without one
+        session.close()
+        event_writer.insert(event, baby_id)
+        return event
+
+    session.add(event)
+    session.commit()
+    session.refresh(event)
+    return event
+
+
 # Baby CRUD
 @router.get("/", response_model=List[Baby])
 def read_babies(
-    user: CurrentUserDep,
-    session: SessionDep,
+    claims: CurrentClaimsDep,
+    session: ReadSessionDep,
     offset: int = 0,
     limit: Annotated[int, Query(le=100)] = 100,
 ):
     babies = session.exec(
-        select(Baby).where(Baby.user_id == user.id).offset(offset).limit(limit)
+        select(Baby)
+        .where(Baby.id.in_(member_baby_ids(claims.id)), Baby.deleted_at.is_(None))
+        .offset(offset)
+        .limit(limit)
     ).all()
     return babies
 
 
+# Declared before "/{id}" so "overview" is not taken for a baby id
+@router.get("/overview", response_model=List[BabyOverview])
+def read_overview(claims: CurrentClaimsDep, session: ReadSessionDep):
+    """Every baby of the user with its latest events, in one query."""
+    # Versioned by the data versions of all the user's babies
+    versions = session.exec(
+        select(Baby.id, Baby.data_version)
+        .where(Baby.id.in_(member_baby_ids(claims.id)), Baby.deleted_at.is_(None))
+        .order_by(Baby.id)
+    ).all()
+    version = hashlib.sha1(repr(versions).encode()).hexdigest()[:16]
+
+    def build():
+        statement, parts = select_overview(claims.id)
+        return [overview_from_row(row, parts) for row in session.exec(statement)]
+
+    return response_cache.respond(cache_key(claims.id, version, "overview"), build)
+
+
 @router.get("/{id}", response_model=Baby)
 def read_baby(baby: BabyOwnerDep):
     return baby
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=Baby)
-def create_baby(baby: BabyCreate, session: SessionDep, user: CurrentUserDep):
-    new_baby = Baby(**baby.model_dump(), user_id=user.id)
+def create_baby(baby: BabyCreate, session: SessionDep, claims: CurrentClaimsDep):
+    new_baby = Baby(**baby.model_dump(), user_id=uuid.UUID(claims.id))
     valid_baby = Baby.model_validate(new_baby)
     session.add(valid_baby)
+    session.add(
+        BabyMember(
+            baby_id=valid_baby.id, user_id=valid_baby.user_id, role=MemberRole.OWNER
+        )
+    )
     session.commit()
+    memberships.invalidate(claims.id)
     session.refresh(valid_baby)
     return valid_baby
 
@@ -87,6 +266,7 @@ def create_baby(baby: BabyCreate, session: SessionDep, user: CurrentUserDep):
 def update_baby(baby: BabyCreate, existing_baby: BabyOwnerDep, session: SessionDep):
     existing_baby.birthdate = baby.birthdate
     existing_baby.name = baby.name
+    existing_baby.timezone = baby.timezone
 
     Baby.model_validate(existing_baby, strict=True)
 
@@ -97,26 +277,254 @@ def update_baby(baby: BabyCreate, existing_baby: BabyOwnerDep, session: SessionD
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_baby(session: SessionDep, baby: BabyOwnerDep) -> None:
-    session.delete(baby)
+def delete_baby(
+    session: SessionDep, baby: BabyOwnerDep, user: CurrentUserDep, response: Response
+) -> None:
+    # Hidden right away; its events are purged by a job (app/purge.py)
+    baby.deleted_at = utcnow()
+    session.add(baby)
+    job = schedule_baby_purge(session, baby, user.id)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    # Tokens listing this baby in their claims must not authorize it anymore
+    writers = session.exec(
+        select(User).where(
+            User.id.in_(
+                select(BabyMember.user_id).where(
+                    BabyMember.baby_id == baby.id, BabyMember.role.in_(WRITER_ROLES)
+                )
+            )
+        )
+    ).all()
+    for writer in writers:
+        token_versions.bump(writer, session)
+        session.add(writer)
     session.commit()
+    memberships.invalidate_baby(baby.id, session)
 
 
-# Diaper CRUD
-@router.get("/{id}/diapers", response_model=List[DiaperChange])
-def get_diapers(
-    id: str,
+# Baby members, managed by the owner
+def member_not_found():
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND, detail="Member not found"
+    )
+
+
+@router.get("/{id}/members", response_model=List[BabyMemberRead])
+def read_members(member: BabyMemberDep, session: ReadSessionDep):
+    baby_id, _ = member
+    rows = session.exec(
+        select(BabyMember.user_id, User.email, BabyMember.role, BabyMember.created_at)
+        .join(User, User.id == BabyMember.user_id)
+        .where(BabyMember.baby_id == baby_id)
+        .order_by(BabyMember.created_at)
+    )
+    return [BabyMemberRead(**row._mapping) for row in rows]
+
+
+@router.post(
+    "/{id}/members",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BabyMemberRead,
+)
+def add_member(member: BabyMemberCreate, baby: BabyOwnerDep, session: SessionDep):
+    if member.role == MemberRole.OWNER:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="A baby has a single owner",
+        )
+    user = session.exec(select(User).where(User.email == member.email)).first()
+    if not user or user.deleted_at:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    existing = session.exec(
+        select(BabyMember.id).where(
+            BabyMember.baby_id == baby.id, BabyMember.user_id == user.id
+        )
+    ).first()
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Already a member"
+        )
+
+    new_member = BabyMember(baby_id=baby.id, user_id=user.id, role=member.role)
+    session.add(new_member)
+    session.commit()
+    memberships.invalidate(user.id)
+    session.refresh(new_member)
+    return BabyMemberRead(
+        user_id=user.id,
+        email=user.email,
+        role=new_member.role,
+        created_at=new_member.created_at,
+    )
+
+
+def load_member(baby_id: uuid.UUID, user_id: str, session: SessionDep) -> BabyMember:
+    try:
+        user_id = uuid.UUID(user_id)
+    except ValueError:
+        raise member_not_found()
+    member = session.exec(
+        select(BabyMember).where(
+            BabyMember.baby_id == baby_id, BabyMember.user_id == user_id
+        )
+    ).first()
+    if not member:
+        raise member_not_found()
+    return member
+
+
+@router.patch("/{id}/members/{user_id}", response_model=BabyMemberRead)
+def update_member(
+    user_id: str, update: BabyMemberUpdate, baby: BabyOwnerDep, session: SessionDep
+):
+    """Changes a member's role (owner only).
+
+    Without Redis (`redis_url`), other server workers may apply the previous
+    role for up to `membership_cache_seconds` (30 s by default).
+    """
+    member = load_member(baby.id, user_id, session)
+    if MemberRole.OWNER in (member.role, update.role):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The owner's role can't change",
+        )
+
+    user = session.get(User, member.user_id)
+    if member.role in WRITER_ROLES and update.role not in WRITER_ROLES:
+        # Its tokens may list the baby as writable
+        token_versions.bump(user, session)
+        session.add(user)
+    member.role = update.role
+    session.add(member)
+    session.commit()
+    memberships.invalidate(member.user_id)
+    session.refresh(member)
+    return BabyMemberRead(
+        user_id=user.id,
+        email=user.email,
+        role=member.role,
+        created_at=member.created_at,
+    )
+
+
+# The owner removes a member, or a member leaves
+@router.delete("/{id}/members/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_member(
+    user_id: str,
+    access: MemberRoleDep,
+    claims: CurrentClaimsDep,
     session: SessionDep,
-    user: CurrentUserDep,
+) -> None:
+    """Removes a member (owner), or leaves the baby (the member themselves).
+
+    Without Redis (`redis_url`), other server workers may keep the removed
+    member's access for up to `membership_cache_seconds` (30 s by default).
+    """
+    baby_id, role = access
+    member = load_member(baby_id, user_id, session)
+    if role != MemberRole.OWNER and str(member.user_id) != claims.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Only the owner may do this"
+        )
+    if member.role == MemberRole.OWNER:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="The owner can't be removed"
+        )
+
+    if member.role in WRITER_ROLES:
+        user = session.get(User, member.user_id)
+        token_versions.bump(user, session)
+        session.add(user)
+    session.delete(member)
+    session.commit()
+    memberships.invalidate(member.user_id)
+
+
+# Delta sync
+@router.get("/{id}/changes", response_model=Changes)
+def read_changes(
+    baby_id: BabyIdDep, session: SessionDep, since: datetime | None = None
+):
+    """Events created, updated or deleted since the previous sync's cursor.
+
+    Without `since`, returns every event (a full sync) and no deletions.
+    Read from the primary: the cursor is the server's clock, and a lagging
+    replica would return it past changes it has not replayed yet, which the
+    next sync would then skip.
+    """
+    return FastJSONResponse(select_changes(session, baby_id, since))
+
+
+# Time series for charts
+@router.get("/{id}/series", response_model=Series)
+def get_series(
+    baby_id: BabyIdDep,
+    session: ReadSessionDep,
+    metric: SeriesMetric,
+    bucket: SeriesBucket = SeriesBucket.DAY,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
 ):
-    current_baby = session.get(Baby, id)
-    if not current_baby or current_baby.user_id != user.id:
+    """One point per local hour, day or week in [from, to), gaps included.
+
+    Defaults to the range ending now and spanning 2 days of hours, 30 days or
+    26 weeks. At most MAX_SERIES_POINTS points are returned.
+    """
+    end = as_utc(to) if to else utcnow()
+    start = as_utc(from_) if from_ else end - DEFAULT_SERIES_SPANS[bucket]
+    if start >= end:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Baby not found"
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="`from` must be before `to`",
+        )
+
+    timezone_name, version = baby_state(session, baby_id)
+    first, last, points = series_slots(start, end, bucket, timezone_name)
+    if points > MAX_SERIES_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"The range spans {points} buckets, over {MAX_SERIES_POINTS}: "
+            "use a bigger bucket or a shorter range",
+        )
+
+    def build():
+        statement = select_series(
+            baby_id, metric, bucket, first, last, end, timezone_name
         )
+        return Series(
+            metric=metric,
+            bucket=bucket,
+            timezone=timezone_name,
+            start=start,
+            end=end,
+            points=row_dicts(session.exec(statement).all()),
+        )
+
+    key = cache_key(
+        baby_id,
+        version,
+        "series",
+        metric=metric.value,
+        bucket=bucket.value,
+        start=from_ or "",
+        end=to or "",
+        tz=timezone_name,
+    )
+    return response_cache.respond(key, build)
+
 
-    diapers = session.exec(select(DiaperChange).where(DiaperChange.baby_id == id)).all()
-    return diapers
+# Diaper CRUD
+@router.get("/{id}/diapers", response_model=List[DiaperChangeRead])
+def get_diapers(
+    baby_id: BabyIdDep,
+    session: ReadSessionDep,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+):
+    diapers = read_events(session, DiaperChange, DiaperChangeRead, baby_id, from_, to)
+    return RowsResponse(diapers)
 
 
 @router.post(
@@ -125,25 +533,22 @@ def get_diapers(
 def add_diaper_change(
     diaper: DiaperChangeCreate,
     session: SessionDep,
-    baby: BabyOwnerDep,
+    baby_id: BabyIdDep,
 ):
-    new_diaper = DiaperChange(**diaper.model_dump(), baby_id=baby.id)
+    new_diaper = DiaperChange(**diaper.model_dump(), baby_id=baby_id)
     valid_diaper = DiaperChange.model_validate(new_diaper)
-    session.add(valid_diaper)
-    session.commit()
-    session.refresh(valid_diaper)
-    return valid_diaper
+    return add_event(session, valid_diaper, baby_id)
 
 
 @router.patch("/{id}/diapers/{diaper_id}", response_model=DiaperChange)
 def update_diaper_change(
     diaper: DiaperChangeCreate,
     diaper_id: str,
-    baby: BabyOwnerDep,
+    baby_id: BabyIdDep,
     session: SessionDep,
 ):
-    existing_diaper = session.get(DiaperChange, diaper_id)
-    if not existing_diaper or existing_diaper.baby_id != baby.id:
+    existing_diaper = get_by_id(session, DiaperChange, diaper_id)
+    if not existing_diaper or existing_diaper.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Diaper change not found"
         )
@@ -162,9 +567,9 @@ def update_diaper_change(
 
 
 @router.delete("/{id}/diapers/{diaper_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_diaper_change(session: SessionDep, diaper_id: str, baby: BabyOwnerDep):
-    diaper = session.get(DiaperChange, diaper_id)
-    if not diaper or diaper.baby_id != baby.id:
+def delete_diaper_change(session: SessionDep, diaper_id: str, baby_id: BabyIdDep):
+    diaper = get_by_id(session, DiaperChange, diaper_id)
+    if not diaper or diaper.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Diaper change not found"
         )
@@ -174,30 +579,32 @@ def delete_diaper_change(session: SessionDep, diaper_id: str, baby: BabyOwnerDep
 
 
 # Feeding CRUD
-@router.get("/{id}/feedings", response_model=List[Feeding])
-def get_feedings(baby: BabyOwnerDep, session: SessionDep):
-    feedings = session.exec(select(Feeding).where(Feeding.baby_id == baby.id)).all()
-    return feedings
+@router.get("/{id}/feedings", response_model=List[FeedingRead])
+def get_feedings(
+    baby_id: BabyIdDep,
+    session: ReadSessionDep,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+):
+    feedings = read_events(session, Feeding, FeedingRead, baby_id, from_, to)
+    return RowsResponse(feedings)
 
 
 @router.post(
     "/{id}/feedings", status_code=status.HTTP_201_CREATED, response_model=Feeding
 )
-def add_feeding(feeding: FeedingCreate, baby: BabyOwnerDep, session: SessionDep):
-    new_feeding = Feeding(**feeding.model_dump(), baby_id=baby.id)
+def add_feeding(feeding: FeedingCreate, baby_id: BabyIdDep, session: SessionDep):
+    new_feeding = Feeding(**feeding.model_dump(), baby_id=baby_id)
     valid_feeding = Feeding.model_validate(new_feeding)
-    session.add(valid_feeding)
-    session.commit()
-    session.refresh(valid_feeding)
-    return valid_feeding
+    return add_event(session, valid_feeding, baby_id)
 
 
 @router.patch("/{id}/feedings/{feeding_id}", response_model=Feeding)
 def update_feeding(
-    feeding: FeedingCreate, feeding_id: str, baby: BabyOwnerDep, session: SessionDep
+    feeding: FeedingCreate, feeding_id: str, baby_id: BabyIdDep, session: SessionDep
 ):
-    existing_feeding = session.get(Feeding, feeding_id)
-    if not existing_feeding or existing_feeding.baby_id != baby.id:
+    existing_feeding = get_by_id(session, Feeding, feeding_id)
+    if not existing_feeding or existing_feeding.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Feeding not found"
         )
@@ -217,9 +624,9 @@ def update_feeding(
 
 
 @router.delete("/{id}/feedings/{feeding_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_feeding(session: SessionDep, feeding_id: str, baby: BabyOwnerDep):
-    feeding = session.get(Feeding, feeding_id)
-    if not feeding or feeding.baby_id != baby.id:
+def delete_feeding(session: SessionDep, feeding_id: str, baby_id: BabyIdDep):
+    feeding = get_by_id(session, Feeding, feeding_id)
+    if not feeding or feeding.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Feeding not found"
         )
@@ -229,12 +636,14 @@ def delete_feeding(session: SessionDep, feeding_id: str, baby: BabyOwnerDep):
 
 
 # Measurements CRUD
-@router.get("/{id}/measurements", response_model=List[Measurement])
-def get_measurements(baby: BabyOwnerDep, session: SessionDep):
+@router.get("/{id}/measurements", response_model=List[MeasurementRead])
+def get_measurements(baby_id: BabyIdDep, session: ReadSessionDep):
     measurements = session.exec(
-        select(Measurement).where(Measurement.baby_id == baby.id)
+        select(*read_columns(Measurement, MeasurementRead)).where(
+            Measurement.baby_id == baby_id
+        )
     ).all()
-    return measurements
+    return RowsResponse(measurements)
 
 
 @router.post(
@@ -243,9 +652,9 @@ def get_measurements(baby: BabyOwnerDep, session: SessionDep):
     response_model=Measurement,
 )
 def create_measurement(
-    measurement: MeasurementCreate, baby: BabyOwnerDep, session: SessionDep
+    measurement: MeasurementCreate, baby_id: BabyIdDep, session: SessionDep
 ):
-    new_measurement = Measurement(**measurement.model_dump(), baby_id=baby.id)
+    new_measurement = Measurement(**measurement.model_dump(), baby_id=baby_id)
     valid_measurement = Measurement.model_validate(new_measurement)
     session.add(valid_measurement)
     session.commit()
@@ -257,11 +666,11 @@ def create_measurement(
 def update_measurement(
     measurement: MeasurementCreate,
     measurement_id: str,
-    baby: BabyOwnerDep,
+    baby_id: BabyIdDep,
     session: SessionDep,
 ):
-    existing_measurement = session.get(Measurement, measurement_id)
-    if not existing_measurement or existing_measurement.baby_id != baby.id:
+    existing_measurement = get_by_id(session, Measurement, measurement_id)
+    if not existing_measurement or existing_measurement.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Measurement not found"
         )
@@ -281,9 +690,9 @@ def update_measurement(
 @router.delete(
     "/{id}/measurements/{measurement_id}", status_code=status.HTTP_204_NO_CONTENT
 )
-def delete_measurement(session: SessionDep, measurement_id: str, baby: BabyOwnerDep):
-    measurement = session.get(Measurement, measurement_id)
-    if not measurement or measurement.baby_id != baby.id:
+def delete_measurement(session: SessionDep, measurement_id: str, baby_id: BabyIdDep):
+    measurement = get_by_id(session, Measurement, measurement_id)
+    if not measurement or measurement.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Measurement not found"
         )
@@ -293,15 +702,43 @@ def delete_measurement(session: SessionDep, measurement_id: str, baby: BabyOwner
 
 
 # Sleeps CRUD
-@router.get("/{id}/sleeps", response_model=List[Sleep])
-def get_sleeps(baby: BabyOwnerDep, session: SessionDep):
-    sleeps = session.exec(select(Sleep).where(Sleep.baby_id == baby.id)).all()
-    return sleeps
+@router.get("/{id}/sleeps/stats", response_model=SleepStats)
+def get_sleep_stats(
+    baby_id: BabyIdDep,
+    session: ReadSessionDep,
+    days: Annotated[int, Query(ge=1, le=MAX_SLEEP_STATS_DAYS)] = 7,
+):
+    """Sleep totals of the last `days` local days (today included).
+
+    Sleeps crossing midnight or the night bounds (19:00 to 07:00) are split
+    between the days and periods they overlap. An ongoing sleep counts until
+    now.
+    """
+    timezone_name, version = baby_state(session, baby_id)
+
+    def build():
+        statement, start, end = select_sleep_stats(baby_id, days, timezone_name)
+        rows = session.exec(statement).all()
+        return sleep_stats_from_rows(rows, timezone_name, start, end)
+
+    key = cache_key(baby_id, version, "sleeps/stats", days=days, tz=timezone_name)
+    return response_cache.respond(key, build)
+
+
+@router.get("/{id}/sleeps", response_model=List[SleepRead])
+def get_sleeps(
+    baby_id: BabyIdDep,
+    session: ReadSessionDep,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+):
+    sleeps = read_events(session, Sleep, SleepRead, baby_id, from_, to)
+    return RowsResponse(sleeps)
 
 
 @router.post("/{id}/sleeps", status_code=status.HTTP_201_CREATED, response_model=Sleep)
-def create_sleep(sleep: SleepCreate, baby: BabyOwnerDep, session: SessionDep):
-    new_sleep = Sleep(**sleep.model_dump(), baby_id=baby.id)
+def create_sleep(sleep: SleepCreate, baby_id: BabyIdDep, session: SessionDep):
+    new_sleep = Sleep(**sleep.model_dump(), baby_id=baby_id)
     valid_sleep = Sleep.model_validate(new_sleep)
     session.add(valid_sleep)
     session.commit()
@@ -311,10 +748,10 @@ def create_sleep(sleep: SleepCreate, baby: BabyOwnerDep, session: SessionDep):
 
 @router.patch("/{id}/sleeps/{sleep_id}", response_model=Sleep)
 def update_sleep(
-    sleep: SleepCreate, sleep_id: str, baby: BabyOwnerDep, session: SessionDep
+    sleep: SleepCreate, sleep_id: str, baby_id: BabyIdDep, session: SessionDep
 ):
-    existing_sleep = session.get(Sleep, sleep_id)
-    if not existing_sleep or existing_sleep.baby_id != baby.id:
+    existing_sleep = get_by_id(session, Sleep, sleep_id)
+    if not existing_sleep or existing_sleep.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Sleep not found"
         )
@@ -331,9 +768,9 @@ def update_sleep(
 
 
 @router.delete("/{id}/sleeps/{sleep_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_sleep(session: SessionDep, sleep_id: str, baby: BabyOwnerDep):
-    sleep = session.get(Sleep, sleep_id)
-    if not sleep or sleep.baby_id != baby.id:
+def delete_sleep(session: SessionDep, sleep_id: str, baby_id: BabyIdDep):
+    sleep = get_by_id(session, Sleep, sleep_id)
+    if not sleep or sleep.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Sleep not found"
         )
@@ -343,15 +780,17 @@ def delete_sleep(session: SessionDep, sleep_id: str, baby: BabyOwnerDep):
 
 
 # Bath CRUD
-@router.get("/{id}/baths", response_model=List[Bath])
-def get_baths(baby: BabyOwnerDep, session: SessionDep):
-    baths = session.exec(select(Bath).where(Bath.baby_id == baby.id)).all()
-    return baths
+@router.get("/{id}/baths", response_model=List[BathRead])
+def get_baths(baby_id: BabyIdDep, session: ReadSessionDep):
+    baths = session.exec(
+        select(*read_columns(Bath, BathRead)).where(Bath.baby_id == baby_id)
+    ).all()
+    return RowsResponse(baths)
 
 
 @router.post("/{id}/baths", status_code=status.HTTP_201_CREATED, response_model=Bath)
-def create_bath(bath: BathCreate, baby: BabyOwnerDep, session: SessionDep):
-    new_bath = Bath(**bath.model_dump(), baby_id=baby.id)
+def create_bath(bath: BathCreate, baby_id: BabyIdDep, session: SessionDep):
+    new_bath = Bath(**bath.model_dump(), baby_id=baby_id)
     valid_bath = Bath.model_validate(new_bath)
     session.add(valid_bath)
     session.commit()
@@ -361,10 +800,10 @@ def create_bath(bath: BathCreate, baby: BabyOwnerDep, session: SessionDep):
 
 @router.patch("/{id}/baths/{bath_id}", response_model=Bath)
 def update_bath(
-    bath: BathCreate, bath_id: str, baby: BabyOwnerDep, session: SessionDep
+    bath: BathCreate, bath_id: str, baby_id: BabyIdDep, session: SessionDep
 ):
-    existing_bath = session.get(Bath, bath_id)
-    if not existing_bath or existing_bath.baby_id != baby.id:
+    existing_bath = get_by_id(session, Bath, bath_id)
+    if not existing_bath or existing_bath.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bath not found"
         )
@@ -380,9 +819,9 @@ def update_bath(
 
 
 @router.delete("/{id}/baths/{bath_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_bath(session: SessionDep, bath_id: str, baby: BabyOwnerDep):
-    bath = session.get(Bath, bath_id)
-    if not bath or bath.baby_id != baby.id:
+def delete_bath(session: SessionDep, bath_id: str, baby_id: BabyIdDep):
+    bath = get_by_id(session, Bath, bath_id)
+    if not bath or bath.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bath not found"
         )
@@ -392,21 +831,59 @@ def delete_bath(session: SessionDep, bath_id: str, baby: BabyOwnerDep):
 
 
 # Medications CRUD
-@router.get("/{id}/medications", response_model=List[Medication])
-def get_medications(baby: BabyOwnerDep, session: SessionDep):
+@router.get("/{id}/medications/adherence", response_model=Adherence)
+def get_medication_adherence(
+    baby_id: BabyIdDep,
+    session: ReadSessionDep,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+):
+    """On-time, late, early and missed doses of the active medications.
+
+    Defaults to the last 30 days. Medications without `interval_hours` only
+    report the doses taken.
+    """
+    end = as_utc(to) if to else utcnow()
+    start = as_utc(from_) if from_ else end - DEFAULT_ADHERENCE_SPAN
+    if not timedelta(0) < end - start <= timedelta(days=MAX_ADHERENCE_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"`from` must be before `to`, by {MAX_ADHERENCE_DAYS} days at most",
+        )
+
+    _, version = baby_state(session, baby_id)
+
+    def build():
+        rows = session.exec(select_adherence(baby_id, start, end)).all()
+        return Adherence(
+            start=start,
+            end=end,
+            medications=[adherence_from_row(row) for row in rows],
+        )
+
+    key = cache_key(
+        baby_id, version, "medications/adherence", start=from_ or "", end=to or ""
+    )
+    return response_cache.respond(key, build)
+
+
+@router.get("/{id}/medications", response_model=List[MedicationRead])
+def get_medications(baby_id: BabyIdDep, session: ReadSessionDep):
     medications = session.exec(
-        select(Medication).where(Medication.baby_id == baby.id)
+        select(*read_columns(Medication, MedicationRead)).where(
+            Medication.baby_id == baby_id
+        )
     ).all()
-    return medications
+    return RowsResponse(medications)
 
 
 @router.post(
     "/{id}/medications", status_code=status.HTTP_201_CREATED, response_model=Medication
 )
 def create_medication(
-    medication: MedicationCreate, baby: BabyOwnerDep, session: SessionDep
+    medication: MedicationCreate, baby_id: BabyIdDep, session: SessionDep
 ):
-    new_medication = Medication(**medication.model_dump(), baby_id=baby.id)
+    new_medication = Medication(**medication.model_dump(), baby_id=baby_id)
     valid_medication = Medication.model_validate(new_medication)
     session.add(valid_medication)
     session.commit()
@@ -418,11 +895,11 @@ def create_medication(
 def update_medication(
     medication: MedicationCreate,
     medication_id: str,
-    baby: BabyOwnerDep,
+    baby_id: BabyIdDep,
     session: SessionDep,
 ):
-    existing_medication = session.get(Medication, medication_id)
-    if not existing_medication or existing_medication.baby_id != baby.id:
+    existing_medication = get_by_id(session, Medication, medication_id)
+    if not existing_medication or existing_medication.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Medication not found"
         )
@@ -432,6 +909,7 @@ def update_medication(
     existing_medication.description = medication.description
     existing_medication.is_active = medication.is_active
     existing_medication.is_vaccine = medication.is_vaccine
+    existing_medication.interval_hours = medication.interval_hours
 
     Medication.model_validate(existing_medication, strict=True)
 
@@ -444,9 +922,9 @@ def update_medication(
 @router.delete(
     "/{id}/medications/{medication_id}", status_code=status.HTTP_204_NO_CONTENT
 )
-def delete_medication(session: SessionDep, medication_id: str, baby: BabyOwnerDep):
-    medication = session.get(Medication, medication_id)
-    if not medication or medication.baby_id != baby.id:
+def delete_medication(session: SessionDep, medication_id: str, baby_id: BabyIdDep):
+    medication = get_by_id(session, Medication, medication_id)
+    if not medication or medication.baby_id != baby_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Medication not found"
         )
@@ -457,13 +935,19 @@ def delete_medication(session: SessionDep, medication_id: str, baby: BabyOwnerDe
 
 # Medication Logs CRUD
 @router.get(
-    "/{id}/medications/{medication_id}/logs", response_model=List[MedicationLogs]
+    "/{id}/medications/{medication_id}/logs",
+    response_model=List[MedicationLogsRead],
 )
-def get_medication_logs(medication: MedicationOwnerDep, session: SessionDep):
-    medication_logs = session.exec(
-        select(MedicationLogs).where(MedicationLogs.medication_id == medication.id)
-    ).all()
-    return medication_logs
+def get_medication_logs(
+    medication: MedicationOwnerDep,
+    session: ReadSessionDep,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+):
+    medication_logs = read_events(
+        session, MedicationLogs, MedicationLogsRead, medication.id, from_, to
+    )
+    return RowsResponse(medication_logs)
 
 
 @router.post(
@@ -480,10 +964,7 @@ def create_medication_log(
         **medication_log.model_dump(), medication_id=medication.id
     )
     valid_medication_log = MedicationLogs.model_validate(new_medication_log)
-    session.add(valid_medication_log)
-    session.commit()
-    session.refresh(valid_medication_log)
-    return valid_medication_log
+    return add_event(session, valid_medication_log, medication.baby_id)
 
 
 @router.patch(
@@ -496,7 +977,7 @@ def update_medication_log(
     medication: MedicationOwnerDep,
     session: SessionDep,
 ):
-    existing_medication_log = session.get(MedicationLogs, medication_log_id)
+    existing_medication_log = get_by_id(session, MedicationLogs, medication_log_id)
     if (
         not existing_medication_log
         or existing_medication_log.medication_id != medication.id
@@ -524,7 +1005,7 @@ def update_medication_log(
 def delete_medication_log(
     session: SessionDep, medication_log_id: str, medication: MedicationOwnerDep
 ):
-    medication_log = session.get(MedicationLogs, medication_log_id)
+    medication_log = get_by_id(session, MedicationLogs, medication_log_id)
     if not medication_log or medication_log.medication_id != medication.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Medication log not found"
@@ -0,0 +1,125 @@
+# Cache of computed (analytics) responses
+#
+# Keys embed the baby's `data_version`, which every write to the baby or its
+# events bumps (see app/babies/models.py): a write makes the old entries
+# unreachable, and they age out of the LRU or expire. Entries also expire
+# after `response_cache_ttl_seconds`, for responses relative to "now".
+#
+# Two tiers: an LRU per process, and Redis shared by the workers when
+# `redis_url` is set.
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+from urllib.parse import urlencode
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from app.config import settings
+from app.responses import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class RedisCache:
+    """Shared tier (needs the `redis` package).
+
+    While Redis fails, it acts as an empty cache: the LRU keeps serving.
+    """
+
+    def __init__(self, url: str, ttl: float):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.errors = redis.RedisError
+        self.ttl = ttl
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return self.client.get(key)
+        except self.errors:
+            logger.warning("Could not read the shared cache", exc_info=True)
+            return None
+
+    def set(self, key: str, value: bytes):
+        try:
+            self.client.set(key, value, ex=max(1, int(self.ttl)))
+        except self.errors:
+            logger.warning("Could not write the shared cache", exc_info=True)
+
+
+class ResponseCache:
+    def __init__(self, local: LRUCache, shared: RedisCache | None = None):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key: str) -> bytes | None:
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value: bytes):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def respond(self, key: str, build: Callable[[], object]) -> Response:
+        """The cached JSON for `key`, else `build()`'s result, cached."""
+        content = self.get(key)
+        hit = content is not None
+        if not hit:
+            content = dumps(jsonable_encoder(build()))
+            self.set(key, content)
+        return Response(
+            content,
+            media_type="application/json",
+            headers={"X-Cache": "hit" if hit else "miss"},
+        )
+
+
+def cache_key(scope: str, version, endpoint: str, **params) -> str:
+    """`scope` is what `version` versions (e.g. a baby id)."""
+    query = urlencode(sorted((name, str(value)) for name, value in params.items()))
+    return f"cache:{scope}:{version}:{endpoint}?{query}"
+
+
+response_cache = ResponseCache(
+    LRUCache(settings.response_cache_max_entries, settings.response_cache_ttl_seconds),
+    (
+        RedisCache(settings.redis_url, settings.response_cache_ttl_seconds)
+        if settings.redis_url
+        else None
+    ),
+)
@@ -0,0 +1,80 @@
+# Response compression (brotli/gzip) for API routers
+import gzip
+
+import brotli
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+
+from app.config import settings
+
+# Bodies above this size are compressed in the threadpool, off the event loop
+THREADPOOL_MIN_SIZE = 64 * 1024
+
+# Preferred first
+ENCODINGS = ("br", "gzip")
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for coding in ENCODINGS:
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.compression_brotli_quality)
+    return gzip.compress(body, compresslevel=settings.compression_gzip_level)
+
+
+async def compress_response(request: Request, response: Response) -> Response:
+    body = getattr(response, "body", None)  # streaming responses have no body
+    if (
+        not body
+        or len(body) < settings.compression_minimum_size
+        or "content-encoding" in response.headers
+    ):
+        return response
+
+    # The body depends on Accept-Encoding whether or not this client gets it
+    # compressed: caches must not serve one client's encoding to another
+    if "accept-encoding" not in response.headers.get("vary", "").lower():
+        response.headers.append("vary", "Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is None:
+        return response
+
+    if len(body) >= THREADPOOL_MIN_SIZE:
+        response.body = await run_in_threadpool(compress, body, encoding)
+    else:
+        response.body = compress(body, encoding)
+
+    response.headers["content-encoding"] = encoding
+    response.headers["content-length"] = str(len(response.body))
+    return response
+
+
+class CompressedRoute(APIRoute):
+    """Route class that compresses large responses for clients accepting it."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def compressed_handler(request: Request) -> Response:
+            response = await handler(request)
+            return await compress_response(request, response)
+
+        return compressed_handler
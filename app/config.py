@@ -1,3 +1,4 @@
+from pydantic import PositiveFloat
 from pydantic_settings import BaseSettings
 
 
@@ -9,11 +10,121 @@ class SettingsConfig(BaseSettings):
     db_hostname: str
     db_port: str
     db_name: str
+    # "psycopg" (psycopg 3, needs the `psycopg` package) prepares the hot
+    # statements server-side (see app/statements.py)
+    db_driver: str = "psycopg2"
+    # Runs of a statement on a connection before psycopg 3 prepares it; None
+    # disables prepared statements (e.g. behind PgBouncer in transaction mode)
+    db_prepare_threshold: int | None = 5
+
+    # Connection pool (per worker)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+
+    # Read replica (optional), used by GET routes
+    db_replica_url: str | None = None
+    db_replica_pin_seconds: float = 5.0  # reads stay on the primary after a write
+    db_replica_retry_seconds: float = 30.0  # before retrying a failed replica
 
     # JWT
     hash_secret_key: str
     hash_algorithm: str
     access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 30
+    # Put the token version and baby ids in access tokens, so baby routes
+    # authorize without loading the User or the Baby
+    jwt_stateless_claims: bool = False
+    token_version_refresh_seconds: int = 30
+    token_version_cache_max_users: int = 100_000
+
+    # Cached baby memberships per user (see app/babies/members.py); other
+    # workers see membership changes within this window
+    membership_cache_seconds: int = 30
+    membership_cache_max_users: int = 100_000
+
+    # Shared state across workers (optional: pip install -r requirements-redis.txt)
+    redis_url: str | None = None
+
+    # Login rate limiting (see app/ratelimit.py)
+    # Refill rates must be positive: the buckets' wait times divide by them
+    login_rate_per_ip: PositiveFloat = 10  # attempts per minute
+    login_burst_per_ip: int = 20
+    login_rate_per_email: PositiveFloat = 5  # attempts per minute
+    login_burst_per_email: int = 10
+    login_lockout_threshold: int = 10  # failures within the window
+    login_failure_window_seconds: int = 15 * 60
+    login_limiter_max_keys: int = 100_000
+
+    # Production server (see app/server.py)
+    host: str = "0.0.0.0"
+    port: int = 5000
+    web_concurrency: int | None = None  # workers, defaults to the CPU count
+    server_keep_alive_seconds: int = 75  # above typical load balancer idle timeouts
+    server_graceful_shutdown_seconds: int = 30
+    server_backlog: int = 2048
+    # Proxies whose X-Forwarded-For is trusted for the client address:
+    # comma-separated IPs or networks, e.g. the load balancer's subnet
+    # ("10.0.0.0/8"). "*" trusts every client, which lets them spoof it.
+    server_forwarded_allow_ips: str = "127.0.0.1"
+    server_access_log: bool = False
+
+    # Partitioned event tables
+    partition_months_ahead: int = 3
+
+    # Archived events (see app/archive.py)
+    archive_after_days: int = 365
+    archive_batch_size: int = 10_000
+
+    # Purge of deleted babies and users (see app/purge.py)
+    purge_batch_size: int = 5_000
+
+    # Background jobs (see app/jobs), per worker process
+    job_workers: int = 2
+    job_poll_seconds: float = 1.0
+    job_max_attempts: int = 5
+    job_retry_base_seconds: int = 10  # doubled after each failed attempt
+    # Running jobs refresh their lease this often; one missing 3 is requeued
+    job_heartbeat_seconds: int = 10
+    job_drain_seconds: int = 25  # below server_graceful_shutdown_seconds
+    job_retention_days: int = 7
+
+    # Grouped commits of event inserts (opt-in, see app/group_commit.py), per
+    # worker process
+    group_commit_enabled: bool = False
+    group_commit_max_rows: int = 500
+    group_commit_max_delay_ms: float = 5.0
+    group_commit_queue_size: int = 5_000  # then requests get a 503
+
+    # Idempotency keys of create routes (see app/idempotency.py)
+    idempotency_key_ttl_hours: int = 24
+    # Refresh of an in-progress key; after 3 missed, a retry takes it over
+    idempotency_heartbeat_seconds: int = 10
+
+    # Cached analytics responses (see app/cache.py)
+    response_cache_max_entries: int = 10_000  # per worker
+    response_cache_ttl_seconds: int = 300
+
+    # Logging (see app/logs.py)
+    log_level: str = "INFO"
+    # Per-logger levels, e.g. {"sqlalchemy.engine": "INFO"} for every SQL
+    # statement (JSON in the environment)
+    log_levels: dict[str, str] = {}
+    log_json: bool = True  # else plain text lines
+    log_debug_sample_rate: float = 1.0  # share of DEBUG records kept
+    log_queue_size: int = 10_000  # records beyond it are dropped
+
+    # Response compression
+    compression_minimum_size: int = 1024  # bytes
+    compression_gzip_level: int = 6  # 1-9
+    compression_brotli_quality: int = 5  # 0-11
+
+    # Profiler (opt-in, see app/profiling.py)
+    profiler_enabled: bool = False
+    profiler_token: str | None = None  # sent in the "X-Profile" header
+    profiler_sample_rate: float = 0.0
+    profiler_interval_ms: float = 5.0
+    profiler_output_dir: str = "profiles"
+    profiler_max_profiles: int = 100
 
     class Config:
         env_file = ".env"
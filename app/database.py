@@ -1,11 +1,22 @@
 # This file contains the database configuration and session management
+import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Annotated
-from fastapi import Depends
+
+import jwt
+from fastapi import Depends, Request
+from jwt.exceptions import InvalidTokenError
+from sqlalchemy import DateTime, TypeDecorator, make_url
+from sqlalchemy.exc import OperationalError
 from sqlmodel import Field, create_engine, Session
 
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 DB_USERNAME = settings.db_username
 DB_PASSWORD = settings.db_password
 DB_HOSTNAME = settings.db_hostname
@@ -13,10 +24,58 @@ DB_PORT = settings.db_port
 DB_NAME = settings.db_name
 
 DATABASE_URL = (
-    f"postgresql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOSTNAME}:{DB_PORT}/{DB_NAME}"
+    f"postgresql+{settings.db_driver}://"
+    f"{DB_USERNAME}:{DB_PASSWORD}@{DB_HOSTNAME}:{DB_PORT}/{DB_NAME}"
+)
+
+POOL_OPTIONS = dict(
+    pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow
 )
 
-engine = create_engine(DATABASE_URL, echo=True)
+
+def driver_options(url: str) -> dict:
+    # psycopg 3 prepares a statement server-side after `prepare_threshold` runs
+    if make_url(url).get_driver_name() == "psycopg":
+        return {"connect_args": {"prepare_threshold": settings.db_prepare_threshold}}
+    return {}
+
+
+# SQL statements are logged by the "sqlalchemy.engine" logger, when its level
+# is set to INFO (see app/logs.py)
+engine = create_engine(DATABASE_URL, **POOL_OPTIONS, **driver_options(DATABASE_URL))
+
+# Optional read replica for GET/HEAD requests
+read_engine = (
+    create_engine(
+        settings.db_replica_url,
+        pool_pre_ping=True,
+        **POOL_OPTIONS,
+        **driver_options(settings.db_replica_url),
+    )
+    if settings.db_replica_url
+    else None
+)
+
+SAFE_METHODS = ("GET", "HEAD")
+MAX_PINNED_USERS = 10_000
+
+_replica_down_until = 0.0
+
+
+def warm_up_pools():
+    """Opens the pools' base connections before the worker takes traffic."""
+    for pool_engine in (engine, read_engine):
+        if pool_engine is None:
+            continue
+        connections = []
+        try:
+            for _ in range(settings.db_pool_size):
+                connections.append(pool_engine.connect())
+        except OperationalError:
+            logger.warning("Could not warm up the connection pool", exc_info=True)
+        finally:
+            for connection in connections:
+                connection.close()
 
 
 def create_db_and_tables():
@@ -25,17 +84,162 @@ def create_db_and_tables():
     pass
 
 
-def get_session():
+class MemoryPins:
+    """User id -> monotonic time until which its reads go to the primary."""
+
+    def __init__(self):
+        self.pinned_until: OrderedDict[str, float] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def pin(self, user_id: str, seconds: float):
+        with self.lock:
+            self.pinned_until[user_id] = time.monotonic() + seconds
+            self.pinned_until.move_to_end(user_id)
+            while len(self.pinned_until) > MAX_PINNED_USERS:
+                self.pinned_until.popitem(last=False)
+
+    def is_pinned(self, user_id: str) -> bool:
+        return self.pinned_until.get(user_id, 0.0) > time.monotonic()
+
+
+class RedisPins:
+    """Pins seen by every worker (needs the `redis` package).
+
+    When Redis fails, reads go to the primary: never staler than pinned.
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.errors = redis.RedisError
+
+    def pin(self, user_id: str, seconds: float):
+        try:
+            self.client.set(f"pin:{user_id}", 1, px=max(1, int(seconds * 1000)))
+        except self.errors:
+            logger.warning("Could not pin reads to the primary", exc_info=True)
+
+    def is_pinned(self, user_id: str) -> bool:
+        try:
+            return bool(self.client.exists(f"pin:{user_id}"))
+        except self.errors:
+            return True
+
+
+# Shared by the workers when `redis_url` is set: a write handled by one
+# worker must pin the reads that the others handle
+_pins = RedisPins(settings.redis_url) if settings.redis_url else MemoryPins()
+
+
+def request_user_id(request: Request) -> str | None:
+    """The user id ("sub") of the request's bearer token, if it is valid."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(
+            token, settings.hash_secret_key, algorithms=[settings.hash_algorithm]
+        )
+    except InvalidTokenError:
+        return None
+    return payload.get("sub")
+
+
+def pin_to_primary(user_id: str):
+    """Sends a user's reads to the primary for a short window after a write.
+
+    Keeps read-your-writes consistency while the replica catches up.
+    """
+    if read_engine is not None:
+        _pins.pin(user_id, settings.db_replica_pin_seconds)
+
+
+def open_read_session(user_id: str | None) -> Session:
+    """Opens a session on the replica, falling back to the primary.
+
+    The primary is used while the user is pinned or the replica is down;
+    a failed replica is retried after `db_replica_retry_seconds`.
+    """
+    global _replica_down_until
+
+    if (
+        read_engine is None
+        or time.monotonic() < _replica_down_until
+        or (user_id is not None and _pins.is_pinned(user_id))
+    ):
+        return Session(engine)
+
+    session = Session(read_engine)
+    try:
+        session.connection()
+    except OperationalError:
+        session.close()
+        _replica_down_until = time.monotonic() + settings.db_replica_retry_seconds
+        logger.warning("Read replica unavailable, using the primary", exc_info=True)
+        return Session(engine)
+    return session
+
+
+def get_session(request: Request):
+    """A session on the primary; a write pins the user's reads there."""
+    user_id = (
+        request_user_id(request)
+        if read_engine is not None and request.method not in SAFE_METHODS
+        else None
+    )
+    if user_id is not None:
+        pin_to_primary(user_id)
     with Session(engine) as session:
         yield session
+    if user_id is not None:
+        pin_to_primary(user_id)
+
+
+def get_read_session(request: Request):
+    """A replica session, or a primary one while the user is pinned."""
+    user_id = request_user_id(request) if read_engine is not None else None
+    with open_read_session(user_id) as session:
+        yield session
 
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
+# For the data GET routes read: may lag the primary by the replication delay,
+# except for the user's own recent writes. Authorization keeps SessionDep.
+ReadSessionDep = Annotated[Session, Depends(get_read_session)]
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value: datetime) -> datetime:
+    # Naive datetimes are taken to be in UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class UTCDateTime(TypeDecorator):
+    """`timestamptz` column normalizing values to aware UTC datetimes.
+
+    Use for every datetime field: Field(sa_type=UTCDateTime).
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return as_utc(value) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return as_utc(value) if value is not None else None
+
 
 class TimestampMixin:
-    created_at: datetime = Field(default_factory=datetime.now)
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utcnow, sa_type=UTCDateTime)
+    updated_at: datetime = Field(default_factory=utcnow, sa_type=UTCDateTime)
     # created_at: datetime | None = Field(
     #     default=None,
     #     sa_column=Column(
@@ -56,4 +260,4 @@ class TimestampMixin:
 
 
 def update_timestamp(mapper, connection, target):
-    target.updated_at = datetime.now(timezone.utc)
+    target.updated_at = utcnow()
@@ -0,0 +1,157 @@
+# Grouped commits of event inserts (opt-in: `group_commit_enabled`)
+#
+# Each diaper change, feeding or medication log created otherwise costs a
+# transaction, and its fsync. In this mode the routes queue the validated
+# event instead, and a writer thread inserts what queued up in one
+# transaction (multi-row INSERTs) every `group_commit_max_delay_ms` or
+# `group_commit_max_rows` rows. A request still returns only once its event
+# is committed; when the queue is full it is refused with a 503.
+#
+# Core inserts skip the ORM events, so the writer bumps the babies'
+# data_version itself (see bump_data_versions in app/babies/models.py).
+import logging
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException, status
+from sqlalchemy import Engine, insert, update
+from sqlmodel import SQLModel
+
+from app.babies.models import Baby
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# How often an idle writer checks whether it is stopping
+IDLE_POLL_SECONDS = 0.1
+
+
+@dataclass
+class PendingInsert:
+    event: SQLModel
+    baby_id: uuid.UUID
+    done: Future = field(default_factory=Future)
+
+
+class GroupCommitWriter:
+    """One writer thread per worker process, started by the lifespan."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.queue: queue.Queue[PendingInsert] = queue.Queue(
+            maxsize=settings.group_commit_queue_size
+        )
+        # Guards `accepting`, so nothing is queued once `stop` drained the queue
+        self.lock = threading.Lock()
+        self.accepting = False
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.accepting = True
+        self.thread = threading.Thread(
+            target=self.run, name="group-commit", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Flushes the queued events, then stops the writer thread."""
+        with self.lock:
+            self.accepting = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def insert(self, event: SQLModel, baby_id: uuid.UUID) -> None:
+        """Queues the event and waits until it is committed.
+
+        Raises what inserting it raised, like a direct insert would. Callers
+        must not hold a pooled connection while waiting (close their session
+        first), or waiting requests can exhaust the pool the writer needs.
+        """
+        pending = PendingInsert(event, baby_id)
+        with self.lock:
+            if not self.accepting:
+                raise unavailable("Not accepting writes")
+            try:
+                self.queue.put_nowait(pending)
+            except queue.Full:
+                raise unavailable("Too many pending writes")
+        pending.done.result()
+
+    def run(self) -> None:
+        while True:
+            batch = self.next_batch()
+            if batch:
+                self.flush(batch)
+            elif not self.accepting:
+                return
+
+    def next_batch(self) -> list[PendingInsert]:
+        try:
+            batch = [self.queue.get(timeout=IDLE_POLL_SECONDS)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + settings.group_commit_max_delay_ms / 1000
+        while len(batch) < settings.group_commit_max_rows:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(
+                    self.queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self.queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self, batch: list[PendingInsert]) -> None:
+        try:
+            self.write(batch)
+        except Exception:
+            # One bad event must not fail the others: retry them one by one
+            logger.warning("Grouped insert of %d events failed", len(batch))
+            for pending in batch:
+                self.flush_one(pending)
+            return
+
+        for pending in batch:
+            pending.done.set_result(None)
+
+    def flush_one(self, pending: PendingInsert) -> None:
+        try:
+            self.write([pending])
+        except Exception as error:
+            pending.done.set_exception(error)
+        else:
+            pending.done.set_result(None)
+
+    def write(self, batch: list[PendingInsert]) -> None:
+        rows: dict[type[SQLModel], list[dict]] = {}
+        for pending in batch:
+            rows.setdefault(type(pending.event), []).append(pending.event.model_dump())
+
+        with self.engine.begin() as connection:
+            for model, values in rows.items():
+                connection.execute(insert(model), values)
+            connection.execute(
+                update(Baby)
+                .where(Baby.id.in_({pending.baby_id for pending in batch}))
+                .values(data_version=Baby.data_version + 1)
+            )
+
+
+def unavailable(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": "1"},
+    )
+
+
+event_writer = GroupCommitWriter(engine)
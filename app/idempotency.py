@@ -0,0 +1,255 @@
+# Idempotency keys for create routes
+#
+# A POST carrying an `Idempotency-Key` header is executed once per user and
+# key; retries get the stored response back without writing again.
+import asyncio
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from fastapi.security.utils import get_authorization_scheme_param
+from sqlalchemy import JSON, Column, LargeBinary, delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Field, Session, SQLModel
+
+from app.config import settings
+from app.database import UTCDateTime, engine, utcnow
+from app.oauth2 import verify_access_token
+
+logger = logging.getLogger(__name__)
+
+HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+# Headers of the original response not sent again on replay: the body's
+# framing, which the replayed Response sets itself
+NOT_REPLAYED_HEADERS = frozenset(
+    {"content-length", "content-type", "content-encoding", "transfer-encoding"}
+)
+
+# While a request runs, its key's heartbeat_at is refreshed every
+# `idempotency_heartbeat_seconds`: a key without a response that missed this
+# many heartbeats belongs to a request that died mid-way, so a retry may take
+# it over. Requests running longer than that stay protected.
+MISSED_HEARTBEATS = 3
+
+
+class IdempotencyKey(SQLModel, table=True):
+    user_id: uuid.UUID = Field(
+        foreign_key="user.id", ondelete="CASCADE", primary_key=True
+    )
+    key: str = Field(max_length=MAX_KEY_LENGTH, primary_key=True)
+    request_hash: str = Field(max_length=64)
+    # Unset while the original request is in progress
+    status_code: int | None = Field(default=None)
+    content_type: str | None = Field(default=None, max_length=255)
+    body: bytes | None = Field(default=None, sa_column=Column(LargeBinary))
+    # [name, value] pairs (e.g. Location), replayed with the body
+    headers: list[list[str]] | None = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(sa_type=UTCDateTime)
+    heartbeat_at: datetime = Field(sa_type=UTCDateTime)
+    expires_at: datetime = Field(index=True, sa_type=UTCDateTime)
+
+
+def request_user_id(request: Request) -> uuid.UUID | None:
+    scheme, token = get_authorization_scheme_param(request.headers.get("authorization"))
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        claims = verify_access_token(token, HTTPException(status.HTTP_401_UNAUTHORIZED))
+        return uuid.UUID(claims.id)
+    except (HTTPException, ValueError):
+        return None
+
+
+def claim_key(user_id: uuid.UUID, key: str, request_hash: str) -> IdempotencyKey | None:
+    """Claims the key for this request; returns its record if already taken."""
+    with Session(engine) as session:
+        for _ in range(2):
+            now = utcnow()
+            session.add(
+                IdempotencyKey(
+                    user_id=user_id,
+                    key=key,
+                    request_hash=request_hash,
+                    created_at=now,
+                    heartbeat_at=now,
+                    expires_at=now
+                    + timedelta(hours=settings.idempotency_key_ttl_hours),
+                )
+            )
+            try:
+                session.commit()
+                return None
+            except IntegrityError:
+                session.rollback()
+
+            existing = session.get(IdempotencyKey, (user_id, key))
+            if existing is None:
+                continue
+            if existing.expires_at > now and (
+                existing.status_code is not None
+                or existing.heartbeat_at > now - abandoned_after()
+            ):
+                session.expunge(existing)
+                return existing
+
+            # Expired, or abandoned by a request that never finished
+            session.delete(existing)
+            session.commit()
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A request with this idempotency key is in progress",
+    )
+
+
+def abandoned_after() -> timedelta:
+    return MISSED_HEARTBEATS * timedelta(seconds=settings.idempotency_heartbeat_seconds)
+
+
+def touch_key(user_id: uuid.UUID, key: str) -> None:
+    with Session(engine) as session:
+        session.exec(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None),
+            )
+            .values(heartbeat_at=utcnow())
+        )
+        session.commit()
+
+
+async def keep_alive(user_id: uuid.UUID, key: str) -> None:
+    """Refreshes the key's heartbeat until cancelled."""
+    while True:
+        await asyncio.sleep(settings.idempotency_heartbeat_seconds)
+        try:
+            await run_in_threadpool(touch_key, user_id, key)
+        except Exception:
+            logger.warning("Could not refresh idempotency key", exc_info=True)
+
+
+def save_response(user_id: uuid.UUID, key: str, response: Response) -> None:
+    with Session(engine) as session:
+        record = session.get(IdempotencyKey, (user_id, key))
+        if record is None:
+            return
+        record.status_code = response.status_code
+        record.content_type = response.headers.get("content-type")
+        record.body = response.body
+        record.headers = [
+            [name, value]
+            for name, value in response.headers.items()
+            if name not in NOT_REPLAYED_HEADERS
+        ]
+        session.add(record)
+        session.commit()
+
+
+def release_key(user_id: uuid.UUID, key: str) -> None:
+    """Frees the key of a request that failed, so a retry executes again."""
+    with Session(engine) as session:
+        session.exec(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+            )
+        )
+        session.commit()
+
+
+class IdempotentRoute(APIRoute):
+    """Route class that honors `Idempotency-Key` on POST requests.
+
+    Only successful responses are kept: errors release the key, so a retry
+    runs the request again. Requests without a valid bearer token are left
+    to the route's own authentication.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(HEADER)
+            if request.method != "POST" or key is None:
+                return await handler(request)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters",
+                )
+
+            user_id = request_user_id(request)
+            if user_id is None:
+                return await handler(request)
+
+            # The query string too: the same body with other parameters is
+            # another request (keys stored without one keep their hash)
+            target = request.url.path
+            if request.url.query:
+                target += "?" + request.url.query
+            request_hash = hashlib.sha256(
+                target.encode() + b"\n" + await request.body()
+            ).hexdigest()
+            existing = await run_in_threadpool(claim_key, user_id, key, request_hash)
+            if existing is not None:
+                if existing.request_hash != request_hash:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail="Idempotency key was used for a different request",
+                    )
+                if existing.status_code is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="A request with this idempotency key is in progress",
+                    )
+                replay = Response(
+                    existing.body,
+                    status_code=existing.status_code,
+                    media_type=existing.content_type,
+                    headers={"Idempotent-Replayed": "true"},
+                )
+                for name, value in existing.headers or ():
+                    replay.headers.append(name, value)
+                return replay
+
+            heartbeat = asyncio.create_task(keep_alive(user_id, key))
+            try:
+                response = await handler(request)
+            except BaseException:
+                await run_in_threadpool(release_key, user_id, key)
+                raise
+            finally:
+                heartbeat.cancel()
+
+            if response.status_code < 400 and hasattr(response, "body"):
+                await run_in_threadpool(save_response, user_id, key, response)
+            else:
+                await run_in_threadpool(release_key, user_id, key)
+            return response
+
+        return idempotent_handler
+
+
+def purge_expired_keys() -> int:
+    with Session(engine) as session:
+        result = session.exec(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at < utcnow())
+        )
+        session.commit()
+        return result.rowcount
+
+
+async def expire_idempotency_keys() -> None:
+    """Deletes expired idempotency keys once an hour."""
+    while True:
+        try:
+            await run_in_threadpool(purge_expired_keys)
+        except Exception:
+            logger.exception("Could not purge expired idempotency keys")
+        await asyncio.sleep(60 * 60)
@@ -0,0 +1,56 @@
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+from sqlalchemy import JSON, Column, Index, Text, event, text
+from sqlmodel import Field, SQLModel
+
+from app.database import TimestampMixin, UTCDateTime, update_timestamp, utcnow
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(SQLModel, TimestampMixin, table=True):
+    __table_args__ = (
+        # Polled by the workers: only the queued jobs, by due time
+        Index(
+            "ix_job_queued_run_at",
+            "run_at",
+            postgresql_where=text("status = 'QUEUED'"),
+        ),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    kind: str = Field(max_length=64)
+    payload: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
+    # Who may read the job's status (no foreign key: a job may purge its user)
+    user_id: uuid.UUID | None = Field(default=None, index=True)
+    status: JobStatus = Field(default=JobStatus.QUEUED)
+    attempts: int = Field(default=0)
+    max_attempts: int
+    run_at: datetime = Field(default_factory=utcnow, sa_type=UTCDateTime)
+    locked_at: datetime | None = Field(default=None, sa_type=UTCDateTime)
+    finished_at: datetime | None = Field(default=None, sa_type=UTCDateTime)
+    result: dict[str, Any] | None = Field(default=None, sa_column=Column(JSON))
+    error: str | None = Field(default=None, sa_column=Column(Text))
+
+
+class JobRead(SQLModel):
+    id: uuid.UUID
+    kind: str
+    status: JobStatus
+    attempts: int
+    run_at: datetime
+    finished_at: datetime | None
+    result: dict[str, Any] | None
+    error: str | None
+    created_at: datetime
+
+
+event.listen(Job, "before_update", update_timestamp)
@@ -0,0 +1,159 @@
+# Durable job queue in the `job` table
+#
+# Producers add a Job in their own transaction (`enqueue`), so a job exists
+# exactly when the write that needs it commits. Workers claim due jobs with
+# FOR UPDATE SKIP LOCKED, so each job runs on one worker at a time.
+#
+# A running job's lease (`locked_at`) is refreshed every
+# `job_heartbeat_seconds` while its handler runs (see app/jobs/worker.py).
+# A job whose lease missed MISSED_HEARTBEATS heartbeats belongs to a worker
+# that died, and is requeued; jobs that merely run long never are.
+import traceback
+import uuid
+from datetime import timedelta
+from typing import Any, Callable
+
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from app.config import settings
+from app.database import engine, utcnow
+from app.jobs.models import Job, JobStatus
+
+MISSED_HEARTBEATS = 3
+
+# Job kind -> handler(payload) returning an optional JSON-able result
+HANDLERS: dict[str, Callable[[dict[str, Any]], dict[str, Any] | None]] = {}
+
+
+def job_handler(kind: str):
+    def register(handler):
+        HANDLERS[kind] = handler
+        return handler
+
+    return register
+
+
+def enqueue(
+    session: Session,
+    kind: str,
+    payload: dict[str, Any],
+    user_id: uuid.UUID | None = None,
+) -> Job:
+    """Adds a job to the session; it is queued when the session commits."""
+    job = Job(
+        kind=kind,
+        payload=payload,
+        user_id=user_id,
+        max_attempts=settings.job_max_attempts,
+    )
+    session.add(job)
+    return job
+
+
+def claim_job() -> tuple[uuid.UUID, str, dict[str, Any]] | None:
+    """Marks the next due job as running and returns it (None if idle)."""
+    now = utcnow()
+    next_job = (
+        select(Job.id)
+        .where(Job.status == JobStatus.QUEUED, Job.run_at <= now)
+        .order_by(Job.run_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    with Session(engine) as session:
+        claimed = session.exec(
+            update(Job)
+            .where(Job.id == next_job)
+            .values(
+                status=JobStatus.RUNNING,
+                attempts=Job.attempts + 1,
+                locked_at=now,
+                updated_at=now,
+            )
+            .returning(Job.id, Job.kind, Job.payload)
+        ).first()
+        session.commit()
+    return tuple(claimed) if claimed else None
+
+
+def touch_job(job_id: uuid.UUID) -> None:
+    """Refreshes the lease of a running job."""
+    with Session(engine) as session:
+        now = utcnow()
+        session.exec(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.RUNNING)
+            .values(locked_at=now, updated_at=now)
+        )
+        session.commit()
+
+
+def run_job(job_id: uuid.UUID, kind: str, payload: dict[str, Any]) -> None:
+    try:
+        result = HANDLERS[kind](payload)
+    except Exception:
+        fail_job(job_id, traceback.format_exc())
+    else:
+        finish_job(job_id, result)
+
+
+def finish_job(job_id: uuid.UUID, result: dict[str, Any] | None) -> None:
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        job.status = JobStatus.SUCCEEDED
+        job.result = result
+        job.finished_at = utcnow()
+        session.add(job)
+        session.commit()
+
+
+def fail_job(job_id: uuid.UUID, error: str) -> None:
+    """Retries the job later with exponential backoff, or marks it failed."""
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        job.error = error
+        if job.attempts < job.max_attempts:
+            job.status = JobStatus.QUEUED
+            job.run_at = utcnow() + timedelta(
+                seconds=settings.job_retry_base_seconds * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = JobStatus.FAILED
+            job.finished_at = utcnow()
+        session.add(job)
+        session.commit()
+
+
+def maintain_jobs() -> None:
+    """Requeues jobs of workers that died mid-job; drops old finished jobs.
+
+    A job whose lease expired after its last attempt is failed instead.
+    """
+    now = utcnow()
+    lease = timedelta(seconds=settings.job_heartbeat_seconds * MISSED_HEARTBEATS)
+    timed_out = (Job.status == JobStatus.RUNNING, Job.locked_at < now - lease)
+    with Session(engine) as session:
+        session.exec(
+            update(Job)
+            .where(*timed_out, Job.attempts < Job.max_attempts)
+            .values(status=JobStatus.QUEUED, run_at=now, updated_at=now)
+        )
+        session.exec(
+            update(Job)
+            .where(*timed_out, Job.attempts >= Job.max_attempts)
+            .values(
+                status=JobStatus.FAILED,
+                error="Lost its worker on its last attempt",
+                finished_at=now,
+                updated_at=now,
+            )
+        )
+        session.exec(
+            delete(Job).where(
+                Job.status.in_((JobStatus.SUCCEEDED, JobStatus.FAILED)),
+                Job.finished_at < now - timedelta(days=settings.job_retention_days),
+            )
+        )
+        session.commit()
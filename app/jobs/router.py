@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.compression import CompressedRoute
+from app.database import ReadSessionDep
+from app.jobs.models import Job, JobRead
+from app.oauth2 import CurrentClaimsDep
+from app.statements import get_by_id
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"], route_class=CompressedRoute)
+
+
+@router.get("/{id}", response_model=JobRead)
+def read_job(id: str, claims: CurrentClaimsDep, session: ReadSessionDep):
+    job = get_by_id(session, Job, id)
+    if not job or str(job.user_id) != claims.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return job
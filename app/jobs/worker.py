@@ -0,0 +1,85 @@
+# Job workers running inside the app process, started by the lifespan
+import asyncio
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.jobs.queue import claim_job, maintain_jobs, run_job, touch_job
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_INTERVAL_SECONDS = 60
+
+
+class JobWorkers:
+    """`job_workers` polling loops, each running one job at a time.
+
+    Handlers run in the threadpool, while the loop refreshes the job's lease.
+    `stop` lets running jobs finish for up to `job_drain_seconds`; a job cut
+    off after that is requeued once its lease expires (see maintain_jobs).
+    """
+
+    def __init__(self, concurrency: int | None = None):
+        self.concurrency = settings.job_workers if concurrency is None else concurrency
+        self.stopping = asyncio.Event()
+        self.tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self.tasks = [asyncio.create_task(self.work()) for _ in range(self.concurrency)]
+        if self.tasks:
+            self.tasks.append(asyncio.create_task(self.maintain()))
+
+    async def stop(self) -> None:
+        self.stopping.set()
+        if not self.tasks:
+            return
+
+        _, pending = await asyncio.wait(self.tasks, timeout=settings.job_drain_seconds)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning("Stopped %d job workers before they drained", len(pending))
+
+    async def idle(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def work(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                job = await run_in_threadpool(claim_job)
+            except Exception:
+                logger.exception("Could not claim a job")
+                job = None
+
+            if job is None:
+                await self.idle(settings.job_poll_seconds)
+                continue
+
+            heartbeat = asyncio.create_task(self.keep_alive(job[0]))
+            try:
+                await run_in_threadpool(run_job, *job)
+            except Exception:
+                logger.exception("Could not record the outcome of job %s", job[0])
+            finally:
+                heartbeat.cancel()
+
+    async def keep_alive(self, job_id) -> None:
+        """Refreshes the job's lease until cancelled."""
+        while True:
+            await asyncio.sleep(settings.job_heartbeat_seconds)
+            try:
+                await run_in_threadpool(touch_job, job_id)
+            except Exception:
+                logger.warning("Could not refresh the lease of job %s", job_id)
+
+    async def maintain(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                await run_in_threadpool(maintain_jobs)
+            except Exception:
+                logger.exception("Could not maintain the job queue")
+            await self.idle(MAINTENANCE_INTERVAL_SECONDS)
@@ -0,0 +1,151 @@
+# Structured logging, off the request path
+#
+# Loggers only put records on a bounded queue; a listener thread formats
+# them (as JSON lines by default) and writes them to stdout, so a request
+# never waits on log I/O. Records carry the id of the request that logged
+# them (the "X-Request-ID" header, or a generated one), SQL logs included.
+#
+# Levels come from `log_level` and `log_levels`: e.g.
+#   LOG_LEVELS='{"sqlalchemy.engine": "INFO"}'
+# logs every SQL statement, as `echo=True` did. DEBUG records are sampled
+# at `log_debug_sample_rate`.
+import atexit
+import copy
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+from app.config import settings
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Client-supplied ids are kept when they look like ids
+VALID_REQUEST_ID = re.compile(rb"[A-Za-z0-9._-]{1,64}")
+
+# Loggers configured by uvicorn, routed through the queue too
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+class RequestIdFilter(logging.Filter):
+    # Runs in the thread that logs, which has the request's context
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps a `rate` share of the DEBUG records, and every other record."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class LogQueueHandler(QueueHandler):
+    """Queues records for the listener, dropping them when the queue is full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the arguments, which may change after this call;
+        # formatting is left to the listener
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+
+def configure_logging() -> QueueListener:
+    """Routes all logging through the queue; the listener stops at exit."""
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(
+        JSONFormatter() if settings.log_json else logging.Formatter(TEXT_FORMAT)
+    )
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    handler = LogQueueHandler(log_queue)
+    if settings.log_debug_sample_rate < 1:
+        handler.addFilter(DebugSampler(settings.log_debug_sample_rate))
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.log_level.upper())
+    for name in UVICORN_LOGGERS:
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+    for name, level in settings.log_levels.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    listener = QueueListener(log_queue, output)
+    listener.start()
+    # Stopping writes out the records still queued
+    atexit.register(listener.stop)
+    return listener
+
+
+class RequestIdMiddleware:
+    """Sets the request id for the request's logs and echoes it back."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = next(
+            (value for name, value in scope["headers"] if name == REQUEST_ID_HEADER),
+            None,
+        )
+        if value is None or not VALID_REQUEST_ID.fullmatch(value):
+            value = uuid.uuid4().hex.encode()
+        token = request_id.set(value.decode())
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, value))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(token)
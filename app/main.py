@@ -1,23 +1,56 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 
-from app.database import create_db_and_tables
+from app.config import settings
+from app.database import create_db_and_tables, warm_up_pools
+from app.group_commit import event_writer
+from app.idempotency import expire_idempotency_keys
+from app.jobs.router import router as jobs_router
+from app.jobs.worker import JobWorkers
+from app.logs import RequestIdMiddleware, configure_logging
 from app.oauth2 import router as oauth2_router
 from app.users.router import router as users_router
 from app.babies.router import router as babies_router
+from app.partitions import maintain_partitions
+from app.profiling import ProfilerMiddleware
+
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app):
-    print("lifespan on-startup")
+    logger.info("Starting up")
     create_db_and_tables()
+    await run_in_threadpool(warm_up_pools)
+    partitions_task = asyncio.create_task(maintain_partitions())
+    idempotency_task = asyncio.create_task(expire_idempotency_keys())
+    job_workers = JobWorkers()
+    job_workers.start()
+    if settings.group_commit_enabled:
+        event_writer.start()
     yield
-    print("lifespan on-shutdown")
+    # Requests are done by now: flush what they queued
+    await run_in_threadpool(event_writer.stop)
+    await job_workers.stop()
+    partitions_task.cancel()
+    idempotency_task.cancel()
+    logger.info("Shut down")
 
 
 app = FastAPI(lifespan=lifespan)
 
+if settings.profiler_enabled:
+    app.add_middleware(ProfilerMiddleware)
+# Outermost, so every log of the request has its id
+app.add_middleware(RequestIdMiddleware)
+
 app.include_router(oauth2_router)
 app.include_router(users_router)
 app.include_router(babies_router)
+app.include_router(jobs_router)
@@ -1,24 +1,47 @@
+import base64
+import hashlib
+import logging
+import math
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
 import jwt
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
-from sqlmodel import select
+from sqlalchemy import bindparam, event
+from sqlmodel import Session, select, update
 
+from app.babies.members import WRITER_ROLES, member_baby_ids
+from app.babies.models import Baby
 from app.config import settings
-from app.database import SessionDep
-from app.users.models import User
+from app.database import SessionDep, pin_to_primary
+from app.ratelimit import login_limiter
+from app.statements import get_by_id
+from app.users.models import RefreshToken, User
 
 SECRET_KEY = settings.hash_secret_key
 ALGORITHM = settings.hash_algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
+STATELESS_CLAIMS = settings.jwt_stateless_claims
 
 LOGIN_URL = "login"
 
+# Redis hash of user id -> token version, when `redis_url` is set
+TOKEN_VERSIONS_KEY = "token_versions"
+# Session.info key of the versions bumped in the session's transaction
+PENDING_VERSIONS = "pending_token_versions"
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["Authentication"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=LOGIN_URL)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -27,33 +50,107 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
     id: str | None = None
+    version: int | None = None
+    # Compact ids (see compact_id) of the babies the user may write, in
+    # stateless mode
+    babies: frozenset[str] = frozenset()
 
 
 @router.post(f"/{LOGIN_URL}", response_model=Token)
 def login(
-    form_data: Annotated[OAuth2PasswordRequestForm, Depends()], session: SessionDep
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    session: SessionDep,
+    request: Request,
 ):
+    # Refuse before the user lookup and bcrypt, which are what attackers burn
+    retry_after = login_limiter.check(
+        ip=request.client.host if request.client else "", email=form_data.username
+    )
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
     user = authenticate_user(
         email=form_data.username, password=form_data.password, session=session
     )
 
     if not user:
+        login_limiter.record_failure(form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    login_limiter.record_success(form_data.username)
+    return issue_tokens(user.id, session)
+
+
+# Costs one indexed UPDATE and one INSERT, no password hashing
+@router.post("/token/refresh", response_model=Token)
+def refresh_access_token(body: RefreshRequest, session: SessionDep):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    token_hash = hash_refresh_token(body.refresh_token)
+    now = datetime.now(timezone.utc)
+
+    # Atomically consume the token, so concurrent refreshes can't both succeed
+    consumed = session.exec(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(used_at=now, updated_at=now)
+        .returning(RefreshToken.user_id, RefreshToken.family_id)
+    ).first()
+
+    if consumed is None:
+        stored = session.exec(
+            select(RefreshToken).where(RefreshToken.token_hash == token_hash)
+        ).first()
+        if stored and (stored.used_at or stored.revoked_at):
+            # Reuse of a rotated token: it may be stolen, revoke the whole family
+            revoke_refresh_token_family(stored.family_id, session)
+        raise credentials_exception
+
+    user_id, family_id = consumed
+    return issue_tokens(user_id, session, family_id=family_id)
+
+
+def issue_tokens(
+    user_id: uuid.UUID, session: Session, family_id: uuid.UUID | None = None
+) -> Token:
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": f"{user.id}"},  # subject must be a string
+        data=token_claims(user_id, session),
         expires_delta=access_token_expires,
     )
-    return Token(access_token=access_token, token_type="bearer")
+    refresh_token = create_refresh_token(user_id, session, family_id)
+    session.commit()
+
+    # The replica may not have caught up with this user yet
+    pin_to_primary(str(user_id))
+    return Token(
+        access_token=access_token, token_type="bearer", refresh_token=refresh_token
+    )
 
 
 def verify_password(plain_password, hashed_password):
@@ -67,7 +164,7 @@ def get_password_hash(password: str):
 def authenticate_user(email: EmailStr, password: str, session: SessionDep):
     user = session.exec(select(User).where(User.email == email)).first()
 
-    if not user:
+    if not user or user.deleted_at:
         return False
     if not verify_password(password, user.password):
         return False
@@ -85,6 +182,155 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
+def compact_id(id: uuid.UUID) -> str:
+    # 22 characters instead of 36
+    return base64.urlsafe_b64encode(id.bytes).rstrip(b"=").decode()
+
+
+def token_claims(user_id: uuid.UUID, session: Session) -> dict:
+    claims = {"sub": f"{user_id}"}  # subject must be a string
+    if not STATELESS_CLAIMS:
+        return claims
+
+    # Enough to authorize baby routes without loading the User or the Baby
+    claims["ver"] = session.exec(
+        select(User.token_version).where(User.id == user_id)
+    ).one()
+    # Only the babies the user may write: viewers go through the memberships
+    claims["babies"] = [
+        compact_id(baby_id)
+        for baby_id in session.exec(
+            select(Baby.id).where(
+                Baby.id.in_(member_baby_ids(user_id, WRITER_ROLES)),
+                Baby.deleted_at.is_(None),
+            )
+        )
+    ]
+    return claims
+
+
+# Pre-built (see app/statements.py), as every cache miss runs it
+USER_TOKEN_VERSION = select(User.token_version).where(User.id == bindparam("id"))
+
+
+class TokenVersions:
+    """Per-user cache of the users' current `token_version`.
+
+    A user's version is looked up again at most every
+    `token_version_refresh_seconds`, so revocation takes effect within that
+    window without a query per request. With `redis_url` set, bumps are also
+    published to Redis once committed, and every worker sees them on the
+    next request.
+    """
+
+    def __init__(self, redis_url: str | None = None):
+        # User id -> (expires at, version)
+        self.entries: OrderedDict[str, tuple[float, int]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.shared = None
+        if redis_url:
+            import redis
+
+            self.shared = redis.Redis.from_url(redis_url)
+            self.errors = redis.RedisError
+
+    def _store(self, user_id: str, version: int):
+        self.entries[user_id] = (
+            time.monotonic() + settings.token_version_refresh_seconds,
+            version,
+        )
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > settings.token_version_cache_max_users:
+            self.entries.popitem(last=False)
+
+    def current(self, user_id: str, session: Session) -> int | None:
+        """The user's token version, or None if the user no longer exists."""
+        with self.lock:
+            entry = self.entries.get(user_id)
+        if entry is not None and time.monotonic() < entry[0]:
+            version = entry[1]
+        else:
+            version = session.exec(
+                USER_TOKEN_VERSION, params={"id": uuid.UUID(user_id)}
+            ).first()
+            if version is None:
+                return None
+            with self.lock:
+                self._store(user_id, version)
+
+        if self.shared is not None:
+            try:
+                shared = self.shared.hget(TOKEN_VERSIONS_KEY, user_id)
+            except self.errors:
+                # The cache above still catches up within the refresh window
+                logger.warning("Could not read token versions", exc_info=True)
+            else:
+                if shared is not None:
+                    version = max(version, int(shared))
+        return version
+
+    def bump(self, user: User, session: Session):
+        """Revokes the user's current access tokens, once `session` commits."""
+        user.token_version += 1
+        session.info.setdefault(PENDING_VERSIONS, {})[str(user.id)] = user.token_version
+
+    def publish(self, versions: dict[str, int]):
+        with self.lock:
+            for user_id, version in versions.items():
+                self._store(user_id, version)
+        if self.shared is not None:
+            try:
+                self.shared.hset(TOKEN_VERSIONS_KEY, mapping=versions)
+            except self.errors:
+                logger.warning("Could not publish token versions", exc_info=True)
+
+
+token_versions = TokenVersions(settings.redis_url)
+
+
+@event.listens_for(Session, "after_commit")
+def publish_token_versions(session: Session):
+    versions = session.info.pop(PENDING_VERSIONS, None)
+    if versions:
+        token_versions.publish(versions)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_token_versions(session: Session):
+    session.info.pop(PENDING_VERSIONS, None)
+
+
+def hash_refresh_token(token: str) -> str:
+    # Refresh tokens are random, so a fast hash is enough (no bcrypt needed)
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_refresh_token(
+    user_id: uuid.UUID, session: Session, family_id: uuid.UUID | None = None
+) -> str:
+    token = secrets.token_urlsafe(32)
+    session.add(
+        RefreshToken(
+            token_hash=hash_refresh_token(token),
+            family_id=family_id or uuid.uuid4(),
+            user_id=user_id,
+            expires_at=datetime.now(timezone.utc)
+            + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+def revoke_refresh_token_family(family_id: uuid.UUID, session: Session):
+    now = datetime.now(timezone.utc)
+    session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now, updated_at=now)
+    )
+    session.commit()
+
+
 def verify_access_token(token: str, credentials_exception: HTTPException):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -92,14 +338,18 @@ def verify_access_token(token: str, credentials_exception: HTTPException):
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-        return TokenData(id=user_id)
+        return TokenData(
+            id=user_id,
+            version=payload.get("ver"),
+            babies=frozenset(payload.get("babies", ())),
+        )
     except InvalidTokenError:
         raise credentials_exception
 
 
-async def get_current_user(
+def get_current_claims(
     token: Annotated[str, Depends(oauth2_scheme)], session: SessionDep
-):
+) -> TokenData:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -107,10 +357,33 @@ async def get_current_user(
     )
 
     token_data = verify_access_token(token, credentials_exception)
-    user = session.get(User, token_data.id)
+    if token_data.version is None:
+        # Not stateless: the user must still exist (loaded into the session,
+        # where get_current_user finds it)
+        user = get_by_id(session, User, token_data.id)
+        if user is None or user.deleted_at:
+            raise credentials_exception
+    else:
+        current = token_versions.current(token_data.id, session)
+        if current is None or token_data.version < current:
+            raise credentials_exception
 
-    if user is None:
-        raise credentials_exception
+    return token_data
+
+
+CurrentClaimsDep = Annotated[TokenData, Depends(get_current_claims)]
+
+
+async def get_current_user(claims: CurrentClaimsDep, session: SessionDep):
+    # Unless stateless, get_current_claims loaded the user: no second query
+    user = session.get(User, uuid.UUID(claims.id))
+
+    if user is None or user.deleted_at:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     return user
 
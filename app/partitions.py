@@ -0,0 +1,140 @@
+# Monthly range partitioning of the high-volume event tables
+#
+# Maintenance command (creates the upcoming partitions):
+#   python -m app.partitions
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Connection, text
+
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> partition key (the event's time column)
+PARTITIONED_TABLES = {
+    "diaperchange": "time",
+    "feeding": "start_time",
+    "sleep": "start_time",
+    "medicationlogs": "time",
+}
+
+# Held while creating partitions, so one worker at a time maintains them
+ADVISORY_LOCK_ID = 29_001
+
+
+def add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def bound(month: date) -> str:
+    # The offset is ignored by `timestamp` columns and honored by `timestamptz`
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    return bool(
+        connection.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass(:table)"
+            ),
+            {"table": table},
+        ).scalar()
+    )
+
+
+def create_partition(connection: Connection, table: str, month: date) -> None:
+    """Creates the partition holding `month`, unless it already exists.
+
+    Rows that landed in the default partition for that month are moved into
+    the new partition before it is attached.
+    """
+    name = partition_name(table, month)
+    if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return
+
+    column = PARTITIONED_TABLES[table]
+    start, end = bound(month), bound(add_months(month, 1))
+    connection.execute(
+        text(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)')
+    )
+    connection.execute(
+        text(
+            f'WITH moved AS (DELETE FROM "{table}_default" '
+            f'WHERE "{column}" >= {start} AND "{column}" < {end} RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved'
+        )
+    )
+    connection.execute(
+        text(
+            f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM ({start}) TO ({end})"
+        )
+    )
+
+
+def create_partitions(
+    connection: Connection, table: str, first_month: date, last_month: date
+) -> None:
+    month = month_start(first_month)
+    while month <= last_month:
+        create_partition(connection, table, month)
+        month = add_months(month, 1)
+
+
+def ensure_future_partitions(
+    connection: Connection, months_ahead: int | None = None
+) -> bool:
+    """Creates the partitions up to `months_ahead` months from now.
+
+    Returns False, doing nothing, when another worker is already at it.
+    """
+    if months_ahead is None:
+        months_ahead = settings.partition_months_ahead
+
+    locked = connection.execute(
+        text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID}
+    ).scalar()
+    if not locked:
+        return False
+
+    this_month = month_start(datetime.now(timezone.utc))
+    for table in PARTITIONED_TABLES:
+        if is_partitioned(connection, table):
+            create_partitions(
+                connection, table, this_month, add_months(this_month, months_ahead)
+            )
+    return True
+
+
+def create_upcoming_partitions() -> None:
+    with engine.begin() as connection:
+        if not ensure_future_partitions(connection):
+            logger.info("Partitions are being maintained by another worker")
+
+
+async def maintain_partitions() -> None:
+    """Creates the upcoming partitions at startup and then once a day."""
+    while True:
+        try:
+            await run_in_threadpool(create_upcoming_partitions)
+        except Exception:
+            logger.exception("Could not create upcoming partitions")
+        await asyncio.sleep(24 * 60 * 60)
+
+
+if __name__ == "__main__":
+    create_upcoming_partitions()
@@ -0,0 +1,133 @@
+# Opt-in sampling profiler for individual requests
+import hmac
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import anyio
+
+from app.config import settings
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Leaf frames in these files mean the thread is parked, not doing work
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+
+class StackSampler:
+    """Samples the stacks of every running thread at a fixed interval.
+
+    Samples are aggregated as collapsed stacks ("outer;inner count"), which
+    speedscope and flamegraph.pl can load directly. All threads are sampled,
+    because sync routes run in the threadpool; keep the sample rate low so
+    concurrent requests don't blur the picture.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = self._collapse(frame)
+                if stack:
+                    self.stacks[stack] += 1
+
+    @staticmethod
+    def _collapse(frame) -> str | None:
+        if frame.f_code.co_filename.endswith(IDLE_FILES):
+            return None
+
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            filename = Path(code.co_filename).name
+            names.append(f"{code.co_qualname} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+
+class ProfilerMiddleware:
+    """Profiles requests that carry the admin header or fall in the sample rate.
+
+    Profiles are written to `profiler_output_dir` as `.folded` files, keeping
+    only the newest `profiler_max_profiles` of them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.output_dir = Path(settings.profiler_output_dir)
+        self.interval = settings.profiler_interval_ms / 1000
+
+    def should_profile(self, scope) -> bool:
+        token = settings.profiler_token
+        if token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER.encode() and hmac.compare_digest(
+                    value, token.encode()
+                ):
+                    return True
+        return random.random() < settings.profiler_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = datetime.now(timezone.utc)
+        path_slug = scope["path"].strip("/").replace("/", "_") or "root"
+        profile_id = (
+            f"{started_at:%Y%m%dT%H%M%S%f}-{scope['method'].lower()}-{path_slug}"
+        )
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER, profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = StackSampler(self.interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            # Joins the sampler thread: off the event loop
+            await anyio.to_thread.run_sync(sampler.stop)
+            await anyio.to_thread.run_sync(
+                self.write_profile, profile_id, sampler.stacks, elapsed_ms
+            )
+
+    def write_profile(self, profile_id: str, stacks: Counter, elapsed_ms: float):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        lines = [f"{stack} {count}" for stack, count in stacks.most_common()]
+        path = self.output_dir / f"{profile_id}-{elapsed_ms:.0f}ms.folded"
+        path.write_text("\n".join(lines) + "\n")
+
+        # Bounded ring: drop the oldest profiles once over the limit
+        profiles = sorted(
+            self.output_dir.glob("*.folded"), key=lambda p: p.stat().st_mtime
+        )
+        excess = max(0, len(profiles) - settings.profiler_max_profiles)
+        for old_profile in profiles[:excess]:
+            old_profile.unlink(missing_ok=True)
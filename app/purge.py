@@ -0,0 +1,227 @@
+# Background purge of deleted babies and users
+#
+# Deleting a baby or a user only sets its `deleted_at` and queues a purge job.
+# The job then deletes their rows in bounded batches, one committed batch at
+# a time, and records its progress in PurgeProgress so an interrupted purge
+# resumes at the table it stopped in.
+#
+# Maintenance command (purges everything pending now):
+#   python -m app.purge
+import logging
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import delete, text
+from sqlmodel import Field, Session, SQLModel, select
+
+from app.babies.models import (
+    Baby,
+    Bath,
+    DiaperChange,
+    DiaperChangeArchive,
+    Feeding,
+    FeedingArchive,
+    Measurement,
+    Medication,
+    MedicationLogs,
+    MedicationLogsArchive,
+    Sleep,
+    SleepArchive,
+    Tombstone,
+)
+from app.config import settings
+from app.database import UTCDateTime, engine, utcnow
+from app.jobs.models import Job
+from app.jobs.queue import enqueue, job_handler
+from app.users.models import User
+
+logger = logging.getLogger(__name__)
+
+# A baby's rows, in a deletion order that satisfies the foreign keys
+PURGE_ORDER: list[type[SQLModel]] = [
+    MedicationLogs,
+    MedicationLogsArchive,
+    Medication,
+    DiaperChange,
+    DiaperChangeArchive,
+    Feeding,
+    FeedingArchive,
+    Sleep,
+    SleepArchive,
+    Bath,
+    Measurement,
+    Tombstone,
+]
+
+# Keeps workers from purging the same rows at the same time
+ADVISORY_LOCK_ID = 29_002
+
+
+class PurgeInProgress(Exception):
+    """Another worker, job or command is purging the same baby or user."""
+
+
+@contextmanager
+def purge_lock(kind: str, id: uuid.UUID):
+    """Holds an advisory lock on the baby or user for the whole purge.
+
+    A session-level lock on its own connection: the purge commits batch by
+    batch, which would release a transaction-level one.
+    """
+    key = f"purge:{kind}:{id}"
+    with engine.connect() as lock:
+        if not lock.execute(
+            text("SELECT pg_try_advisory_lock(hashtextextended(:key, 0))"),
+            {"key": key},
+        ).scalar():
+            raise PurgeInProgress(key)
+        try:
+            yield
+        finally:
+            lock.execute(
+                text("SELECT pg_advisory_unlock(hashtextextended(:key, 0))"),
+                {"key": key},
+            )
+
+
+class PurgeProgress(SQLModel, table=True):
+    baby_id: uuid.UUID = Field(primary_key=True)
+    table_name: str = Field(max_length=64)  # table being purged
+    deleted_rows: int = Field(default=0)
+    started_at: datetime = Field(default_factory=utcnow, sa_type=UTCDateTime)
+    updated_at: datetime = Field(default_factory=utcnow, sa_type=UTCDateTime)
+
+
+def baby_rows(model: type[SQLModel], baby_id: uuid.UUID):
+    if "medication_id" in model.model_fields:
+        return model.medication_id.in_(
+            select(Medication.id).where(Medication.baby_id == baby_id)
+        )
+    return model.baby_id == baby_id
+
+
+def purge_baby(session: Session, baby_id: uuid.UUID) -> int:
+    """Deletes a baby and all of its rows, resuming any earlier attempt.
+
+    Raises PurgeInProgress if the baby is being purged elsewhere.
+    """
+    with purge_lock("baby", baby_id):
+        return purge_baby_rows(session, baby_id)
+
+
+def purge_baby_rows(session: Session, baby_id: uuid.UUID) -> int:
+    progress = session.get(PurgeProgress, baby_id) or PurgeProgress(
+        baby_id=baby_id, table_name=PURGE_ORDER[0].__tablename__
+    )
+    tables = [model.__tablename__ for model in PURGE_ORDER]
+
+    for model in PURGE_ORDER[tables.index(progress.table_name) :]:
+        progress.table_name = model.__tablename__
+        while True:
+            batch = (
+                select(model.id)
+                .where(baby_rows(model, baby_id))
+                .limit(settings.purge_batch_size)
+                .scalar_subquery()
+            )
+            deleted = session.exec(
+                delete(model)
+                .where(model.id.in_(batch))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            progress.deleted_rows += deleted
+            progress.updated_at = utcnow()
+            session.add(progress)
+            session.commit()
+            if deleted < settings.purge_batch_size:
+                break
+
+    deleted_rows = progress.deleted_rows
+    session.exec(delete(Baby).where(Baby.id == baby_id))
+    session.delete(progress)
+    session.commit()
+    logger.info("Purged baby %s (%d rows)", baby_id, deleted_rows)
+    return deleted_rows
+
+
+def purge_user(session: Session, user_id: uuid.UUID) -> None:
+    """Deletes a user and their babies.
+
+    Raises PurgeInProgress if the user or one of the babies is being purged
+    elsewhere.
+    """
+    with purge_lock("user", user_id):
+        for baby_id in session.exec(
+            select(Baby.id).where(Baby.user_id == user_id)
+        ).all():
+            purge_baby(session, baby_id)
+
+        # Refresh tokens and idempotency keys go with it (ON DELETE CASCADE)
+        session.exec(delete(User).where(User.id == user_id))
+        session.commit()
+    logger.info("Purged user %s", user_id)
+
+
+def purge_deleted() -> None:
+    """Purges every deleted baby, then every deleted user."""
+    with engine.connect() as lock:
+        if not lock.execute(
+            text("SELECT pg_try_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID}
+        ).scalar():
+            return
+
+        try:
+            with Session(engine) as session:
+                for baby_id in session.exec(
+                    select(Baby.id).where(Baby.deleted_at.is_not(None))
+                ).all():
+                    try:
+                        purge_baby(session, baby_id)
+                    except PurgeInProgress:
+                        logger.info("Baby %s is being purged by a job", baby_id)
+                for user_id in session.exec(
+                    select(User.id).where(User.deleted_at.is_not(None))
+                ).all():
+                    try:
+                        purge_user(session, user_id)
+                    except PurgeInProgress:
+                        logger.info("User %s is being purged by a job", user_id)
+        finally:
+            lock.execute(
+                text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID}
+            )
+
+
+def schedule_baby_purge(session: Session, baby: Baby, user_id: uuid.UUID) -> Job:
+    return enqueue(session, "purge_baby", {"baby_id": str(baby.id)}, user_id=user_id)
+
+
+def schedule_user_purge(session: Session, user: User) -> Job:
+    return enqueue(session, "purge_user", {"user_id": str(user.id)}, user_id=user.id)
+
+
+# A purge already in progress elsewhere fails the job with PurgeInProgress,
+# and its retry finds the rows gone
+
+
+@job_handler("purge_baby")
+def run_baby_purge(payload: dict[str, Any]) -> dict[str, Any]:
+    with Session(engine) as session:
+        baby = session.get(Baby, uuid.UUID(payload["baby_id"]))
+        if baby is None or baby.deleted_at is None:
+            return {"deleted_rows": 0}
+        return {"deleted_rows": purge_baby(session, baby.id)}
+
+
+@job_handler("purge_user")
+def run_user_purge(payload: dict[str, Any]) -> None:
+    with Session(engine) as session:
+        user = session.get(User, uuid.UUID(payload["user_id"]))
+        if user is not None and user.deleted_at is not None:
+            purge_user(session, user.id)
+
+
+if __name__ == "__main__":
+    purge_deleted()
@@ -0,0 +1,232 @@
+# Login rate limiting and lockout, checked before any DB access or hashing
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Takes a token from every bucket (KEYS, with ARGV: now, then capacity and
+# rate per bucket), or from none of them
+TOKEN_BUCKETS_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'updated_at')
+    local available = tonumber(state[1]) or capacity
+    local updated_at = tonumber(state[2]) or now
+    available = math.min(capacity, available + (now - updated_at) * rate)
+    if available < 1 then
+        retry_after = math.max(retry_after, (1 - available) / rate)
+    end
+    tokens[i] = available
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    if retry_after == 0 then
+        tokens[i] = tokens[i] - 1
+    end
+    redis.call('HSET', key, 'tokens', tokens[i], 'updated_at', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return tostring(retry_after)
+"""
+
+
+def lockout_remaining(
+    failures: list[float], now: float, window: float, limit: int
+) -> float:
+    """Seconds until fewer than `limit` of the failures (sorted times) fall
+    within the window, or 0 if that is already the case."""
+    failures = [failed_at for failed_at in failures if failed_at > now - window]
+    if len(failures) < limit:
+        return 0.0
+    return failures[len(failures) - limit] + window - now
+
+
+class MemoryBackend:
+    """Per-process limiter state, bounded to `max_keys` (least recent evicted).
+
+    Buckets are (tokens, updated_at) tuples; failures are deques of
+    timestamps capped at the lockout threshold. They are bounded separately,
+    so a flood of bucket keys cannot evict the failures and lift lockouts.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.failures: OrderedDict[str, deque] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _store(self, entries: OrderedDict, key: str, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_keys:
+            entries.popitem(last=False)
+
+    def take(self, buckets: list[tuple[str, float, float]]) -> float:
+        """Takes one token from every (key, capacity, rate) bucket, or none.
+
+        Returns 0 if taken, else the seconds until every bucket has one.
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens = []
+            retry_after = 0.0
+            for key, capacity, rate in buckets:
+                available, updated_at = self.buckets.get(key, (capacity, now))
+                available = min(capacity, available + (now - updated_at) * rate)
+                if available < 1:
+                    retry_after = max(retry_after, (1 - available) / rate)
+                tokens.append(available)
+            for (key, _, _), available in zip(buckets, tokens):
+                self._store(
+                    self.buckets,
+                    key,
+                    (available if retry_after else available - 1, now),
+                )
+        return retry_after
+
+    def add_failure(self, key: str, window: float, limit: int):
+        with self.lock:
+            failures = self.failures.get(key)
+            if failures is None:
+                failures = deque(maxlen=limit)
+            failures.append(time.monotonic())
+            self._store(self.failures, key, failures)
+
+    def lockout_remaining(self, key: str, window: float, limit: int) -> float:
+        with self.lock:
+            failures = list(self.failures.get(key, ()))
+        return lockout_remaining(failures, time.monotonic(), window, limit)
+
+    def reset(self, key: str):
+        with self.lock:
+            self.failures.pop(key, None)
+
+
+class RedisBackend:
+    """Limiter state shared by every worker (needs the `redis` package).
+
+    While Redis is unreachable, this worker limits on its own state instead.
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.errors = redis.RedisError
+        self.token_buckets = self.client.register_script(TOKEN_BUCKETS_SCRIPT)
+        self.fallback = MemoryBackend(settings.login_limiter_max_keys)
+
+    def take(self, buckets: list[tuple[str, float, float]]) -> float:
+        args = [time.time()]
+        for _, capacity, rate in buckets:
+            args += [capacity, rate]
+        try:
+            return float(
+                self.token_buckets(keys=[key for key, _, _ in buckets], args=args)
+            )
+        except self.errors:
+            logger.warning("Could not take login tokens from Redis", exc_info=True)
+            return self.fallback.take(buckets)
+
+    def add_failure(self, key: str, window: float, limit: int):
+        now = time.time()
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.zadd(key, {str(now): now})
+                pipe.zremrangebyscore(key, "-inf", now - window)
+                pipe.expire(key, int(window) + 1)
+                pipe.execute()
+        except self.errors:
+            logger.warning("Could not record a login failure in Redis", exc_info=True)
+            self.fallback.add_failure(key, window, limit)
+
+    def lockout_remaining(self, key: str, window: float, limit: int) -> float:
+        now = time.time()
+        try:
+            failures = self.client.zrangebyscore(
+                key, now - window, "+inf", withscores=True
+            )
+        except self.errors:
+            logger.warning("Could not read login failures from Redis", exc_info=True)
+            return self.fallback.lockout_remaining(key, window, limit)
+        return max(
+            lockout_remaining(
+                [failed_at for _, failed_at in failures], now, window, limit
+            ),
+            # Failures recorded while Redis was unreachable
+            self.fallback.lockout_remaining(key, window, limit),
+        )
+
+    def reset(self, key: str):
+        self.fallback.reset(key)
+        try:
+            self.client.delete(key)
+        except self.errors:
+            logger.warning("Could not reset login failures in Redis", exc_info=True)
+
+
+class LoginLimiter:
+    """Token buckets per IP and per email, plus a lockout per email.
+
+    An email is locked out once it has `login_lockout_threshold` failed
+    attempts within `login_failure_window_seconds` (a sliding window).
+
+    The IP is the client address uvicorn resolved, which only comes from
+    X-Forwarded-For when sent by a trusted proxy (server_forwarded_allow_ips).
+    """
+
+    def __init__(self, backend: MemoryBackend | RedisBackend):
+        self.backend = backend
+
+    def check(self, ip: str, email: str) -> float:
+        """Returns 0 if the attempt may proceed, else the seconds to wait."""
+        email = email.lower()
+        retry_after = self.backend.lockout_remaining(
+            f"login:failures:{email}",
+            settings.login_failure_window_seconds,
+            settings.login_lockout_threshold,
+        )
+        if retry_after:
+            return retry_after
+
+        # A refused attempt takes a token from neither bucket
+        return self.backend.take(
+            [
+                (
+                    f"login:ip:{ip}",
+                    settings.login_burst_per_ip,
+                    settings.login_rate_per_ip / 60,
+                ),
+                (
+                    f"login:email:{email}",
+                    settings.login_burst_per_email,
+                    settings.login_rate_per_email / 60,
+                ),
+            ]
+        )
+
+    def record_failure(self, email: str):
+        self.backend.add_failure(
+            f"login:failures:{email.lower()}",
+            settings.login_failure_window_seconds,
+            settings.login_lockout_threshold,
+        )
+
+    def record_success(self, email: str):
+        self.backend.reset(f"login:failures:{email.lower()}")
+
+
+login_limiter = LoginLimiter(
+    RedisBackend(settings.redis_url)
+    if settings.redis_url
+    else MemoryBackend(settings.login_limiter_max_keys)
+)
@@ -0,0 +1,47 @@
+# Fast JSON responses for list routes
+from typing import Any, Sequence
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import Row
+from sqlmodel import SQLModel
+
+
+# UTC datetimes end in "Z", as in the routes pydantic serializes
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def read_columns(model: type[SQLModel], schema: type[SQLModel]) -> list:
+    """Table columns matching the fields of a read schema, in schema order."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def row_dicts(rows: Sequence[Row[Any]]) -> list[dict[str, Any]]:
+    if not rows:
+        return []
+
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+class RowsResponse(Response):
+    """Serializes SQL result rows straight to JSON with orjson.
+
+    Skips the per-row pydantic validation FastAPI does for `response_model`;
+    the route's `response_model` is still used for the OpenAPI schema.
+    Select the columns with `read_columns` so the payload matches it.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Sequence[Row[Any]]) -> bytes:
+        return dumps(row_dicts(content))
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,34 @@
+# Production server entrypoint: multi-worker uvicorn on uvloop + httptools
+#
+#   python -m app.server
+#
+# Use `make run` (fastapi dev) for local development with auto-reload.
+import os
+
+import uvicorn
+
+from app.config import settings
+
+
+def main():
+    uvicorn.run(
+        "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=settings.web_concurrency or os.cpu_count() or 1,
+        loop="uvloop",
+        http="httptools",
+        timeout_keep_alive=settings.server_keep_alive_seconds,
+        timeout_graceful_shutdown=settings.server_graceful_shutdown_seconds,
+        backlog=settings.server_backlog,
+        # Client addresses come from X-Forwarded-For, but only when sent by
+        # a proxy listed in SERVER_FORWARDED_ALLOW_IPS (set it to the
+        # platform router's address or subnet)
+        proxy_headers=True,
+        forwarded_allow_ips=settings.server_forwarded_allow_ips,
+        access_log=settings.server_access_log,
+    )
+
+
+if __name__ == "__main__":
+    main()
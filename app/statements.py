@@ -0,0 +1,32 @@
+# Pre-built statements of the hot queries
+#
+# Building a select() and generating the cache key SQLAlchemy looks its
+# compiled SQL up with costs about as much CPU as running a small query. A
+# statement built once, with bindparam() placeholders for the values, keeps
+# its memoized cache key, so running it again skips both. With psycopg 3
+# (`db_driver = "psycopg"`), the server also prepares the statements run
+# `db_prepare_threshold` times on a connection.
+#
+# Benchmark: python -m benchmarks.bench_statements
+import functools
+import uuid
+
+from sqlalchemy import Select, bindparam
+from sqlmodel import Session, SQLModel, select
+
+
+@functools.cache
+def select_by_id(model: type[SQLModel]) -> Select:
+    return select(model).where(model.id == bindparam("id"))
+
+
+def get_by_id(session: Session, model: type[SQLModel], id):
+    """Like session.get(model, id), through a pre-built statement.
+
+    A malformed id (e.g. from a URL path) finds nothing, like an unknown one.
+    """
+    try:
+        id = id if isinstance(id, uuid.UUID) else uuid.UUID(str(id))
+    except ValueError:
+        return None
+    return session.exec(select_by_id(model), params={"id": id}).first()
@@ -0,0 +1,40 @@
+# Local time zones of users and babies
+#
+# Timestamps are stored in UTC (`timestamptz`). To aggregate per local day,
+# filter on the UTC bounds of the local days (an indexed range) and group by
+# `local_day` in SQL.
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import func
+
+DEFAULT_TIMEZONE = "UTC"
+
+
+def validate_timezone(name: str | None) -> str | None:
+    """Pydantic validator for IANA time zone names (e.g. "Europe/Lisbon")."""
+    if name is None:
+        return None
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone: {name}")
+    return name
+
+
+def local_day(column, timezone_name):
+    """SQL: the local calendar day of a timestamptz column, as a `date`.
+
+    `timezone_name` may be a string or a SQL expression (e.g. a column).
+    """
+    return func.date(func.timezone(timezone_name, column))
+
+
+def local_day_bounds(
+    first: date, last: date, timezone_name: str
+) -> tuple[datetime, datetime]:
+    """UTC [start, end) spanning the local days `first` to `last` inclusive."""
+    zone = ZoneInfo(timezone_name)
+    start = datetime.combine(first, time(), zone)
+    end = datetime.combine(last + timedelta(days=1), time(), zone)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
@@ -1,9 +1,11 @@
 import uuid
+from datetime import datetime
 
-from pydantic import EmailStr
+from pydantic import EmailStr, field_validator
 from sqlmodel import Field, SQLModel
-from sqlalchemy import event
-from app.database import TimestampMixin, update_timestamp
+from sqlalchemy import Index, event, text
+from app.database import TimestampMixin, UTCDateTime, update_timestamp
+from app.timezones import DEFAULT_TIMEZONE, validate_timezone
 
 
 class UserBase(SQLModel):
@@ -11,11 +13,26 @@ class UserBase(SQLModel):
     email: EmailStr = Field(unique=True, max_length=50)
     first_name: str | None = Field(default=None, max_length=50)
     last_name: str | None = Field(default=None, max_length=50)
+    timezone: str = Field(default=DEFAULT_TIMEZONE, max_length=64)  # IANA name
+
+    _validate_timezone = field_validator("timezone")(validate_timezone)
 
 
 class User(UserBase, TimestampMixin, table=True):
+    __table_args__ = (
+        Index(
+            "ix_user_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     password: str = Field(max_length=255)
+    # Bumped to revoke every access token issued before
+    token_version: int = Field(default=0)
+    # Set on delete; the rows are then purged in the background (app/purge.py)
+    deleted_at: datetime | None = Field(default=None, sa_type=UTCDateTime)
 
 
 class UserResponse(UserBase):
@@ -26,4 +43,17 @@ class UserCreate(UserBase):
     password: str
 
 
+# Opaque, single-use refresh tokens; only their SHA-256 is stored. Tokens
+# rotated from the same login share a family, revoked as a whole on reuse.
+class RefreshToken(SQLModel, TimestampMixin, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    token_hash: str = Field(unique=True, max_length=64)
+    family_id: uuid.UUID = Field(index=True)
+    user_id: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE")
+    expires_at: datetime = Field(sa_type=UTCDateTime)
+    used_at: datetime | None = Field(default=None, sa_type=UTCDateTime)
+    revoked_at: datetime | None = Field(default=None, sa_type=UTCDateTime)
+
+
 event.listen(User, "before_update", update_timestamp)
+event.listen(RefreshToken, "before_update", update_timestamp)
@@ -1,13 +1,19 @@
+from datetime import datetime, timezone
 from typing import Annotated, List
 
 from fastapi import APIRouter, HTTPException, Query, status
-from sqlmodel import select
+from sqlmodel import select, update
 
-from app.database import SessionDep
-from app.oauth2 import CurrentUserDep, get_password_hash
-from app.users.models import User, UserCreate, UserResponse
+from app.babies.members import memberships
+from app.babies.models import Baby, BabyMember
+from app.compression import CompressedRoute
+from app.database import ReadSessionDep, SessionDep
+from app.oauth2 import CurrentUserDep, get_password_hash, token_versions
+from app.purge import schedule_user_purge
+from app.statements import get_by_id
+from app.users.models import RefreshToken, User, UserCreate, UserResponse
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=CompressedRoute)
 
 
 @router.get("/me", response_model=UserResponse)
@@ -17,18 +23,20 @@ def read_user_me(current_user: CurrentUserDep):
 
 @router.get("/", response_model=List[UserResponse])
 def read_users(
-    session: SessionDep,
+    session: ReadSessionDep,
     offset: int = 0,
     limit: Annotated[int, Query(le=100)] = 100,
 ):
-    users = session.exec(select(User).offset(offset).limit(limit)).all()
+    users = session.exec(
+        select(User).where(User.deleted_at.is_(None)).offset(offset).limit(limit)
+    ).all()
     return users
 
 
 @router.get("/{id}", response_model=UserResponse)
-def read_user(id: str, session: SessionDep):
-    user = session.get(User, id)
-    if not user:
+def read_user(id: str, session: ReadSessionDep):
+    user = get_by_id(session, User, id)
+    if not user or user.deleted_at:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
@@ -60,8 +68,8 @@ def create_user(user: UserCreate, session: SessionDep):
 @router.patch("/{id}", response_model=UserResponse)
 def update_user(id: str, user: UserCreate, session: SessionDep):
     valid_user = User.model_validate(user)
-    existing_user = session.get(User, id)
-    if not existing_user:
+    existing_user = get_by_id(session, User, id)
+    if not existing_user or existing_user.deleted_at:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
@@ -69,6 +77,7 @@ def update_user(id: str, user: UserCreate, session: SessionDep):
     existing_user.email = valid_user.email
     existing_user.first_name = valid_user.first_name
     existing_user.last_name = valid_user.last_name
+    existing_user.timezone = valid_user.timezone
     existing_user.password = get_password_hash(valid_user.password)
 
     session.add(existing_user)
@@ -79,10 +88,40 @@ def update_user(id: str, user: UserCreate, session: SessionDep):
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(id: str, session: SessionDep) -> None:
-    user = session.get(User, id)
-    if not user:
+    user = get_by_id(session, User, id)
+    if not user or user.deleted_at:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
-    session.delete(user)
+
+    # Hidden right away; the user and their babies are purged by a job
+    # (app/purge.py)
+    now = datetime.now(timezone.utc)
+    user.deleted_at = now
+    token_versions.bump(user, session)
+    session.add(user)
+    baby_ids = session.exec(
+        update(Baby)
+        .where(Baby.user_id == user.id, Baby.deleted_at.is_(None))
+        .values(deleted_at=now, updated_at=now)
+        .returning(Baby.id)
+    ).all()
+    # The babies' other members lose them too
+    members = session.exec(
+        select(User)
+        .join(BabyMember, BabyMember.user_id == User.id)
+        .where(BabyMember.baby_id.in_(baby_ids), User.id != user.id)
+        .distinct()
+    ).all()
+    for member in members:
+        token_versions.bump(member, session)
+        session.add(member)
+    session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now, updated_at=now)
+    )
+    # No link to the job: the deleted user could not authenticate to read it
+    schedule_user_purge(session, user)
     session.commit()
+    memberships.invalidate(user.id, *(member.id for member in members))
@@ -0,0 +1,67 @@
+# Encode time per 10k rows: response_model validation vs RowsResponse
+#
+# Run with: python -m benchmarks.bench_serialization
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.babies.models import DiaperChange, DiaperChangeRead
+from app.responses import RowsResponse, read_columns
+
+ROWS = 10_000
+RUNS = 20
+
+
+def load_diapers():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine, tables=[DiaperChange.__table__])
+
+    baby_id = uuid.uuid4()
+    start = datetime(2025, 1, 1)
+    with Session(engine) as session:
+        session.add_all(
+            DiaperChange(
+                baby_id=baby_id,
+                time=start + timedelta(hours=3 * i),
+                pipi=True,
+                poop=i % 3 == 0,
+                used_cream=i % 5 == 0,
+            )
+            for i in range(ROWS)
+        )
+        session.commit()
+
+        objects = session.exec(select(DiaperChange)).all()
+        session.expunge_all()
+        rows = session.exec(select(*read_columns(DiaperChange, DiaperChangeRead))).all()
+    return objects, rows
+
+
+def main():
+    objects, rows = load_diapers()
+    adapter = TypeAdapter(List[DiaperChange])
+
+    # What FastAPI does for `response_model=List[DiaperChange]`
+    def response_model_path():
+        value = adapter.validate_python(objects, from_attributes=True)
+        return JSONResponse(adapter.dump_python(value, mode="json")).body
+
+    def rows_response_path():
+        return RowsResponse(rows).body
+
+    for name, encode in [
+        ("response_model + json", response_model_path),
+        ("RowsResponse (orjson)", rows_response_path),
+    ]:
+        seconds = min(timeit.repeat(encode, number=1, repeat=RUNS))
+        size_kb = len(encode()) / 1024
+        print(f"{name:<24} {seconds * 1000:8.2f} ms / {ROWS} rows  {size_kb:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
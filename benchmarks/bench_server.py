@@ -0,0 +1,83 @@
+# Throughput of the dev server (`fastapi dev`) vs the production entrypoint
+#
+# Run with: python -m benchmarks.bench_server [path]
+# Both servers are started in turn against the configured database; the
+# default path (/openapi.json) needs no data.
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+PORT = 8765
+REQUESTS = 5_000
+CONCURRENCY = 64
+
+SERVERS = {
+    "fastapi dev (current)": ["fastapi", "dev", "app/main.py", "--port", str(PORT)],
+    "app.server (production)": [sys.executable, "-m", "app.server"],
+}
+
+
+async def wait_until_ready(client: httpx.AsyncClient, path: str):
+    for _ in range(100):
+        try:
+            await client.get(path)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+
+async def load(path: str) -> tuple[float, list[float]]:
+    latencies = []
+    limits = httpx.Limits(max_connections=CONCURRENCY)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=30
+    ) as client:
+        await wait_until_ready(client, path)
+        queue = asyncio.Queue()
+        for _ in range(REQUESTS):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        return time.perf_counter() - started, latencies
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "/openapi.json"
+    env = {**os.environ, "PORT": str(PORT), "HOST": "127.0.0.1"}
+
+    for name, command in SERVERS.items():
+        server = subprocess.Popen(
+            command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            elapsed, latencies = asyncio.run(load(path))
+        finally:
+            server.terminate()
+            server.wait()
+
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(
+            f"{name:<26} {REQUESTS / elapsed:8.0f} req/s"
+            f"  p50 {p50:6.1f} ms  p99 {p99:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# CPU per query: select() built per request vs pre-built statements
+#
+# Run with: python -m benchmarks.bench_statements
+# Uses an in-memory SQLite database, so the time is almost all Python: the
+# difference is what app/statements.py saves per query.
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.archive import build_select_events, read_events
+from app.babies.models import Baby, DiaperChange, DiaperChangeRead
+from app.database import utcnow
+from app.statements import get_by_id
+from app.users.models import User
+
+QUERIES = 5_000
+RUNS = 5
+
+
+def load_data(session: Session) -> tuple[uuid.UUID, uuid.UUID]:
+    user = User(email="bench@example.com", password="-")
+    baby = Baby(name="Bench", birthdate=datetime(2025, 1, 1), user_id=user.id)
+    start = utcnow() - timedelta(days=12)
+    session.add_all([user, baby])
+    session.add_all(
+        DiaperChange(
+            baby_id=baby.id,
+            time=start + timedelta(hours=3 * i),
+            pipi=True,
+            poop=i % 3 == 0,
+        )
+        for i in range(100)
+    )
+    session.commit()
+    return user.id, baby.id
+
+
+def main():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(
+        engine, tables=[User.__table__, Baby.__table__, DiaperChange.__table__]
+    )
+    with Session(engine) as session:
+        user_id, baby_id = load_data(session)
+        # A recent day, so no archive table is read
+        end = utcnow() - timedelta(days=1)
+        start = end - timedelta(days=1)
+
+        cases = {
+            "user by id": (
+                lambda: session.exec(select(User).where(User.id == user_id)).first(),
+                lambda: get_by_id(session, User, user_id),
+            ),
+            "baby by id": (
+                lambda: session.exec(select(Baby).where(Baby.id == baby_id)).first(),
+                lambda: get_by_id(session, Baby, baby_id),
+            ),
+            "events by range": (
+                lambda: session.exec(
+                    build_select_events(
+                        DiaperChange, DiaperChangeRead, False, baby_id, start, end
+                    )
+                ).all(),
+                lambda: read_events(
+                    session, DiaperChange, DiaperChangeRead, baby_id, start, end
+                ),
+            ),
+        }
+        for name, (built, prebuilt) in cases.items():
+            times = [
+                min(timeit.repeat(run, number=QUERIES, repeat=RUNS)) / QUERIES * 1e6
+                for run in (built, prebuilt)
+            ]
+            print(
+                f"{name:<16} built {times[0]:7.1f} µs  pre-built {times[1]:7.1f} µs"
+                f"  saved {times[0] - times[1]:6.1f} µs / query"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# Synthetic dataset for the query plan tests
+from datetime import timedelta
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from app.database import utcnow
+from app.oauth2 import get_password_hash
+from app.partitions import (
+    PARTITIONED_TABLES,
+    add_months,
+    create_partitions,
+    month_start,
+)
+
+ROOT = Path(__file__).resolve().parents[2]
+
+PASSWORD = "query-plans"
+HISTORY_DAYS = 120
+USERS_PER_SCALE = 100
+BABIES_PER_USER = 2
+
+# Event table -> INSERT of its rows for every baby, interleaved by time like
+# real traffic (so a baby's rows are spread over the table)
+EVENT_INSERTS = {
+    "diaperchange": """
+        INSERT INTO diaperchange
+            (id, created_at, updated_at, time, pipi, poop, used_cream, baby_id)
+        SELECT gen_random_uuid(), t, t, t,
+            random() < 0.8, random() < 0.4, random() < 0.1, baby_id
+        FROM (
+            SELECT b.id AS baby_id, slot + random() * interval '2 hours' AS t
+            FROM generate_series(:start, :end, interval '3 hours') AS slot,
+                baby AS b
+        ) AS events
+        ORDER BY t
+    """,
+    "feeding": """
+        INSERT INTO feeding
+            (id, created_at, updated_at, start_time, end_time, type, baby_id)
+        SELECT gen_random_uuid(), t, t, t, t + interval '20 minutes',
+            CASE WHEN random() < 0.5 THEN 'BREAST' ELSE 'BOTTLE' END::feedingtype,
+            baby_id
+        FROM (
+            SELECT b.id AS baby_id, slot + random() * interval '2 hours' AS t
+            FROM generate_series(:start, :end, interval '3 hours') AS slot,
+                baby AS b
+        ) AS events
+        ORDER BY t
+    """,
+    "sleep": """
+        INSERT INTO sleep
+            (id, created_at, updated_at, start_time, end_time, baby_id)
+        SELECT gen_random_uuid(), t, t, t, t + interval '2 hours', baby_id
+        FROM (
+            SELECT b.id AS baby_id, slot + random() * interval '1 hour' AS t
+            FROM generate_series(:start, :end, interval '6 hours') AS slot,
+                baby AS b
+        ) AS events
+        ORDER BY t
+    """,
+    "bath": """
+        INSERT INTO bath (id, created_at, updated_at, time, baby_id)
+        SELECT gen_random_uuid(), slot, slot, slot, b.id
+        FROM generate_series(:start, :end, interval '2 days') AS slot, baby AS b
+        ORDER BY slot
+    """,
+    "measurement": """
+        INSERT INTO measurement
+            (id, created_at, updated_at, time, height, weight, baby_id)
+        SELECT gen_random_uuid(), slot, slot, slot,
+            50 + (random() * 20)::int, 3000 + (random() * 4000)::int, b.id
+        FROM generate_series(:start, :end, interval '7 days') AS slot, baby AS b
+        ORDER BY slot
+    """,
+    "medication": """
+        INSERT INTO medication
+            (id, created_at, updated_at, name, dosage, is_active, is_vaccine,
+             interval_hours, baby_id)
+        SELECT gen_random_uuid(), :start, :start, m.name, m.dosage, true, false,
+            m.interval_hours, b.id
+        FROM baby AS b,
+            (VALUES ('Vitamin D', '1 drop', 24), ('Paracetamol', '2.5 ml', 8))
+                AS m (name, dosage, interval_hours)
+    """,
+    "medicationlogs": """
+        INSERT INTO medicationlogs
+            (id, created_at, updated_at, time, dosage, medication_id)
+        SELECT gen_random_uuid(), slot, slot, slot, 1, m.id
+        FROM medication AS m,
+            generate_series(
+                :start, :end, make_interval(hours => m.interval_hours)
+            ) AS slot
+        ORDER BY slot
+    """,
+}
+
+
+def migrate(engine: Engine) -> None:
+    config = Config()
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+def load_dataset(engine: Engine, scale: int = 1) -> None:
+    """Recreates the schema and fills it with `scale` x 100 users' history."""
+    migrate(engine)
+
+    end = utcnow()
+    start = end - timedelta(days=HISTORY_DAYS)
+    with engine.begin() as connection:
+        for table in PARTITIONED_TABLES:
+            create_partitions(
+                connection,
+                table,
+                month_start(start),
+                add_months(month_start(end), settings.partition_months_ahead),
+            )
+
+        connection.execute(
+            text(
+                'INSERT INTO "user" (id, created_at, updated_at, email, password, '
+                "token_version, timezone) "
+                "SELECT gen_random_uuid(), :start, :start, "
+                "'user' || i || '@example.com', :password, 0, 'UTC' "
+                "FROM generate_series(1, :users) AS i"
+            ),
+            {
+                "start": start,
+                "password": get_password_hash(PASSWORD),
+                "users": USERS_PER_SCALE * scale,
+            },
+        )
+        connection.execute(
+            text(
+                "INSERT INTO baby (id, created_at, updated_at, birthdate, name, "
+                "user_id) "
+                "SELECT gen_random_uuid(), :start, :start, :start, "
+                "'Baby ' || n, u.id "
+                'FROM "user" AS u, generate_series(1, :babies) AS n'
+            ),
+            {"start": start, "babies": BABIES_PER_USER},
+        )
+        connection.execute(
+            text(
+                "INSERT INTO babymember (id, created_at, updated_at, baby_id, "
+                "user_id, role) "
+                "SELECT gen_random_uuid(), :start, :start, id, user_id, 'OWNER' "
+                "FROM baby"
+            ),
+            {"start": start},
+        )
+        for statement in EVENT_INSERTS.values():
+            connection.execute(text(statement), {"start": start, "end": end})
+
+    # Fresh statistics and visibility map, as autovacuum would leave them
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE"))
+
+
+def sample_ids(engine: Engine) -> dict[str, str]:
+    """Ids of the first user, their first baby and its latest events."""
+    with engine.connect() as connection:
+        user_id, email = connection.execute(
+            text("SELECT id, email FROM \"user\" WHERE email = 'user1@example.com'")
+        ).one()
+        baby_id = connection.execute(
+            text("SELECT id FROM baby WHERE user_id = :user ORDER BY name LIMIT 1"),
+            {"user": user_id},
+        ).scalar_one()
+
+        def latest(table: str, column: str, parent: str = "baby_id", of=baby_id):
+            return connection.execute(
+                text(
+                    f'SELECT id FROM "{table}" WHERE {parent} = :parent '
+                    f"ORDER BY {column} DESC LIMIT 1"
+                ),
+                {"parent": of},
+            ).scalar_one()
+
+        medication_id = connection.execute(
+            text(
+                "SELECT id FROM medication WHERE baby_id = :baby "
+                "AND interval_hours = 8"
+            ),
+            {"baby": baby_id},
+        ).scalar_one()
+
+        ids = {
+            "user_id": user_id,
+            "baby_id": baby_id,
+            "diaper_id": latest("diaperchange", "time"),
+            "feeding_id": latest("feeding", "start_time"),
+            "sleep_id": latest("sleep", "start_time"),
+            "bath_id": latest("bath", "time"),
+            "measurement_id": latest("measurement", "time"),
+            "medication_id": medication_id,
+            "medication_log_id": latest(
+                "medicationlogs", "time", "medication_id", medication_id
+            ),
+        }
+    return {"email": email, **{name: str(id) for name, id in ids.items()}}
@@ -0,0 +1,250 @@
+# Capturing, explaining and comparing the plans of the queries a route issues
+import difflib
+import json
+import os
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+from app.database import utcnow
+from app.partitions import PARTITIONED_TABLES
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+
+# Tables that must never be read with a sequential scan
+HOT_TABLES = {
+    *PARTITIONED_TABLES,
+    "bath",
+    "measurement",
+    "medication",
+    "diaperchangearchive",
+    "feedingarchive",
+    "sleeparchive",
+    "medicationlogsarchive",
+}
+
+# Monthly and default partitions, in relation and index names alike
+PARTITION_SUFFIX = re.compile(r"_(p\d{4}_\d{2}|default)(?=_|\b)")
+DML = ("select", "insert", "update", "delete", "with")
+
+
+@contextmanager
+def capture_queries(engine: Engine):
+    """Collects the (statement, parameters) of the queries run on `engine`."""
+    queries: list[tuple[str, dict]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        lowered = statement.lstrip().lower()
+        if many or not lowered.startswith(DML) or "pg_catalog" in lowered:
+            return
+        queries.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(engine: Engine, statement: str, parameters) -> dict:
+    """EXPLAIN (ANALYZE, BUFFERS) of a captured query; writes are rolled back.
+
+    INSERTs are only planned: their rows (and keys) were already committed
+    by the route.
+    """
+    insert = statement.lstrip().lower().startswith("insert")
+    options = "FORMAT JSON" if insert else "ANALYZE, BUFFERS, FORMAT JSON"
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            cursor = connection.connection.cursor()
+            cursor.execute(f"EXPLAIN ({options}) {statement}", parameters)
+            (plan,) = cursor.fetchone()
+        finally:
+            transaction.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def nodes(plan: dict):
+    """All the nodes of a plan, depth first."""
+    stack = [plan["Plan"] if "Plan" in plan else plan]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.get("Plans", [])))
+
+
+def base_relation(name: str) -> str:
+    return PARTITION_SUFFIX.sub("", name)
+
+
+def index_names(plan: dict) -> set[str]:
+    return {node["Index Name"] for node in nodes(plan) if "Index Name" in node}
+
+
+def hot_seq_scans(plan: dict) -> list[str]:
+    """Hot tables read with a sequential scan (empty partitions are ignored)."""
+    return [
+        node["Relation Name"]
+        for node in nodes(plan)
+        if node["Node Type"] == "Seq Scan"
+        and base_relation(node["Relation Name"]) in HOT_TABLES
+        and buffers(node) > 0
+    ]
+
+
+def buffers(node: dict) -> int:
+    node = node.get("Plan", node)
+    return node.get("Shared Hit Blocks", 0) + node.get("Shared Read Blocks", 0)
+
+
+def execution_ms(plan: dict) -> float:
+    return plan.get("Execution Time", 0.0)
+
+
+def shape(plan: dict) -> list[str]:
+    """The plan's nodes, relations and indexes, without costs or timings."""
+
+    def walk(node: dict, depth: int) -> list[str]:
+        parts = [node["Node Type"]]
+        if "Relation Name" in node:
+            parts.append(f"on {base_relation(node['Relation Name'])}")
+        if "Index Name" in node:
+            parts.append(f"using {PARTITION_SUFFIX.sub('_p*', node['Index Name'])}")
+        lines = ["  " * depth + " ".join(parts)]
+        # Appends over the partitions list one subtree per partition, as many
+        # as there are months of data: keep one of each run of identical ones
+        previous = None
+        for child in node.get("Plans", []):
+            child_lines = walk(child, depth + 1)
+            if child_lines != previous:
+                lines.extend(child_lines)
+            previous = child_lines
+        return lines
+
+    return walk(plan["Plan"], 0)
+
+
+def golden_text(shapes: list[list[str]]) -> str:
+    return (
+        "\n\n".join(
+            f"-- query {number}\n" + "\n".join(lines)
+            for number, lines in enumerate(shapes, 1)
+        )
+        + "\n"
+    )
+
+
+def check_golden(name: str, shapes: list[list[str]]) -> str | None:
+    """Compares the plan shapes to golden/<name>.txt, returning the diff if any.
+
+    Missing golden files are written, and all of them are rewritten with
+    UPDATE_GOLDEN_PLANS=1.
+    """
+    path = GOLDEN_DIR / f"{name}.txt"
+    current = golden_text(shapes)
+    if os.environ.get("UPDATE_GOLDEN_PLANS") or not path.exists():
+        path.write_text(current)
+        return None
+
+    golden = path.read_text()
+    if golden == current:
+        return None
+
+    return "".join(
+        difflib.unified_diff(
+            golden.splitlines(keepends=True),
+            current.splitlines(keepends=True),
+            f"golden/{name}.txt",
+            "current",
+        )
+    )
+
+
+LATENCY_FACTOR = float(os.environ.get("QUERY_PLAN_LATENCY_FACTOR", "1"))
+
+
+@dataclass
+class RouteCase:
+    """A request and the budgets of every query it issues.
+
+    `path`, `params` and `json` are formatted with the sample ids (see
+    dataset.sample_ids) and the `week_ago` / `hour_ago` timestamps.
+    `indexes` must each be used (as a substring of an index name) by one of
+    the route's queries.
+    """
+
+    name: str
+    method: str
+    path: str
+    indexes: tuple[str, ...] = ()
+    params: dict[str, str] = field(default_factory=dict)
+    json: dict[str, Any] | None = None
+    status: int = 200
+    max_buffers: int = 200
+    max_ms: float = 50
+
+    def __str__(self) -> str:
+        return self.name
+
+
+def formatted(value, values: dict[str, str]):
+    if isinstance(value, str):
+        return value.format(**values)
+    if isinstance(value, dict):
+        return {key: formatted(item, values) for key, item in value.items()}
+    return value
+
+
+def check_route(engine: Engine, client, headers: dict, case: RouteCase, ids: dict):
+    now = utcnow()
+    values = {
+        **ids,
+        "week_ago": (now - timedelta(days=7)).isoformat(),
+        "hour_ago": (now - timedelta(hours=1)).isoformat(),
+    }
+    with capture_queries(engine) as queries:
+        response = client.request(
+            case.method,
+            formatted(case.path, values),
+            params=formatted(case.params, values),
+            json=formatted(case.json, values),
+            headers=headers,
+        )
+    assert response.status_code == case.status, response.text
+    assert queries, "the route issued no queries"
+
+    plans = [
+        explain(engine, statement, parameters) for statement, parameters in queries
+    ]
+    problems = []
+    for number, ((statement, _), plan) in enumerate(zip(queries, plans), 1):
+        query = f"query {number}: {' '.join(statement.split())[:200]}"
+        if scans := hot_seq_scans(plan):
+            problems.append(f"{query}\n  sequential scan on {', '.join(scans)}")
+        if buffers(plan) > case.max_buffers:
+            problems.append(
+                f"{query}\n  {buffers(plan)} buffers (budget {case.max_buffers})"
+            )
+        if execution_ms(plan) > case.max_ms * LATENCY_FACTOR:
+            problems.append(
+                f"{query}\n  {execution_ms(plan):.1f} ms "
+                f"(budget {case.max_ms * LATENCY_FACTOR:.1f} ms)"
+            )
+
+    used = set().union(*(index_names(plan) for plan in plans))
+    for index in case.indexes:
+        if not any(index in name for name in used):
+            problems.append(f"no query uses an index like {index!r} (used: {used})")
+
+    if diff := check_golden(case.name, [shape(plan) for plan in plans]):
+        problems.append(f"plans differ from the golden file:\n{diff}")
+
+    assert not problems, "\n".join(problems)
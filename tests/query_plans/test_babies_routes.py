@@ -0,0 +1,107 @@
+import pytest
+
+from tests.query_plans.plans import RouteCase, check_route
+
+BABY = "/babies/{baby_id}"
+MEDICATION = BABY + "/medications/{medication_id}"
+LAST_WEEK = {"from": "{week_ago}"}
+
+# "baby" (like "user") holds a few pages at this scale, which Postgres rightly
+# reads whole rather than through baby_pkey: the golden files pin those plans
+CASES = [
+    RouteCase("babies_list", "GET", "/babies/"),
+    RouteCase("babies_read", "GET", BABY),
+    RouteCase("babies_members", "GET", BABY + "/members"),
+    # One index descent per partition of each event table, for every baby
+    RouteCase(
+        "babies_overview",
+        "GET",
+        "/babies/overview",
+        ("baby_id_time",),
+        max_buffers=400,
+    ),
+    RouteCase(
+        "babies_changes",
+        "GET",
+        BABY + "/changes",
+        ("baby_id_updated_at", "medication_id_updated_at"),
+        params={"since": "{hour_ago}"},
+    ),
+    RouteCase(
+        "series_diapers_daily",
+        "GET",
+        BABY + "/series",
+        ("baby_id_time",),
+        {"metric": "diapers", "bucket": "day"},
+        max_buffers=400,
+    ),
+    RouteCase("diapers_week", "GET", BABY + "/diapers", ("baby_id_time",), LAST_WEEK),
+    # Whole history (~960 rows spread over the table): a bigger budget. The
+    # rows are sorted anyway, so either index on baby_id serves it
+    RouteCase(
+        "diapers_all",
+        "GET",
+        BABY + "/diapers",
+        ("baby_id",),
+        max_buffers=3000,
+        max_ms=150,
+    ),
+    RouteCase(
+        "feedings_week", "GET", BABY + "/feedings", ("baby_id_start_time",), LAST_WEEK
+    ),
+    RouteCase(
+        "sleeps_week", "GET", BABY + "/sleeps", ("baby_id_start_time",), LAST_WEEK
+    ),
+    RouteCase(
+        "sleeps_stats",
+        "GET",
+        BABY + "/sleeps/stats",
+        ("baby_id_start_time",),
+        {"days": "30"},
+        max_buffers=400,
+    ),
+    RouteCase("baths", "GET", BABY + "/baths", ("baby_id",)),
+    RouteCase("measurements", "GET", BABY + "/measurements", ("baby_id",)),
+    RouteCase("medications", "GET", BABY + "/medications", ("baby_id",)),
+    RouteCase(
+        "medications_adherence",
+        "GET",
+        BABY + "/medications/adherence",
+        ("medication_id_time",),
+        max_buffers=400,
+    ),
+    RouteCase(
+        "medication_logs_week",
+        "GET",
+        MEDICATION + "/logs",
+        ("medication_id_time",),
+        LAST_WEEK,
+    ),
+    RouteCase(
+        "diapers_create",
+        "POST",
+        BABY + "/diapers",
+        ("pkey",),
+        json={"pipi": True, "poop": False},
+        status=201,
+    ),
+    RouteCase(
+        "feedings_update",
+        "PATCH",
+        BABY + "/feedings/{feeding_id}",
+        ("pkey",),
+        json={"start_time": "{hour_ago}", "type": "bottle"},
+    ),
+    RouteCase(
+        "sleeps_delete",
+        "DELETE",
+        BABY + "/sleeps/{sleep_id}",
+        ("pkey",),
+        status=204,
+    ),
+]
+
+
+@pytest.mark.parametrize("case", CASES, ids=str)
+def test_route_plans(case, engine, client, auth_headers, ids):
+    check_route(engine, client, auth_headers, case, ids)
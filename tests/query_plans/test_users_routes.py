@@ -0,0 +1,16 @@
+import pytest
+
+from tests.query_plans.plans import RouteCase, check_route
+
+# "user" holds a few pages at this scale, which Postgres rightly reads whole
+# rather than through user_pkey: the golden files pin these plans
+CASES = [
+    RouteCase("users_me", "GET", "/users/me"),
+    RouteCase("users_list", "GET", "/users/"),
+    RouteCase("users_read", "GET", "/users/{user_id}"),
+]
+
+
+@pytest.mark.parametrize("case", CASES, ids=str)
+def test_route_plans(case, engine, client, auth_headers, ids):
+    check_route(engine, client, auth_headers, case, ids)
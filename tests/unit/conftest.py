@@ -0,0 +1,35 @@
+"""Unit tests: no Postgres or Redis needed.
+
+Modules that open sessions on the app's engines are pointed at an in-memory
+SQLite database instead, holding only the tables a test needs:
+
+    pytest tests/unit
+"""
+
+import os
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import create_engine
+
+# The settings require these; no connection is made with them
+for name, value in {
+    "DB_USERNAME": "postgres",
+    "DB_PASSWORD": "postgres",
+    "DB_HOSTNAME": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "newborn_daily_test",
+    "HASH_SECRET_KEY": "unit-tests",
+    "HASH_ALGORITHM": "HS256",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def sqlite_engine():
+    # One connection shared by every thread, as the database is in memory
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    yield engine
+    engine.dispose()
@@ -0,0 +1,114 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from starlette.requests import Request
+
+from app import database
+from app.config import settings
+from app.oauth2 import create_access_token
+
+
+@pytest.fixture
+def primary(monkeypatch, sqlite_engine):
+    monkeypatch.setattr(database, "engine", sqlite_engine)
+    monkeypatch.setattr(database, "_pins", database.MemoryPins())
+    monkeypatch.setattr(database, "_replica_down_until", 0.0)
+    return sqlite_engine
+
+
+@pytest.fixture
+def replica(monkeypatch, primary):
+    replica = create_engine("sqlite://")
+    monkeypatch.setattr(database, "read_engine", replica)
+    yield replica
+    replica.dispose()
+
+
+def read_bind(user_id):
+    with database.open_read_session(user_id) as session:
+        return session.get_bind()
+
+
+def request(method: str, user_id: str) -> Request:
+    token = create_access_token({"sub": user_id})
+    return Request(
+        {
+            "type": "http",
+            "method": method,
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+        }
+    )
+
+
+def test_reads_go_to_the_replica(primary, replica):
+    assert read_bind("user") is replica
+    assert read_bind(None) is replica
+
+
+def test_without_replica_reads_go_to_the_primary(monkeypatch, primary):
+    monkeypatch.setattr(database, "read_engine", None)
+    database.pin_to_primary("user")  # nothing to pin to
+
+    assert read_bind("user") is primary
+    assert not database._pins.is_pinned("user")
+
+
+def test_pin_sends_the_users_reads_to_the_primary(monkeypatch, primary, replica):
+    monkeypatch.setattr(settings, "db_replica_pin_seconds", 0.05)
+    database.pin_to_primary("user")
+
+    assert read_bind("user") is primary
+    assert read_bind("other") is replica
+    time.sleep(0.1)
+    assert read_bind("user") is replica
+
+
+def test_write_request_pins_its_user(primary, replica):
+    sessions = database.get_session(request("POST", "user"))
+    assert next(sessions).get_bind() is primary
+    sessions.close()
+
+    assert database._pins.is_pinned("user")
+    assert read_bind("user") is primary
+
+
+def test_read_request_does_not_pin(primary, replica):
+    sessions = database.get_session(request("GET", "user"))
+    next(sessions)
+    sessions.close()
+
+    assert not database._pins.is_pinned("user")
+
+
+def test_read_session_follows_the_pin(primary, replica):
+    database.pin_to_primary("user")
+
+    for user_id, bind in (("user", primary), ("other", replica)):
+        sessions = database.get_read_session(request("GET", user_id))
+        assert next(sessions).get_bind() is bind
+        sessions.close()
+
+
+def test_failed_replica_is_skipped_until_retried(
+    monkeypatch, tmp_path, primary, replica
+):
+    monkeypatch.setattr(settings, "db_replica_retry_seconds", 0.05)
+    monkeypatch.setattr(
+        database, "read_engine", create_engine(f"sqlite:///{tmp_path}/missing/db")
+    )
+    assert read_bind("user") is primary
+
+    # Back up, but not retried within db_replica_retry_seconds
+    monkeypatch.setattr(database, "read_engine", replica)
+    assert read_bind("user") is primary
+    time.sleep(0.1)
+    assert read_bind("user") is replica
+
+
+def test_redis_pins_fail_towards_the_primary():
+    pytest.importorskip("redis")
+    pins = database.RedisPins("redis://127.0.0.1:1/0")
+
+    pins.pin("user", 5)  # logged, not raised
+    assert pins.is_pinned("user")
@@ -0,0 +1,91 @@
+import threading
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, SQLModel, select
+
+from app.babies.models import Baby, DiaperChange
+from app.group_commit import GroupCommitWriter, PendingInsert
+from app.users.models import User
+
+
+@pytest.fixture
+def baby_id(sqlite_engine):
+    SQLModel.metadata.create_all(
+        sqlite_engine,
+        tables=[User.__table__, Baby.__table__, DiaperChange.__table__],
+    )
+    with Session(sqlite_engine) as session:
+        user = User(email="a@b.co", password="-")
+        baby = Baby(name="Baby", birthdate=datetime(2026, 1, 1), user_id=user.id)
+        session.add_all([user, baby])
+        session.commit()
+        return baby.id
+
+
+@pytest.fixture
+def writer(sqlite_engine):
+    writer = GroupCommitWriter(sqlite_engine)
+    writer.start()
+    yield writer
+    writer.stop()
+
+
+def diaper(baby_id) -> DiaperChange:
+    return DiaperChange(baby_id=baby_id, pipi=True, poop=False)
+
+
+def data_version(engine, baby_id) -> int:
+    with Session(engine) as session:
+        return session.exec(select(Baby.data_version).where(Baby.id == baby_id)).one()
+
+
+def test_insert_returns_once_committed(sqlite_engine, writer, baby_id):
+    event = diaper(baby_id)
+    writer.insert(event, baby_id)
+
+    with Session(sqlite_engine) as session:
+        assert session.exec(select(DiaperChange.id)).all() == [event.id]
+    assert data_version(sqlite_engine, baby_id) == 1
+
+
+def test_concurrent_inserts_are_all_committed(sqlite_engine, writer, baby_id):
+    threads = [
+        threading.Thread(target=writer.insert, args=(diaper(baby_id), baby_id))
+        for _ in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with Session(sqlite_engine) as session:
+        assert len(session.exec(select(DiaperChange.id)).all()) == 20
+    # Once per grouped transaction
+    assert 1 <= data_version(sqlite_engine, baby_id) <= 20
+
+
+def test_bad_event_fails_alone(sqlite_engine, baby_id):
+    writer = GroupCommitWriter(sqlite_engine)
+    event = diaper(baby_id)
+    batch = [
+        PendingInsert(event, baby_id),
+        PendingInsert(event.model_copy(), baby_id),  # same primary key
+        PendingInsert(diaper(baby_id), baby_id),
+    ]
+    writer.flush(batch)
+
+    assert batch[0].done.result() is None
+    assert batch[1].done.exception() is not None
+    assert batch[2].done.result() is None
+    with Session(sqlite_engine) as session:
+        assert len(session.exec(select(DiaperChange.id)).all()) == 2
+
+
+def test_stop_refuses_new_inserts(sqlite_engine, writer, baby_id):
+    writer.stop()
+
+    with pytest.raises(HTTPException) as error:
+        writer.insert(diaper(baby_id), baby_id)
+    assert error.value.status_code == 503
@@ -0,0 +1,132 @@
+import uuid
+
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException, Response
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel
+
+from app import idempotency
+from app.config import settings
+from app.idempotency import (
+    IdempotencyKey,
+    IdempotentRoute,
+    claim_key,
+    release_key,
+    save_response,
+)
+from app.oauth2 import create_access_token
+from app.users.models import User
+
+
+@pytest.fixture
+def user_id(monkeypatch, sqlite_engine):
+    monkeypatch.setattr(idempotency, "engine", sqlite_engine)
+    SQLModel.metadata.create_all(
+        sqlite_engine, tables=[User.__table__, IdempotencyKey.__table__]
+    )
+    with Session(sqlite_engine) as session:
+        user = User(email="a@b.co", password="-")
+        session.add(user)
+        session.commit()
+        return user.id
+
+
+def test_claim_then_in_progress(user_id):
+    assert claim_key(user_id, "key", "hash") is None
+
+    existing = claim_key(user_id, "key", "hash")
+    assert existing.status_code is None
+    assert existing.request_hash == "hash"
+
+
+def test_claim_returns_the_saved_response(user_id):
+    claim_key(user_id, "key", "hash")
+    save_response(
+        user_id,
+        "key",
+        Response(b"{}", status_code=201, headers={"Location": "/things/1"}),
+    )
+
+    existing = claim_key(user_id, "key", "hash")
+    assert existing.status_code == 201
+    assert existing.body == b"{}"
+    assert ["location", "/things/1"] in existing.headers
+
+
+def test_released_key_is_claimed_again(user_id):
+    claim_key(user_id, "key", "hash")
+    release_key(user_id, "key")
+
+    assert claim_key(user_id, "key", "hash") is None
+
+
+def test_abandoned_key_is_taken_over(monkeypatch, user_id):
+    claim_key(user_id, "key", "hash")
+    # No heartbeat can be recent enough
+    monkeypatch.setattr(settings, "idempotency_heartbeat_seconds", 0)
+
+    assert claim_key(user_id, "key", "hash") is None
+
+
+def test_keys_are_per_user(user_id):
+    claim_key(user_id, "key", "hash")
+
+    assert claim_key(uuid.uuid4(), "key", "hash") is None
+
+
+@pytest.fixture
+def client(user_id):
+    calls = []
+    router = APIRouter(route_class=IdempotentRoute)
+
+    @router.post("/things", status_code=201)
+    def create_thing(response: Response, fail: bool = False):
+        calls.append(1)
+        if fail:
+            raise HTTPException(status_code=409, detail="Conflict")
+        response.headers["Location"] = f"/things/{len(calls)}"
+        return {"number": len(calls)}
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    client.headers["Authorization"] = (
+        f"Bearer {create_access_token({'sub': str(user_id)})}"
+    )
+    client.calls = calls
+    return client
+
+
+def test_route_replays_the_response(client):
+    headers = {"Idempotency-Key": "key"}
+    first = client.post("/things", headers=headers)
+    replay = client.post("/things", headers=headers)
+
+    assert len(client.calls) == 1
+    assert replay.status_code == 201
+    assert replay.json() == first.json()
+    assert replay.headers["location"] == first.headers["location"]
+    assert replay.headers["idempotent-replayed"] == "true"
+
+
+def test_route_runs_requests_without_key(client):
+    client.post("/things")
+    client.post("/things")
+
+    assert len(client.calls) == 2
+
+
+def test_route_refuses_key_reuse_for_another_request(client):
+    headers = {"Idempotency-Key": "key"}
+    client.post("/things", headers=headers)
+
+    response = client.post("/things", params={"fail": True}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_route_runs_again_after_an_error(client):
+    headers = {"Idempotency-Key": "key"}
+    assert client.post("/things?fail=1", headers=headers).status_code == 409
+    assert client.post("/things?fail=1", headers=headers).status_code == 409
+
+    assert len(client.calls) == 2
@@ -0,0 +1,157 @@
+from datetime import timedelta
+
+import pytest
+from sqlmodel import Session, SQLModel
+
+from app.config import settings
+from app.database import utcnow
+from app.jobs import queue
+from app.jobs.models import Job, JobStatus
+from app.jobs.queue import (
+    MISSED_HEARTBEATS,
+    claim_job,
+    enqueue,
+    job_handler,
+    maintain_jobs,
+    run_job,
+    touch_job,
+)
+
+
+@job_handler("test_succeed")
+def succeed(payload):
+    return {"echo": payload["value"]}
+
+
+@job_handler("test_fail")
+def fail(payload):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def engine(monkeypatch, sqlite_engine):
+    monkeypatch.setattr(queue, "engine", sqlite_engine)
+    SQLModel.metadata.create_all(sqlite_engine, tables=[Job.__table__])
+    return sqlite_engine
+
+
+def add_job(engine, kind: str, **values) -> Job:
+    with Session(engine) as session:
+        job = enqueue(session, kind, {"value": 1})
+        for name, value in values.items():
+            setattr(job, name, value)
+        session.commit()
+        session.refresh(job)
+        return job
+
+
+def load(engine, job: Job) -> Job:
+    with Session(engine) as session:
+        return session.get(Job, job.id)
+
+
+def test_claim_runs_each_job_once(engine):
+    job = add_job(engine, "test_succeed")
+
+    assert claim_job() == (job.id, "test_succeed", {"value": 1})
+    assert claim_job() is None
+    claimed = load(engine, job)
+    assert claimed.status == JobStatus.RUNNING
+    assert claimed.attempts == 1
+
+
+def test_claim_skips_jobs_not_due(engine):
+    add_job(engine, "test_succeed", run_at=utcnow() + timedelta(minutes=1))
+
+    assert claim_job() is None
+
+
+def test_run_records_the_result(engine):
+    job = add_job(engine, "test_succeed")
+    run_job(*claim_job())
+
+    finished = load(engine, job)
+    assert finished.status == JobStatus.SUCCEEDED
+    assert finished.result == {"echo": 1}
+    assert finished.finished_at is not None
+
+
+def test_failure_is_retried_with_backoff(engine):
+    job = add_job(engine, "test_fail")
+    run_job(*claim_job())
+
+    retried = load(engine, job)
+    assert retried.status == JobStatus.QUEUED
+    assert "boom" in retried.error
+    assert retried.run_at > utcnow() + timedelta(
+        seconds=settings.job_retry_base_seconds - 1
+    )
+
+
+def test_last_failure_fails_the_job(engine):
+    job = add_job(engine, "test_fail", max_attempts=1)
+    run_job(*claim_job())
+
+    assert load(engine, job).status == JobStatus.FAILED
+
+
+def expire_lease(engine, job: Job) -> None:
+    """Ages the job's lease past MISSED_HEARTBEATS heartbeats."""
+    lease = timedelta(seconds=settings.job_heartbeat_seconds * MISSED_HEARTBEATS)
+    with Session(engine) as session:
+        running = session.get(Job, job.id)
+        running.locked_at = utcnow() - lease - timedelta(seconds=1)
+        session.add(running)
+        session.commit()
+
+
+def test_maintenance_keeps_jobs_with_a_live_lease(engine):
+    job = add_job(engine, "test_succeed")
+    claim_job()
+    maintain_jobs()
+
+    assert load(engine, job).status == JobStatus.RUNNING
+
+
+def test_maintenance_requeues_jobs_with_an_expired_lease(engine):
+    job = add_job(engine, "test_succeed")
+    claim_job()
+    expire_lease(engine, job)
+    maintain_jobs()
+
+    requeued = load(engine, job)
+    assert requeued.status == JobStatus.QUEUED
+    assert claim_job()[0] == job.id
+
+
+def test_heartbeat_renews_the_lease(engine):
+    job = add_job(engine, "test_succeed")
+    claim_job()
+    expire_lease(engine, job)
+    touch_job(job.id)
+    maintain_jobs()
+
+    assert load(engine, job).status == JobStatus.RUNNING
+
+
+def test_maintenance_fails_expired_jobs_without_attempts_left(engine):
+    job = add_job(engine, "test_succeed", max_attempts=1)
+    claim_job()
+    expire_lease(engine, job)
+    maintain_jobs()
+
+    failed = load(engine, job)
+    assert failed.status == JobStatus.FAILED
+    assert failed.finished_at is not None
+
+
+def test_maintenance_drops_old_finished_jobs(engine):
+    old = utcnow() - timedelta(days=settings.job_retention_days + 1)
+    job = add_job(engine, "test_succeed", status=JobStatus.SUCCEEDED, finished_at=old)
+    recent = add_job(
+        engine, "test_succeed", status=JobStatus.SUCCEEDED, finished_at=utcnow()
+    )
+    maintain_jobs()
+
+    assert load(engine, job) is None
+    assert load(engine, recent) is not None
@@ -0,0 +1,96 @@
+import pytest
+
+from app.config import settings
+from app.ratelimit import (
+    LoginLimiter,
+    MemoryBackend,
+    RedisBackend,
+    lockout_remaining,
+)
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "login_burst_per_ip", 3)
+    monkeypatch.setattr(settings, "login_burst_per_email", 2)
+    monkeypatch.setattr(settings, "login_rate_per_ip", 1)
+    monkeypatch.setattr(settings, "login_rate_per_email", 1)
+    monkeypatch.setattr(settings, "login_lockout_threshold", 3)
+    monkeypatch.setattr(settings, "login_failure_window_seconds", 60)
+
+
+@pytest.fixture
+def limiter():
+    return LoginLimiter(MemoryBackend(max_keys=100))
+
+
+def test_burst_then_refused(limiter):
+    assert limiter.check("1.1.1.1", "a@b.co") == 0
+    assert limiter.check("1.1.1.1", "a@b.co") == 0
+    # The email's bucket (2) is empty before the IP's (3)
+    assert limiter.check("1.1.1.1", "a@b.co") > 0
+    assert limiter.check("1.1.1.1", "other@b.co") == 0
+    assert limiter.check("2.2.2.2", "other@b.co") == 0
+
+
+def test_refused_attempt_takes_no_token(limiter):
+    for email in ("a@b.co", "b@b.co", "c@b.co"):
+        assert limiter.check("1.1.1.1", email) == 0
+    # The IP's bucket is empty: the email's keeps its tokens
+    assert limiter.check("1.1.1.1", "d@b.co") > 0
+    assert limiter.check("2.2.2.2", "d@b.co") == 0
+    assert limiter.check("2.2.2.2", "d@b.co") == 0
+
+
+def test_emails_are_case_insensitive(limiter):
+    limiter.check("1.1.1.1", "a@b.co")
+    limiter.check("2.2.2.2", "A@B.co")
+    assert limiter.check("3.3.3.3", "a@B.CO") > 0
+
+
+def test_lockout_after_failures_until_success(limiter):
+    for _ in range(3):
+        limiter.record_failure("a@b.co")
+    retry_after = limiter.check("1.1.1.1", "a@b.co")
+    assert 0 < retry_after <= 60
+
+    limiter.record_success("a@b.co")
+    assert limiter.check("1.1.1.1", "a@b.co") == 0
+
+
+def test_bucket_keys_do_not_evict_lockouts():
+    limiter = LoginLimiter(MemoryBackend(max_keys=4))
+    for _ in range(3):
+        limiter.record_failure("a@b.co")
+    for i in range(20):
+        limiter.check(f"10.0.0.{i}", f"user{i}@b.co")
+
+    assert limiter.check("1.1.1.1", "a@b.co") > 0
+
+
+def test_lockout_remaining():
+    assert lockout_remaining([], 100, 60, 3) == 0
+    assert lockout_remaining([50, 60], 100, 60, 3) == 0
+    # Unlocked when the oldest of the last 3 failures leaves the window
+    assert lockout_remaining([50, 60, 70], 100, 60, 3) == 10
+    assert lockout_remaining([30, 50, 60, 70], 100, 60, 3) == 10
+
+
+def test_rates_must_be_positive():
+    with pytest.raises(ValueError):
+        type(settings)(login_rate_per_ip=0)
+
+
+def test_redis_backend_falls_back_to_memory():
+    pytest.importorskip("redis")
+    limiter = LoginLimiter(RedisBackend("redis://127.0.0.1:1/0"))
+
+    assert limiter.check("1.1.1.1", "a@b.co") == 0
+    assert limiter.check("1.1.1.1", "a@b.co") == 0
+    assert limiter.check("1.1.1.1", "a@b.co") > 0
+
+    for _ in range(3):
+        limiter.record_failure("x@b.co")
+    assert limiter.check("2.2.2.2", "x@b.co") > 0
+    limiter.record_success("x@b.co")
+    assert limiter.check("2.2.2.2", "x@b.co") == 0